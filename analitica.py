@@ -0,0 +1,94 @@
+"""
+Tiempos de resolución y backlog a partir de los resúmenes del historial
+de eventos (migración 7). Las consultas leen tiempos_resolucion y
+backlog_dia, cuyo tamaño depende de días y valores distintos, no de la
+cantidad de eventos.
+"""
+from datetime import date, timedelta
+from migraciones import CUBETAS_HORAS
+
+DIMENSIONES = ('total', 'piso', 'oficina', 'tecnico')
+
+
+def _percentil(cubetas, total, fraccion):
+    """
+    Estimación por interpolación lineal dentro de la cubeta del histograma.
+    cubetas: [(cubeta, cantidad, max_horas), ...] ordenadas
+    """
+    objetivo = fraccion * total
+    acumulado = 0
+    for cubeta, cantidad, max_horas in cubetas:
+        if acumulado + cantidad >= objetivo:
+            desde = CUBETAS_HORAS[cubeta - 1] if cubeta > 0 else 0
+            hasta = min(CUBETAS_HORAS[cubeta], max_horas) if cubeta < len(CUBETAS_HORAS) else max_horas
+            hasta = max(hasta, desde)
+            return desde + (hasta - desde) * (objetivo - acumulado) / cantidad
+        acumulado += cantidad
+    return cubetas[-1][2] if cubetas else None
+
+
+def tiempos_resolucion(conn, dimension='total'):
+    """
+    Horas hasta la primera resolución por valor de la dimensión ('total',
+    'piso', 'oficina', 'tecnico'), de más a menos resueltos:
+    [{'valor', 'resueltos', 'promedio_horas', 'p50_horas', 'p90_horas', 'max_horas'}, ...]
+    """
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+    por_valor = {}
+    for valor, cubeta, cantidad, suma, maximo in conn.execute("""
+        SELECT valor, cubeta, cantidad, suma_horas, max_horas
+        FROM tiempos_resolucion WHERE dimension = ?
+        ORDER BY valor, cubeta
+    """, (dimension,)):
+        por_valor.setdefault(valor, []).append((cubeta, cantidad, suma, maximo))
+
+    resultado = []
+    for valor, filas in por_valor.items():
+        total = sum(f[1] for f in filas)
+        cubetas = [(cubeta, cantidad, maximo) for cubeta, cantidad, _, maximo in filas]
+        resultado.append({
+            'valor': valor,
+            'resueltos': total,
+            'promedio_horas': round(sum(f[2] for f in filas) / total, 1),
+            'p50_horas': round(_percentil(cubetas, total, 0.5), 1),
+            'p90_horas': round(_percentil(cubetas, total, 0.9), 1),
+            'max_horas': round(max(f[3] for f in filas), 1),
+        })
+    resultado.sort(key=lambda r: (-r['resueltos'], r['valor']))
+    return resultado
+
+
+def backlog_por_dia(conn, dias=30, hoy=None):
+    """
+    Tickets abiertos al final de cada uno de los últimos `dias` días:
+    [('YYYY-MM-DD', abiertos), ...] en orden cronológico
+    """
+    hoy = hoy or date.today()
+    desde = hoy - timedelta(days=dias - 1)
+    abiertos_antes = 0
+    por_fecha = {}
+    for fecha, abiertos in conn.execute("""
+        SELECT fecha, SUM(abiertos - cerrados) OVER (ORDER BY fecha)
+        FROM backlog_dia
+    """):
+        if fecha < desde.isoformat():
+            abiertos_antes = abiertos
+        else:
+            por_fecha[fecha] = abiertos
+
+    serie = []
+    actual = abiertos_antes
+    for i in range(dias):
+        fecha = (desde + timedelta(days=i)).isoformat()
+        actual = por_fecha.get(fecha, actual)
+        serie.append((fecha, actual))
+    return serie
+
+
+def resumen(conn, dias_backlog=30):
+    """Todo junto, en tipos JSON (lo sirve /api/estadisticas/resolucion)"""
+    return {
+        **{dimension: tiempos_resolucion(conn, dimension) for dimension in DIMENSIONES},
+        'backlog': [list(f) for f in backlog_por_dia(conn, dias_backlog)],
+    }
@@ -4,6 +4,9 @@ Aplicación principal - Sistema de Reportes CNE
 import threading
 from flask import Flask
 from config import SECRET_KEY
+from database import inicializar_base_datos
+from notificador import iniciar_notificador
+from planificador import iniciar_planificador
 from routes import registrar_rutas
 from telegram_bot import iniciar_bot_telegram
 
@@ -15,6 +18,15 @@ app.config['SECRET_KEY'] = SECRET_KEY
 registrar_rutas(app)
 
 if __name__ == '__main__':
+    # Aplicar migraciones pendientes antes de aceptar requests
+    inicializar_base_datos()
+    
+    # Estadísticas y reportes del bot se recalculan fuera de las requests
+    iniciar_planificador()
+
+    # Avisos en vivo al listado (/api/eventos) tras cada escritura
+    iniciar_notificador()
+    
     # Iniciar bot en hilo daemon
     bot_thread = threading.Thread(target=iniciar_bot_telegram, daemon=True)
     bot_thread.start()
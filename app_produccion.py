@@ -5,7 +5,10 @@ Usa Waitress para mejor rendimiento y estabilidad
 import threading
 from flask import Flask
 from waitress import serve
-from config import SECRET_KEY
+from config import SECRET_KEY, WAITRESS_HILOS
+from database import inicializar_base_datos
+from notificador import iniciar_notificador
+from planificador import iniciar_planificador
 from routes import registrar_rutas
 from telegram_bot import iniciar_bot_telegram
 
@@ -22,6 +25,15 @@ app.config['TESTING'] = False
 registrar_rutas(app)
 
 if __name__ == '__main__':
+    # Aplicar migraciones pendientes antes de aceptar requests
+    inicializar_base_datos()
+    
+    # Estadísticas y reportes del bot se recalculan fuera de las requests
+    iniciar_planificador()
+
+    # Avisos en vivo al listado (/api/eventos) tras cada escritura
+    iniciar_notificador()
+    
     # Iniciar bot en hilo daemon
     bot_thread = threading.Thread(target=iniciar_bot_telegram, daemon=True)
     bot_thread.start()
@@ -41,7 +53,7 @@ if __name__ == '__main__':
         app,
         host='16.1.1.118',
         port=5555,
-        threads=4,              # Número de threads para manejar requests
+        threads=WAITRESS_HILOS, # Requests normales + cupo de /api/eventos (config.py)
         channel_timeout=60,     # Timeout de conexión
         cleanup_interval=30,    # Limpieza de conexiones antiguas
         _quiet=False           # Mostrar logs
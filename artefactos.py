@@ -0,0 +1,138 @@
+"""
+Cache en disco de archivos generados (exportaciones)
+Cada archivo se identifica por la versión de los datos y los parámetros
+con que se generó: mientras nadie escriba, todos los pedidos iguales
+(web o bot) reciben el mismo archivo ya armado. Se descartan los menos
+usados cuando el directorio supera un tamaño o un archivo lleva mucho sin
+usarse. También recuerda el file_id que Telegram asignó a cada archivo
+para reenviarlo sin volver a subirlo.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from config import ARTEFACTOS_DIR, ARTEFACTOS_MAX_MB, ARTEFACTOS_EDAD_MAX
+
+
+class CacheArtefactos:
+    """Archivos generados, uno por (versión de datos, clave)"""
+
+    def __init__(self, directorio=None, max_bytes=ARTEFACTOS_MAX_MB * 1024 * 1024,
+                 edad_max=ARTEFACTOS_EDAD_MAX):
+        self.directorio = directorio or ARTEFACTOS_DIR or os.path.join(tempfile.gettempdir(), 'reportes_artefactos')
+        self.max_bytes = max_bytes
+        self.edad_max = edad_max
+        self._lock = threading.Lock()
+        self._generando = {}      # ruta -> Lock (un solo thread arma cada archivo)
+        self._file_ids = {}       # ruta -> file_id de Telegram
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartados = 0
+
+    def ruta(self, version, clave, extension):
+        nombre = hashlib.sha1(repr((version, clave)).encode()).hexdigest()[:20]
+        return os.path.join(self.directorio, f"{nombre}.{extension}")
+
+    def _lock_de(self, ruta):
+        with self._lock:
+            return self._generando.setdefault(ruta, threading.Lock())
+
+    def existente(self, version, clave, extension):
+        """Ruta del archivo si ya está armado, sin generarlo (None si no)"""
+        ruta = self.ruta(version, clave, extension)
+        try:
+            os.utime(ruta)
+        except OSError:
+            return None
+        self.aciertos += 1
+        return ruta
+
+    def obtener(self, version, clave, extension, generar):
+        """
+        Ruta del archivo para (version, clave); si no existe lo arma con
+        generar(ruta_destino). Se escribe en un temporal del mismo directorio
+        y se renombra, así nadie ve un archivo a medio escribir.
+        """
+        ruta = self.ruta(version, clave, extension)
+        with self._lock_de(ruta):
+            if os.path.exists(ruta):
+                self.aciertos += 1
+                try:
+                    os.utime(ruta)    # la fecha de modificación marca el último uso
+                except OSError:
+                    pass
+                return ruta
+
+            self.fallos += 1
+            os.makedirs(self.directorio, exist_ok=True)
+            fd, parcial = tempfile.mkstemp(dir=self.directorio, suffix='.parcial')
+            os.close(fd)
+            try:
+                generar(parcial)
+                os.replace(parcial, ruta)
+            except Exception:
+                try:
+                    os.remove(parcial)
+                except OSError:
+                    pass
+                raise
+        self.limpiar(conservar=(ruta,))
+        return ruta
+
+    def limpiar(self, conservar=()):
+        """Borra lo que lleva más de edad_max sin usarse y, si el total sigue
+        superando max_bytes, los menos usados recientemente"""
+        try:
+            entradas = []
+            for entrada in os.scandir(self.directorio):
+                if entrada.is_file():
+                    info = entrada.stat()
+                    entradas.append((info.st_mtime, info.st_size, entrada.path))
+        except OSError:
+            return
+        entradas.sort()
+        total = sum(tamano for _, tamano, _ in entradas)
+        limite_edad = time.time() - self.edad_max
+        for modificado, tamano, ruta in entradas:
+            if modificado >= limite_edad and total <= self.max_bytes:
+                break
+            if ruta in conservar or (ruta.endswith('.parcial') and modificado >= limite_edad):
+                continue    # los .parcial recientes se están escribiendo
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue     # en Windows no se puede borrar mientras alguien lo descarga
+            total -= tamano
+            self.descartados += 1
+            with self._lock:
+                self._file_ids.pop(ruta, None)
+                self._generando.pop(ruta, None)
+
+    def file_id(self, ruta):
+        """file_id de Telegram del archivo, si ya se subió y sigue en el cache"""
+        with self._lock:
+            file_id = self._file_ids.get(ruta)
+        return file_id if file_id and os.path.exists(ruta) else None
+
+    def recordar_file_id(self, ruta, file_id):
+        with self._lock:
+            if file_id:
+                self._file_ids[ruta] = file_id
+            else:
+                self._file_ids.pop(ruta, None)
+
+    def estado(self):
+        try:
+            archivos = [e.stat().st_size for e in os.scandir(self.directorio) if e.is_file()]
+        except OSError:
+            archivos = []
+        return {
+            'directorio': self.directorio,
+            'archivos': len(archivos),
+            'bytes': sum(archivos),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'descartados': self.descartados,
+            'file_ids': len(self._file_ids),
+        }
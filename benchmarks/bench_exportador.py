@@ -0,0 +1,122 @@
+"""
+Benchmark de la exportación a Excel: memoria pico y tiempo hasta el primer byte
+Compara la exportación anterior (fetchall + Workbook normal + BytesIO) con
+exportador.py (write-only + fetchmany + envío de a trozos) sobre una tabla
+'datos' sintética. Cada medición corre en un proceso aparte para que la
+memoria pico (ru_maxrss) sea solo la suya. Uso, desde la raíz del proyecto:
+    python benchmarks/bench_exportador.py [filas ...]
+    python benchmarks/bench_exportador.py --solo-nuevo 500000
+"""
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+FILAS_POR_DEFECTO = [10_000, 100_000, 500_000]
+
+
+def crear_bd(ruta, filas, semilla=1):
+    azar = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    conn.execute("""CREATE TABLE datos (id INTEGER PRIMARY KEY, piso INTEGER, oficina TEXT, quien TEXT,
+                    razon TEXT, estado TEXT, fecha TEXT, resuelto_por TEXT)""")
+    oficinas = ['Despacho', 'Mesa de entradas', 'Secretaría Civil', 'Archivo', 'Informática']
+    nombres = ['Loreley Pravia', 'Juan Pérez', 'María Gómez', 'Carlos Díaz']
+    razones = ['No prende la pc', 'Impresora atascada', 'Sin acceso al sistema de expedientes', 'Cambio de toner']
+    inicio = date(2023, 1, 1)
+
+    def fila(i):
+        estado = azar.choice(['pendiente', 'en proceso', 'resuelto', 'resuelto'])
+        return (i, azar.randint(-2, 10), azar.choice(oficinas), azar.choice(nombres),
+                azar.choice(razones) + ' ' * azar.randrange(3), estado,
+                (inicio + timedelta(days=azar.randrange(1000))).strftime('%d/%m/%y'),
+                azar.choice(['Nahuel', 'Lucas']) if estado == 'resuelto' else None)
+
+    conn.executemany("INSERT INTO datos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (fila(i) for i in range(1, filas + 1)))
+    conn.commit()
+    conn.close()
+
+
+def exportar_anterior(conn):
+    """routes.generar_excel tal como estaba; el primer byte sale recién con el buffer completo"""
+    import openpyxl
+    cur = conn.cursor()
+    cur.execute("SELECT id, piso, oficina, quien, razon, estado, fecha, resuelto_por FROM datos ORDER BY id DESC")
+    filas = cur.fetchall()
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Reportes"
+    ws.append(['ID', 'Piso', 'Oficina', 'Quién', 'Razón', 'Estado', 'Fecha', 'Resuelto por'])
+    for f in filas:
+        ws.append(f)
+    for col in ws.columns:
+        max_length = 0
+        column = col[0].column_letter
+        for cell in col:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(cell.value)
+            except:
+                pass
+        ws.column_dimensions[column].width = min((max_length + 2), 50)
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return iter(lambda: buffer.read(64 * 1024), b'')
+
+
+def exportar_nuevo(conn):
+    # exportador lee con sus propias conexiones (config.DB_PATH)
+    import config
+    config.DB_PATH = conn.execute("PRAGMA database_list").fetchone()[2]
+    import exportador
+    fd, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    exportador.escribir_excel(ruta)
+    return exportador.leer_en_trozos(open(ruta, 'rb'))
+
+
+def medir(variante, ruta_bd):
+    """Corre una exportación en este proceso e imprime 'ttfb total bytes rss_kb'"""
+    conn = sqlite3.connect(ruta_bd)
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    trozos = (exportar_anterior if variante == 'anterior' else exportar_nuevo)(conn)
+    primero = next(trozos)
+    ttfb = time.perf_counter() - inicio
+    total_bytes = len(primero) + sum(len(t) for t in trozos)
+    total = time.perf_counter() - inicio
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{ttfb:.3f} {total:.3f} {total_bytes} {rss} {rss - rss_base}")
+
+
+def main(argv):
+    solo_nuevo = '--solo-nuevo' in argv
+    tamanos = [int(a) for a in argv if not a.startswith('--')] or FILAS_POR_DEFECTO
+    variantes = ['nuevo'] if solo_nuevo else ['anterior', 'nuevo']
+    print(f"{'filas':>8} {'variante':>9} {'TTFB (s)':>9} {'total (s)':>9} {'xlsx (MB)':>9} {'RSS pico (MB)':>13} {'Δ RSS (MB)':>10}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for filas in tamanos:
+            ruta_bd = os.path.join(directorio, f'datos_{filas}.db')
+            crear_bd(ruta_bd, filas)
+            for variante in variantes:
+                salida = subprocess.run([sys.executable, __file__, '--medir', variante, ruta_bd],
+                                        capture_output=True, text=True, check=True).stdout.split()
+                ttfb, total, tamano, rss, delta = float(salida[0]), float(salida[1]), int(salida[2]), int(salida[3]), int(salida[4])
+                print(f"{filas:>8} {variante:>9} {ttfb:>9.2f} {total:>9.2f} {tamano / 1e6:>9.1f} {rss / 1024:>13.0f} {delta / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--medir':
+        medir(sys.argv[2], sys.argv[3])
+    else:
+        main(sys.argv[1:])
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark de interpretación de fechas: costo por fila antes/después
+Historia sintética de 100k reportes (~3 años de días, en los formatos que
+aparecen en la columna 'fecha'). Uso, desde la raíz del proyecto:
+    python benchmarks/bench_fechas.py [filas]
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import fechas
+
+
+def parse_fecha_flexible_anterior(s):
+    """utils.parse_fecha_flexible tal como estaba: strptime formato por formato"""
+    if not s:
+        return None
+    s = str(s).strip()
+    for fmt in ("%d/%m/%y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d-%m-%y"):
+        try:
+            return datetime.strptime(s, fmt)
+        except Exception:
+            continue
+    return None
+
+
+def historia_sintetica(filas, semilla=1):
+    azar = random.Random(semilla)
+    inicio = date(2023, 1, 1)
+    formatos = [("%d/%m/%y", 85), ("%d/%m/%Y", 5), ("%Y-%m-%d", 4), ("%d-%m-%Y", 2), ("%d-%m-%y", 2)]
+    nombres, pesos = zip(*formatos)
+    valores = []
+    for _ in range(filas):
+        dia = inicio + timedelta(days=azar.randrange(3 * 365))
+        r = azar.random()
+        if r < 0.01:
+            valores.append('')
+        elif r < 0.02:
+            valores.append('sin fecha')
+        elif r < 0.05:
+            valores.append(f"{dia.day}/{dia.month}/{dia:%y}")   # sin ceros a la izquierda
+        else:
+            valores.append(dia.strftime(azar.choices(nombres, pesos)[0]))
+    return valores
+
+
+def medir(nombre, funcion, filas, repeticiones=5, preparar=None):
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        tiempos.append(timeit.timeit(funcion, number=1))
+    mejor = min(tiempos)
+    print(f"  {nombre:<42} {mejor * 1000:8.1f} ms   {mejor / filas * 1e9:8.0f} ns/fila")
+    return mejor
+
+
+def limpiar_memoria():
+    fechas._parsear.cache_clear()
+    fechas._a_iso.cache_clear()
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    valores = historia_sintetica(filas)
+    print(f"{filas} filas, {len(set(valores))} valores distintos")
+
+    # Mismo resultado que la implementación anterior en toda la historia
+    # (y en algunos casos borde)
+    casos = set(valores) | {'31/02/25', '00/01/25', '1/1/70', '01/01/69', '2025-1-5', ' 05/11/25 ', '05/11/25 10:30'}
+    distintos = [v for v in casos if fechas.parse_fecha(v) != parse_fecha_flexible_anterior(v)]
+    if distintos:
+        print(f"❌ Resultados distintos para: {distintos[:10]}")
+        sys.exit(1)
+
+    antes = medir("antes: strptime por formato",
+                  lambda: [parse_fecha_flexible_anterior(v) for v in valores], filas)
+    frio = medir("después: parse_fecha (memoria vacía)",
+                 lambda: [fechas.parse_fecha(v) for v in valores], filas, preparar=limpiar_memoria)
+    caliente = medir("después: parse_fecha (memoria cargada)",
+                     lambda: [fechas.parse_fecha(v) for v in valores], filas)
+    columna = medir("después: fechas_a_iso (columna entera)",
+                    lambda: fechas.fechas_a_iso(valores), filas, preparar=limpiar_memoria)
+    print(f"Mejora por fila: x{antes / frio:.0f} en frío, x{antes / caliente:.0f} con memoria, "
+          f"x{antes / columna:.0f} por columna")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Búsqueda de texto en reportes
+Usa el índice FTS5 datos_fts (migración 3) y, si no existe, LIKE.
+"""
+import re
+
+# Peso de cada columna de datos_fts en el ranking bm25
+PESOS_BM25 = (3.0, 2.0, 1.0, 0.5)   # oficina, quien, razon, comentarios
+
+_RE_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+
+def expresion_fts(texto):
+    """
+    Convierte lo que escribió el usuario en una expresión MATCH segura:
+    cada palabra como prefijo entre comillas, todas requeridas.
+    'impresora 3er piso' -> '"impresora"* "3er"* "piso"*'
+    """
+    terminos = _RE_TERMINO.findall(texto or '')
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def fts_disponible(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'datos_fts'"
+    ).fetchone() is not None
+
+
+def filtro_busqueda(conn, texto):
+    """
+    Partes de la consulta para filtrar 'datos d' por texto.
+    Devuelve (from, condición, parámetros, orden); orden por relevancia con FTS.
+    """
+    if fts_disponible(conn):
+        expresion = expresion_fts(texto)
+        if not expresion:
+            return "FROM datos d", "1=1", [], "d.id DESC"
+        pesos = ', '.join(map(str, PESOS_BM25))
+        return (
+            "FROM datos_fts JOIN datos d ON d.id = datos_fts.rowid",
+            "datos_fts MATCH ?",
+            [expresion],
+            f"bm25(datos_fts, {pesos}), d.id DESC",
+        )
+
+    patron = f"%{texto}%"
+    return (
+        "FROM datos d",
+        "(d.oficina LIKE ? OR d.quien LIKE ? OR d.razon LIKE ?)",
+        [patron, patron, patron],
+        "d.id DESC",
+    )
@@ -0,0 +1,51 @@
+"""
+Cache en memoria de valores derivados de la BD
+Todo se invalida junto cuando cambia database.version_datos(). Lleno, se
+descarta la entrada usada hace más tiempo (LRU).
+"""
+import threading
+from collections import OrderedDict
+
+
+class CacheVersionada:
+    """Valores calculados que valen mientras no cambie la versión de los datos"""
+
+    def __init__(self, max_entradas=256):
+        self.max_entradas = max_entradas
+        self._valores = OrderedDict()   # de la usada hace más tiempo a la más reciente
+        self._version = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    def obtener(self, version, clave, calcular):
+        """Devuelve el valor cacheado para clave o lo calcula con calcular()"""
+        with self._lock:
+            if version != self._version:
+                self._valores.clear()
+                self._version = version
+            elif clave in self._valores:
+                self.aciertos += 1
+                self._valores.move_to_end(clave)
+                return self._valores[clave]
+            self.fallos += 1
+
+        valor = calcular()
+
+        with self._lock:
+            if version == self._version:
+                self._valores[clave] = valor
+                self._valores.move_to_end(clave)
+                while len(self._valores) > self.max_entradas:
+                    self._valores.popitem(last=False)
+                    self.descartes += 1
+        return valor
+
+    def estado(self):
+        return {
+            'entradas': len(self._valores),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'descartes': self.descartes,
+        }
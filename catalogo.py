@@ -0,0 +1,133 @@
+"""
+Cache en memoria del catálogo de oficinas (OficinasCne.db)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from config import DB_OFICINAS_PATH, CATALOGO_VERIFICAR_CADA
+
+# Solo se usa si el catálogo nunca pudo cargarse
+PISOS_POR_DEFECTO = ['1', '2', '3', '4', '5']
+
+
+class CatalogoOficinas:
+    """
+    Carga pisos y oficinas una sola vez y los recarga solo si cambia el
+    mtime del archivo o el PRAGMA data_version. Si el recurso de red no
+    responde se sigue sirviendo la última versión buena conocida.
+    """
+
+    def __init__(self, ruta, verificar_cada=CATALOGO_VERIFICAR_CADA):
+        self.ruta = ruta
+        self.verificar_cada = verificar_cada
+        self._lock = threading.Lock()
+        self._conn = None
+        self._firma = None
+        self._ultima_verificacion = None
+        self._pisos = None
+        self._oficinas_por_piso = {}
+        self._json = '{}'
+        self.cargado_en = None
+        self.ultimo_error = None
+
+    def _leer_firma(self):
+        """(mtime, data_version): cambia cuando alguien modifica el catálogo"""
+        mtime = os.stat(self.ruta).st_mtime
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.ruta, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return (mtime, data_version)
+
+    def _cargar(self):
+        cur = self._conn.execute(
+            "SELECT nombre_oficina, piso FROM oficinas ORDER BY piso, nombre_oficina"
+        )
+        pisos = []
+        oficinas_por_piso = {}
+        for nombre, piso in cur.fetchall():
+            clave = str(piso)
+            if clave not in oficinas_por_piso:
+                pisos.append(clave)
+                oficinas_por_piso[clave] = []
+            oficinas_por_piso[clave].append(nombre)
+
+        self._pisos = pisos
+        self._oficinas_por_piso = oficinas_por_piso
+        self._json = json.dumps(oficinas_por_piso)
+        self.cargado_en = datetime.now()
+
+    def _refrescar(self):
+        ahora = time.monotonic()
+        if self._ultima_verificacion is not None and ahora - self._ultima_verificacion < self.verificar_cada:
+            return
+
+        with self._lock:
+            if self._ultima_verificacion is not None and ahora - self._ultima_verificacion < self.verificar_cada:
+                return
+            self._ultima_verificacion = ahora
+            try:
+                firma = self._leer_firma()
+                if firma != self._firma or self._pisos is None:
+                    self._cargar()
+                    self._firma = firma
+                self.ultimo_error = None
+            except (OSError, sqlite3.Error) as e:
+                self.ultimo_error = str(e)
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except sqlite3.Error:
+                        pass
+                    self._conn = None
+                if self._pisos is None:
+                    print(f"⚠️ Catálogo de oficinas no disponible, usando pisos por defecto: {e}")
+                else:
+                    print(f"⚠️ Catálogo de oficinas no disponible, usando versión del {self.cargado_en:%d/%m/%y %H:%M}: {e}")
+
+    def pisos(self):
+        self._refrescar()
+        return list(self._pisos) if self._pisos is not None else list(PISOS_POR_DEFECTO)
+
+    def oficinas_por_piso(self, piso):
+        self._refrescar()
+        return list(self._oficinas_por_piso.get(str(piso), []))
+
+    def oficinas_json(self):
+        """Payload {piso: [oficinas]} ya serializado para los templates"""
+        self._refrescar()
+        return self._json
+
+    def estado(self):
+        return {
+            'cargado': self._pisos is not None,
+            'cargado_en': self.cargado_en,
+            'pisos': len(self._pisos or []),
+            'oficinas': sum(len(o) for o in self._oficinas_por_piso.values()),
+            'ultimo_error': self.ultimo_error,
+        }
+
+
+_catalogo = CatalogoOficinas(DB_OFICINAS_PATH)
+
+
+def pisos_disponibles():
+    """Lista de pisos con oficinas"""
+    return _catalogo.pisos()
+
+
+def oficinas_por_piso(piso):
+    """Oficinas de un piso"""
+    return _catalogo.oficinas_por_piso(piso)
+
+
+def oficinas_json():
+    """JSON {piso: [oficinas]} para los selects de nuevo/editar"""
+    return _catalogo.oficinas_json()
+
+
+def estado_catalogo():
+    """Estado del cache para diagnóstico"""
+    return _catalogo.estado()
@@ -0,0 +1,29 @@
+"""
+Compresión gzip de las respuestas generadas (HTML y JSON)
+Las que van en streaming (exportaciones, eventos, descargas) y los
+estáticos, que ya tienen sus versiones precomprimidas, quedan como están.
+"""
+import gzip
+from flask import request
+from config import COMPRESION_MIN_BYTES, COMPRESION_NIVEL, COMPRESION_TIPOS
+
+
+def comprimir_respuesta(respuesta):
+    if (respuesta.mimetype not in COMPRESION_TIPOS or respuesta.direct_passthrough or respuesta.is_streamed
+            or 'Content-Encoding' in respuesta.headers or not 200 <= respuesta.status_code < 300
+            or respuesta.status_code == 204):
+        return respuesta
+    # La respuesta depende del Accept-Encoding aunque esta vez no se comprima
+    respuesta.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip'] <= 0:
+        return respuesta
+    datos = respuesta.get_data()
+    if len(datos) < COMPRESION_MIN_BYTES:
+        return respuesta
+    respuesta.set_data(gzip.compress(datos, COMPRESION_NIVEL, mtime=0))
+    respuesta.headers['Content-Encoding'] = 'gzip'
+    return respuesta
+
+
+def registrar_compresion(app):
+    app.after_request(comprimir_respuesta)
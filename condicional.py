@@ -0,0 +1,76 @@
+"""
+GET condicional (ETag / Last-Modified) para páginas y APIs que solo
+dependen de los datos de reportes. Si el navegador ya tiene la versión
+actual se responde 304 sin correr las consultas ni renderizar el template.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+from flask import request, session, make_response
+from config import CACHE_CONTROL, CACHE_CONTROL_POR_DEFECTO
+from database import obtener_conexion_lectura, version_datos
+
+# Un ETag emitido antes de reiniciar no vale después (puede cambiar el HTML)
+_ARRANQUE = str(time.time_ns())
+
+# (versión, momento en que este proceso la vio por primera vez) para Last-Modified
+_ultima = (None, None)
+_lock = threading.Lock()
+
+
+def _ultima_modificacion(version):
+    global _ultima
+    with _lock:
+        if _ultima[0] != version:
+            ahora = datetime.now(timezone.utc).replace(microsecond=0)
+            # Last-Modified tiene resolución de segundos: dos versiones en el
+            # mismo segundo no pueden compartir fecha
+            if _ultima[1] is not None and ahora <= _ultima[1]:
+                ahora = _ultima[1] + timedelta(seconds=1)
+            _ultima = (version, ahora)
+        return _ultima[1]
+
+
+def etag_actual(version):
+    """ETag de la request actual: versión de datos, ruta, parámetros y día"""
+    # view_args distingue /api/v1/tickets/5 de /api/v1/tickets/6 (mismo endpoint)
+    partes = (_ARRANQUE, version, request.endpoint, sorted((request.view_args or {}).items()),
+              date.today().isoformat(), sorted(request.args.items(multi=True)))
+    return hashlib.sha1(repr(partes).encode()).hexdigest()[:20]
+
+
+def respuesta_condicional(vista):
+    """
+    Decorador para vistas GET cuyo resultado depende solo de los datos y de
+    los parámetros de la URL. El Cache-Control sale de config.CACHE_CONTROL
+    según el endpoint.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        # Con mensajes flash pendientes la página no es la misma que la cacheada
+        if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+            return vista(*args, **kwargs)
+        try:
+            with obtener_conexion_lectura() as conn:
+                version = version_datos(conn)
+        except sqlite3.Error:
+            return vista(*args, **kwargs)
+
+        etag = etag_actual(version)
+        modificado = _ultima_modificacion(version)
+        # If-None-Match manda; If-Modified-Since solo si el cliente no envió ETag
+        if request.if_none_match:
+            sin_cambios = request.if_none_match.contains_weak(etag)
+        else:
+            sin_cambios = request.if_modified_since is not None and modificado <= request.if_modified_since
+
+        respuesta = make_response('', 304) if sin_cambios else make_response(vista(*args, **kwargs))
+        if respuesta.status_code in (200, 304):
+            respuesta.set_etag(etag, weak=True)
+            respuesta.last_modified = modificado
+            respuesta.headers['Cache-Control'] = CACHE_CONTROL.get(request.endpoint, CACHE_CONTROL_POR_DEFECTO)
+        return respuesta
+    return envoltura
@@ -18,6 +18,121 @@ ACTUALIZAR_ID, ACTUALIZAR_ESTADO, ACTUALIZAR_RESUELTO_POR, ACTUALIZAR_FECHA = ra
 # Lista de empleados
 EMPLEADOS = ['Tomas', 'Norela', 'Nahuel', 'Adrian', 'Marcelo', 'Chloe']
 
+# Otras formas de escribir a un empleado en 'resuelto_por' -> nombre de EMPLEADOS
+# (mayúsculas y acentos ya se ignoran). Ej: {'tomi': 'Tomas'}
+# Tras cambiarlo: python mantenimiento.py verificar --reparar
+ALIAS_EMPLEADOS = {}
+
 # Paths de base de datos
 DB_PATH = (r'\\16.1.1.118\db\datosReportes.db')
 DB_OFICINAS_PATH = r'\\16.1.1.118\db\OficinasCne.db'
+
+# Pool de conexiones a la BD de reportes
+POOL_TAMANO = 6              # Conexiones máximas abiertas (threads de Waitress + bot)
+POOL_TIMEOUT = 10            # Segundos esperando una conexión libre antes de fallar
+POOL_VERIFICAR_CADA = 30     # Segundos de inactividad tras los cuales se verifica la conexión
+
+# PRAGMAs aplicados a cada conexión nueva (en este orden)
+# journal_mode WAL y mmap no son seguros sobre recursos compartidos SMB
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'TRUNCATE',
+    'synchronous': 'FULL',
+    'cache_size': -8000,     # Negativo = KiB (8 MB)
+    'mmap_size': 0,
+    'temp_store': 'MEMORY',
+}
+
+# Catálogo de oficinas (cache en memoria)
+CATALOGO_VERIFICAR_CADA = 60   # Segundos entre chequeos de cambios en OficinasCne.db
+
+# Réplica local de solo lectura (None = desactivada, todo se lee del recurso de red)
+# Ejemplo: r'C:\reportes\replica_datosReportes.db' (disco local, nunca un share)
+REPLICA_LOCAL_PATH = None
+REPLICA_SINCRONIZAR_CADA = 5          # Segundos entre resincronizaciones en segundo plano
+REPLICA_RETENCION_CAMBIOS_HORAS = 24  # Antigüedad máxima del registro 'cambios' (lo purga el escritor)
+REPLICA_PRAGMAS = {
+    'busy_timeout': 5000,
+    'cache_size': -8000,
+    'temp_store': 'MEMORY',
+    'query_only': 1,       # Las conexiones de lectura nunca escriben la réplica
+}
+
+# Escritor único (todas las escrituras pasan por un thread con una sola conexión)
+ESCRITOR_VENTANA = 0.01      # Segundos que se espera a juntar más trabajos en el mismo lote
+ESCRITOR_LOTE_MAX = 50       # Trabajos máximos por transacción
+ESCRITOR_TIMEOUT = 30        # Segundos que una request espera el resultado de su escritura
+ESCRITOR_REINTENTOS = 3      # Reintentos del lote si BEGIN/COMMIT falla por lock
+ESCRITOR_PURGAR_CAMBIOS_CADA = 3600  # Segundos entre purgas del registro 'cambios'
+
+# Precálculo de estadísticas y reportes del bot en segundo plano (planificador.py)
+PLANIFICADOR_DEBOUNCE = 1.0         # Segundos sin escrituras nuevas antes de recalcular
+PLANIFICADOR_DEMORA_MAX = 10        # Con escrituras continuas, recalcular igual cada tantos segundos
+PLANIFICADOR_VERIFICAR_CADA = 30    # Segundos entre chequeos de cambios hechos por otros procesos
+
+# Cache-Control de las vistas con ETag (condicional.py), por endpoint de Flask.
+# 'no-cache' = el navegador guarda la copia pero pregunta siempre (304 si no cambió);
+# con max-age la reutiliza sin preguntar durante esos segundos aunque haya cambios
+CACHE_CONTROL_POR_DEFECTO = 'private, no-cache'
+CACHE_CONTROL = {
+    'index': 'private, no-cache',
+    'estadisticas': 'private, no-cache',
+    'api_estadisticas': 'private, no-cache',
+    'api_tendencias': 'private, max-age=60',
+    'api_resolucion': 'private, no-cache',
+    'api_series': 'private, no-cache',
+    'ultima_actualizacion': 'private, no-cache',
+    'api_tickets': 'private, no-cache',
+    'api_ticket': 'private, no-cache',
+    'api_ticket_comentarios': 'private, no-cache',
+}
+
+# Archivos estáticos (estaticos.py)
+ESTATICOS_CACHE_CONTROL = 'public, max-age=31536000, immutable'   # URLs con huella de contenido
+ESTATICOS_CACHE_CONTROL_SIN_HUELLA = 'public, max-age=3600'      # Las pedidas sin huella (fuentes desde el CSS)
+ESTATICOS_COMPRIMIBLES = ('.css', '.js', '.svg', '.ico', '.json', '.map')
+
+# Compresión gzip de HTML y JSON generados (compresion.py)
+COMPRESION_MIN_BYTES = 1024  # Respuestas más chicas van sin comprimir
+COMPRESION_NIVEL = 6
+COMPRESION_TIPOS = ('text/html', 'application/json', 'text/plain')
+
+# Threads de Waitress (app_produccion.py): una conexión de /api/eventos ocupa
+# un thread hasta SSE_DURACION segundos, así que tienen su propio cupo y no
+# le sacan threads a páginas, APIs y descargas
+WAITRESS_HILOS_REQUESTS = 4  # Para todo lo que no es /api/eventos
+WAITRESS_HILOS_SSE = 8       # Pantallas con avisos al instante; las demás reintentan cada SSE_REINTENTO_OCUPADO_MS
+WAITRESS_HILOS = WAITRESS_HILOS_REQUESTS + WAITRESS_HILOS_SSE
+
+# Eventos en vivo del listado (/api/eventos, notificador.py)
+SSE_BUFFER = 500             # Eventos recientes guardados para retomar con Last-Event-ID
+SSE_LATIDO = 15              # Segundos entre comentarios de keep-alive (y chequeos de cambios externos)
+SSE_DURACION = 50            # Segundos que dura cada conexión antes de que el navegador reconecte
+SSE_MAX_CONEXIONES = WAITRESS_HILOS_SSE   # Conexiones abiertas a la vez (cada una ocupa un thread de Waitress)
+SSE_REINTENTO_MS = 1000      # Espera del navegador antes de reconectar
+SSE_REINTENTO_OCUPADO_MS = 5000   # Ídem cuando no había lugar para una conexión abierta
+
+# API JSON de tickets (/api/v1/...)
+API_LIMITE_MAX = 500         # Tickets máximos por página
+
+# /api/series: con más puntos que esto se pasa a semanas o meses
+SERIES_MAX_PUNTOS = 366
+
+# Exportación a Excel (exportador.py)
+EXCEL_LOTE = 1000            # Filas por fetchmany al escribir la planilla
+EXCEL_TROZO = 64 * 1024      # Bytes por trozo al enviar el archivo
+EXCEL_ANCHO_MAX = 50         # Ancho máximo de columna
+
+# Exportación CSV / NDJSON (/api/exportar)
+EXPORTAR_LOTE = 500          # Filas por fetchmany (y por trozo enviado)
+EXPORTAR_GZIP_NIVEL = 6      # Nivel de compresión cuando el cliente acepta gzip
+
+# Cache en disco de exportaciones ya generadas (artefactos.py)
+ARTEFACTOS_DIR = None            # None = carpeta 'reportes_artefactos' en el temporal del sistema
+ARTEFACTOS_MAX_MB = 200          # Tamaño total máximo; se borran primero los menos usados
+ARTEFACTOS_EDAD_MAX = 24 * 3600  # Segundos sin usarse tras los cuales se borra un archivo
+
+# Exportaciones en segundo plano (trabajos.py)
+TRABAJOS_BD_PATH = None          # SQLite local con estado y avance; None = 'reportes_trabajos.db' en el temporal
+TRABAJOS_HILOS = 1               # Exportaciones que se arman a la vez (aparte de los threads de Waitress)
+TRABAJOS_MAX_PENDIENTES = 4      # Trabajos en cola o en curso antes de rechazar nuevos
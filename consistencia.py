@@ -0,0 +1,125 @@
+"""
+Verificación de datos desnormalizados (contadores, resoluciones) contra su origen
+Se usa desde mantenimiento.py (python mantenimiento.py verificar [--reparar]).
+"""
+from migraciones import (
+    AGREGADOS, reconstruir_agregados, sql_agregado, sql_contadores_comentarios,
+    reconstruir_resumen_eventos, sql_resumen_eventos
+)
+from operaciones import sincronizar_resoluciones
+from utils import tecnicos_de
+
+
+def verificar_contadores_comentarios(conn, reparar=False):
+    """
+    Compara datos.num_comentarios / ultimo_comentario con lo que hay en
+    comentarios. Devuelve [(id, guardado, real), ...]; con reparar=True
+    además corrige las filas que difieren.
+    """
+    num, ultimo = sql_contadores_comentarios('d.id')
+    diferencias = conn.execute(f"""
+        SELECT id, guardado_num, guardado_ultimo, real_num, real_ultimo FROM (
+            SELECT d.id,
+                   d.num_comentarios AS guardado_num, d.ultimo_comentario AS guardado_ultimo,
+                   {num} AS real_num, {ultimo} AS real_ultimo
+            FROM datos d
+        )
+        WHERE guardado_num IS NOT real_num OR guardado_ultimo IS NOT real_ultimo
+    """).fetchall()
+
+    if reparar and diferencias:
+        num, ultimo = sql_contadores_comentarios('datos.id')
+        conn.executemany(
+            f"UPDATE datos SET num_comentarios = {num}, ultimo_comentario = {ultimo} WHERE id = ?",
+            [(fila[0],) for fila in diferencias]
+        )
+        conn.commit()
+
+    return [(id_reporte, (g_num, g_ult), (r_num, r_ult))
+            for id_reporte, g_num, g_ult, r_num, r_ult in diferencias]
+
+
+def verificar_resoluciones(conn, reparar=False):
+    """
+    Compara la tabla resoluciones con datos.resuelto_por / fecha_resolucion
+    (o fecha_creacion si no está resuelto, ver sincronizar_resoluciones)
+    (p. ej. tras editar ALIAS_EMPLEADOS o escribir datos por fuera de la app).
+    Devuelve [(id, guardado, esperado), ...]
+    """
+    guardado = {}
+    for id_reporte, tecnico, fecha in conn.execute("SELECT reporte_id, tecnico, fecha FROM resoluciones"):
+        guardado.setdefault(id_reporte, set()).add((tecnico, fecha))
+
+    esperado = {}
+    for id_reporte, resuelto_por, fecha in conn.execute("SELECT id, resuelto_por, COALESCE(fecha_resolucion, fecha_creacion) FROM datos"):
+        tecnicos = tecnicos_de(resuelto_por)
+        if tecnicos:
+            esperado[id_reporte] = {(t, fecha) for t in tecnicos}
+
+    diferencias = [
+        (id_reporte, sorted(guardado.get(id_reporte, ())), sorted(esperado.get(id_reporte, ())))
+        for id_reporte in sorted(guardado.keys() | esperado.keys())
+        if guardado.get(id_reporte) != esperado.get(id_reporte)
+    ]
+
+    if reparar and diferencias:
+        for id_reporte, _, _ in diferencias:
+            sincronizar_resoluciones(conn, id_reporte)
+        conn.commit()
+    return diferencias
+
+
+def verificar_agregados(conn, reparar=False):
+    """
+    Compara cada tabla agregada (agg_*) con el GROUP BY de su origen.
+    Devuelve [('tabla clave', guardado, real), ...]; reparar reconstruye todas.
+    """
+    diferencias = []
+    for nombre, (origen, _) in AGREGADOS.items():
+        columnas, expresiones = sql_agregado(nombre, origen)
+        guardado = {fila[:-1]: fila[-1] for fila in conn.execute(
+            f"SELECT {', '.join(columnas)}, total FROM {nombre}")}
+        real = {fila[:-1]: fila[-1] for fila in conn.execute(
+            f"SELECT {', '.join(expresiones)}, COUNT(*) FROM {origen} GROUP BY {', '.join(expresiones)}")}
+        for clave in sorted(guardado.keys() | real.keys(), key=str):
+            if guardado.get(clave) != real.get(clave):
+                diferencias.append((f"{nombre} {clave}", guardado.get(clave), real.get(clave)))
+
+    if reparar and diferencias:
+        reconstruir_agregados(conn)
+        conn.commit()
+    return diferencias
+
+
+def verificar_resumen_eventos(conn, reparar=False):
+    """
+    Compara tiempos_resolucion y backlog_dia con lo que da recorrer eventos.
+    Devuelve [('tabla clave', guardado, real), ...]; reparar reconstruye ambas.
+    """
+    diferencias = []
+    for tabla, consulta in sql_resumen_eventos().items():
+        # Columnas de la clave primaria primero; las sumas se redondean para
+        # no reportar diferencias de coma flotante
+        columnas_clave = sum(1 for fila in conn.execute(f"PRAGMA table_info({tabla})") if fila[5])
+        guardado, real = {}, {}
+        for destino, filas in ((guardado, conn.execute(f"SELECT * FROM {tabla}")), (real, conn.execute(consulta))):
+            for fila in filas:
+                destino[tuple(fila[:columnas_clave])] = tuple(
+                    round(v, 6) if isinstance(v, float) else v for v in fila[columnas_clave:])
+        for clave in sorted(guardado.keys() | real.keys(), key=str):
+            if guardado.get(clave) != real.get(clave):
+                diferencias.append((f"{tabla} {clave}", guardado.get(clave), real.get(clave)))
+
+    if reparar and diferencias:
+        reconstruir_resumen_eventos(conn)
+        conn.commit()
+    return diferencias
+
+
+# nombre -> función(conn, reparar) que devuelve la lista de diferencias
+VERIFICACIONES = {
+    'contadores de comentarios': verificar_contadores_comentarios,
+    'resoluciones por técnico': verificar_resoluciones,
+    'tablas agregadas': verificar_agregados,
+    'resúmenes de eventos': verificar_resumen_eventos,
+}
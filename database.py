@@ -1,12 +1,233 @@
 """
 Manejo de conexiones a base de datos
 """
+import queue
 import sqlite3
-from config import DB_PATH, DB_OFICINAS_PATH
+import threading
+import time
+from contextlib import contextmanager
+import catalogo
+from config import (
+    DB_PATH, DB_OFICINAS_PATH, POOL_TAMANO, POOL_TIMEOUT,
+    POOL_VERIFICAR_CADA, SQLITE_PRAGMAS, REPLICA_LOCAL_PATH,
+    REPLICA_SINCRONIZAR_CADA, REPLICA_PRAGMAS
+)
+from replica import ReplicaLocal
 
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite compartido entre threads (Waitress + bot).
+    Las conexiones se abren una sola vez con sus PRAGMAs y se reutilizan,
+    así el handshake con el recurso de red queda fuera de cada request.
+    """
+
+    def __init__(self, ruta, tamano=POOL_TAMANO, pragmas=None,
+                 timeout=POOL_TIMEOUT, verificar_cada=POOL_VERIFICAR_CADA):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self.verificar_cada = verificar_cada
+        # LIFO: se reutiliza primero la conexión usada más recientemente
+        self._libres = queue.LifoQueue()
+        self._abiertas = 0
+        self._lock = threading.Lock()
+
+    def _crear(self):
+        conn = sqlite3.connect(self.ruta, timeout=self.timeout, check_same_thread=False)
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return conn
+
+    def _descartar(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._abiertas -= 1
+
+    def _esta_sana(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def obtener(self):
+        """Saca una conexión del pool (o abre una nueva si hay lugar)"""
+        while True:
+            try:
+                conn, ultimo_uso = self._libres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    puede_crear = self._abiertas < self.tamano
+                    if puede_crear:
+                        self._abiertas += 1
+                if puede_crear:
+                    try:
+                        return self._crear()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._abiertas -= 1
+                        raise
+                try:
+                    conn, ultimo_uso = self._libres.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Pool agotado: {self.tamano} conexiones en uso durante {self.timeout}s"
+                    )
+
+            # Health check solo si la conexión estuvo inactiva un rato
+            if time.monotonic() - ultimo_uso < self.verificar_cada or self._esta_sana(conn):
+                return conn
+            self._descartar(conn)
+
+    def devolver(self, conn, descartar=False):
+        """Devuelve una conexión al pool"""
+        if descartar:
+            self._descartar(conn)
+        else:
+            self._libres.put((conn, time.monotonic()))
+
+    @contextmanager
+    def conexion(self):
+        """
+        Context manager: confirma la transacción al salir sin errores,
+        hace rollback si hay una excepción y devuelve la conexión al pool.
+        """
+        conn = self.obtener()
+        descartar = False
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                # La conexión quedó inutilizable (p. ej. se cayó el recurso de red)
+                descartar = True
+            raise
+        finally:
+            self.devolver(conn, descartar=descartar)
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres"""
+        while True:
+            try:
+                conn, _ = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
+
+    def estado(self):
+        """Resumen del pool para diagnóstico"""
+        return {
+            'tamano': self.tamano,
+            'abiertas': self._abiertas,
+            'libres': self._libres.qsize(),
+        }
+
+
+_pool = PoolConexiones(DB_PATH, pragmas=SQLITE_PRAGMAS)
+
+# Réplica local opcional: las lecturas van a disco local, las escrituras al share
+_replica = None
+_pool_replica = None
+if REPLICA_LOCAL_PATH:
+    _replica = ReplicaLocal(
+        REPLICA_LOCAL_PATH, _pool.conexion,
+        sincronizar_cada=REPLICA_SINCRONIZAR_CADA
+    )
+    _pool_replica = PoolConexiones(REPLICA_LOCAL_PATH, pragmas=REPLICA_PRAGMAS)
+
+# Funciones llamadas después de cada commit que escribió algo
+_al_escribir = []
+
+
+def registrar_al_escribir(funcion):
+    """Registra una función sin argumentos a llamar tras cada escritura confirmada"""
+    _al_escribir.append(funcion)
+
+
+def notificar_escritura():
+    for funcion in _al_escribir:
+        try:
+            funcion()
+        except Exception as e:
+            print(f"⚠️ Error en callback post-escritura {funcion.__name__}: {e}")
+
+
+@contextmanager
 def obtener_conexion():
-    """Conexión a la BD local de reportes"""
-    return sqlite3.connect(DB_PATH)
+    """
+    Conexión a la BD de reportes tomada del pool (lectura y escritura).
+    Uso: with obtener_conexion() as conn: ...
+    """
+    escribio = False
+    with _pool.conexion() as conn:
+        cambios_antes = conn.total_changes
+        yield conn
+        escribio = conn.total_changes != cambios_antes
+    # Ya confirmada la transacción
+    if escribio:
+        notificar_escritura()
+
+
+def obtener_conexion_lectura():
+    """
+    Conexión para consultas de solo lectura. Con la réplica local activa y
+    sincronizada lee del disco local; si no, usa la BD remota.
+    Uso: with obtener_conexion_lectura() as conn: ...
+    """
+    if _replica is not None and _replica.lista:
+        return _pool_replica.conexion()
+    return _pool.conexion()
+
+
+def version_datos(conn):
+    """
+    Identifica el estado de los datos: cambia con cada escritura en datos o
+    comentarios (el seq del registro 'cambios' nunca retrocede). Incluye el
+    archivo porque réplica y BD remota numeran sus cambios por separado.
+    """
+    fila = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios'").fetchone()
+    archivo = conn.execute("PRAGMA database_list").fetchone()[2]
+    return (archivo, fila[0] if fila else 0)
+
+
+def estado_pool():
+    """Estado del pool de conexiones de reportes"""
+    return _pool.estado()
+
+
+def estado_replica():
+    """Estado de la réplica local (None si está desactivada)"""
+    if _replica is None:
+        return None
+    return dict(_replica.estado(), pool=_pool_replica.estado())
+
+
+def inicializar_base_datos():
+    """
+    Se llama una vez al arrancar: aplica migraciones pendientes, asegura
+    los índices, avisa si alguna consulta caliente hace full scan y
+    arranca la réplica local si está configurada.
+    """
+    from migraciones import aplicar_migraciones
+    from esquema import asegurar_indices, verificar_planes
+    with obtener_conexion() as conn:
+        aplicar_migraciones(conn)
+        asegurar_indices(conn)
+        verificar_planes(conn)
+
+    if _replica is not None:
+        _replica.iniciar()
+        # Write-through: lo escrito en el share se aplica enseguida en local
+        registrar_al_escribir(_replica.sincronizar)
+        print(f"💾 Réplica local: {REPLICA_LOCAL_PATH}")
 
 def obtener_conexion_oficinas():
     """Conexión a la BD remota de oficinas"""
@@ -17,29 +238,9 @@ def obtener_conexion_oficinas():
         return None
 
 def obtener_pisos_disponibles():
-    """Obtiene lista de pisos únicos"""
-    try:
-        conn_oficinas = obtener_conexion_oficinas()
-        if conn_oficinas:
-            cur = conn_oficinas.cursor()
-            cur.execute("SELECT DISTINCT piso FROM oficinas ORDER BY piso")
-            pisos = [str(p[0]) for p in cur.fetchall()]
-            conn_oficinas.close()
-            return pisos
-    except:
-        pass
-    return ['1', '2', '3', '4', '5']
+    """Obtiene lista de pisos únicos (desde el catálogo en cache)"""
+    return catalogo.pisos_disponibles()
 
 def obtener_oficinas_por_piso(piso):
-    """Obtiene oficinas de un piso específico"""
-    try:
-        conn_oficinas = obtener_conexion_oficinas()
-        if conn_oficinas:
-            cur = conn_oficinas.cursor()
-            cur.execute("SELECT nombre_oficina FROM oficinas WHERE piso = ? ORDER BY nombre_oficina", (piso,))
-            oficinas = [o[0] for o in cur.fetchall()]
-            conn_oficinas.close()
-            return oficinas
-    except:
-        pass
-    return []
+    """Obtiene oficinas de un piso específico (desde el catálogo en cache)"""
+    return catalogo.oficinas_por_piso(piso)
@@ -0,0 +1,196 @@
+"""
+Escritor único de la BD de reportes
+
+Todas las escrituras (web y bot) pasan por un thread dedicado que es dueño
+de la única conexión de escritura. Los trabajos que llegan juntos se
+confirman en una sola transacción (un único lock + fsync sobre el share),
+cada uno dentro de su SAVEPOINT para que el error de uno no arrastre al resto.
+
+Uso:
+    nuevo_id = escritor.ejecutar(operaciones.crear_reporte, ...)          # Flask
+    nuevo_id = await escritor.ejecutar_async(operaciones.crear_reporte, ...)  # bot
+"""
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from config import (
+    DB_PATH, SQLITE_PRAGMAS, ESCRITOR_VENTANA, ESCRITOR_LOTE_MAX,
+    ESCRITOR_TIMEOUT, ESCRITOR_REINTENTOS, ESCRITOR_PURGAR_CAMBIOS_CADA,
+    REPLICA_RETENCION_CAMBIOS_HORAS
+)
+from database import PoolConexiones, notificar_escritura
+
+
+class Escritor:
+    """Thread que agrupa trabajos de escritura en transacciones por lote"""
+
+    def __init__(self, ruta, ventana=ESCRITOR_VENTANA, lote_max=ESCRITOR_LOTE_MAX,
+                 reintentos=ESCRITOR_REINTENTOS, purgar_cada=ESCRITOR_PURGAR_CAMBIOS_CADA,
+                 retencion_horas=REPLICA_RETENCION_CAMBIOS_HORAS):
+        # Pool de una sola conexión: reconexión y health check del pool normal
+        self._pool = PoolConexiones(ruta, tamano=1, pragmas=SQLITE_PRAGMAS)
+        self.ventana = ventana
+        self.lote_max = lote_max
+        self.reintentos = reintentos
+        self.purgar_cada = purgar_cada
+        self.retencion_horas = retencion_horas
+        self._ultima_purga = None
+        self._cola = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Métricas
+        self.lotes = 0
+        self.trabajos = 0
+        self.errores = 0
+        self.lote_maximo = 0
+        self.ultima_latencia = 0.0     # ms desde BEGIN hasta COMMIT
+        self._latencia_total = 0.0
+        self.espera_maxima = 0.0       # ms que un trabajo pasó en cola
+
+    def _asegurar_iniciado(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._bucle, name='escritor-bd', daemon=True)
+                    self._thread.start()
+
+    def enviar(self, funcion, *args, **kwargs):
+        """Encola funcion(conn, *args, **kwargs); devuelve un Future con su resultado"""
+        self._asegurar_iniciado()
+        futuro = Future()
+        self._cola.put((funcion, args, kwargs, futuro, time.monotonic()))
+        return futuro
+
+    def _tomar_lote(self):
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.ventana
+        while len(lote) < self.lote_max:
+            try:
+                lote.append(self._cola.get(timeout=max(0, limite - time.monotonic())))
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while True:
+            lote = self._tomar_lote()
+            try:
+                self._procesar(lote)
+            except Exception as e:
+                # Nunca debe morir el thread: los trabajos fallan y se sigue
+                print(f"⚠️ Escritor: error inesperado en lote de {len(lote)}: {e}")
+                for *_, futuro, _ in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+            if self._ultima_purga is None or time.monotonic() - self._ultima_purga > self.purgar_cada:
+                self._purgar_cambios()
+
+    def _procesar(self, lote):
+        inicio_lote = time.monotonic()
+        self.espera_maxima = max(self.espera_maxima, *((inicio_lote - t) * 1000 for *_, t in lote))
+
+        for intento in range(self.reintentos + 1):
+            resultados = []
+            try:
+                inicio = time.monotonic()
+                with self._pool.conexion() as conn:
+                    cambios_antes = conn.total_changes
+                    conn.execute("BEGIN IMMEDIATE")
+                    for funcion, args, kwargs, futuro, _ in lote:
+                        conn.execute("SAVEPOINT trabajo")
+                        try:
+                            resultados.append((futuro, funcion(conn, *args, **kwargs), None))
+                            conn.execute("RELEASE trabajo")
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO trabajo")
+                            conn.execute("RELEASE trabajo")
+                            resultados.append((futuro, None, e))
+                    escribio = conn.total_changes != cambios_antes
+                break
+            except sqlite3.OperationalError as e:
+                # BEGIN/COMMIT sin lock tras busy_timeout, o se cayó el share
+                if intento == self.reintentos:
+                    self.errores += len(lote)
+                    print(f"⚠️ Escritor: lote de {len(lote)} descartado tras {intento + 1} intentos: {e}")
+                    for *_, futuro, _ in lote:
+                        futuro.set_exception(e)
+                    return
+                time.sleep(0.1 * 2 ** intento)
+
+        latencia = (time.monotonic() - inicio) * 1000
+        self.lotes += 1
+        self.trabajos += len(lote)
+        self.lote_maximo = max(self.lote_maximo, len(lote))
+        self.ultima_latencia = latencia
+        self._latencia_total += latencia
+
+        # Antes de entregar los resultados: quien lea justo después de su
+        # escritura tiene que encontrarla también en la réplica local
+        if escribio:
+            notificar_escritura()
+
+        # Recién confirmado el COMMIT (y aplicado en la réplica) se entregan los resultados
+        for futuro, resultado, error in resultados:
+            if error is not None:
+                self.errores += 1
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
+
+    def _purgar_cambios(self):
+        """
+        Borra del registro 'cambios' lo más viejo que la retención. Se hace
+        acá y no en la réplica porque el registro crece con cada escritura,
+        haya o no réplica local configurada.
+        """
+        self._ultima_purga = time.monotonic()
+        limite = (datetime.utcnow() - timedelta(hours=self.retencion_horas)).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with self._pool.conexion() as conn:
+                borrados = conn.execute("DELETE FROM cambios WHERE momento < ?", (limite,)).rowcount
+            if borrados:
+                print(f"🧹 Escritor: {borrados} cambios anteriores a {limite} UTC purgados")
+        except sqlite3.Error as e:
+            print(f"⚠️ Escritor: error al purgar cambios: {e}")
+
+    def estado(self):
+        return {
+            'en_cola': self._cola.qsize(),
+            'lotes': self.lotes,
+            'trabajos': self.trabajos,
+            'errores': self.errores,
+            'lote_maximo': self.lote_maximo,
+            'trabajos_por_lote': round(self.trabajos / self.lotes, 2) if self.lotes else 0,
+            'latencia_ultima_ms': round(self.ultima_latencia, 1),
+            'latencia_promedio_ms': round(self._latencia_total / self.lotes, 1) if self.lotes else 0,
+            'espera_maxima_ms': round(self.espera_maxima, 1),
+        }
+
+
+_escritor = Escritor(DB_PATH)
+
+
+def enviar(funcion, *args, **kwargs):
+    """Encola una escritura sin esperar; devuelve un concurrent.futures.Future"""
+    return _escritor.enviar(funcion, *args, **kwargs)
+
+
+def ejecutar(funcion, *args, **kwargs):
+    """Encola una escritura y espera el resultado (threads de Flask)"""
+    return _escritor.enviar(funcion, *args, **kwargs).result(timeout=ESCRITOR_TIMEOUT)
+
+
+async def ejecutar_async(funcion, *args, **kwargs):
+    """Igual que ejecutar() pero sin bloquear el event loop (bot)"""
+    futuro = asyncio.wrap_future(_escritor.enviar(funcion, *args, **kwargs))
+    return await asyncio.wait_for(futuro, ESCRITOR_TIMEOUT)
+
+
+def estado_escritor():
+    """Métricas del escritor: cola, lotes y latencia de commit"""
+    return _escritor.estado()
@@ -0,0 +1,152 @@
+"""
+Índices requeridos por la app y verificación de planes de consulta
+Se ejecuta al arrancar (ver database.inicializar_base_datos).
+"""
+import re
+import sqlite3
+from busqueda import fts_disponible
+
+# nombre -> definición. Si el índice existe con otra definición se recrea.
+INDICES = {
+    # Fechas ISO (creados por la migración 1, se verifican igual)
+    'idx_datos_fecha_creacion': "CREATE INDEX idx_datos_fecha_creacion ON datos(fecha_creacion)",
+    'idx_datos_fecha_resolucion': "CREATE INDEX idx_datos_fecha_resolucion ON datos(fecha_resolucion)",
+    # Filtros del listado (index) y comandos del bot; el rowid va implícito al final
+    'idx_datos_estado_piso': "CREATE INDEX idx_datos_estado_piso ON datos(estado, piso)",
+    'idx_datos_piso': "CREATE INDEX idx_datos_piso ON datos(piso)",
+    # Parcial: solo tickets abiertos, recorrido por id para /actualizar y /pendientes.
+    # Para usarlo la consulta debe incluir literalmente estado != 'resuelto'
+    'idx_datos_abiertos': "CREATE INDEX idx_datos_abiertos ON datos(id, estado) WHERE estado != 'resuelto'",
+    # Cubre el conteo de comentarios por reporte y el listado ordenado por fecha
+    'idx_comentarios_reporte': "CREATE INDEX idx_comentarios_reporte ON comentarios(reporte_id, fecha)",
+    # Rankings de técnicos: total por técnico y rangos de fecha (migración 5)
+    'idx_resoluciones_tecnico': "CREATE INDEX idx_resoluciones_tecnico ON resoluciones(tecnico, fecha)",
+    'idx_resoluciones_fecha': "CREATE INDEX idx_resoluciones_fecha ON resoluciones(fecha, tecnico)",
+}
+
+# Consultas calientes de la app: (nombre, sql, parámetros de ejemplo[, índices
+# cuyo recorrido completo es aceptable para esa consulta])
+CONSULTAS_CALIENTES = [
+    ('index: filtro estado + piso',
+     "SELECT id FROM datos WHERE estado = ? AND piso = ? ORDER BY id DESC LIMIT 50",
+     ('pendiente', 1)),
+    ('index: filtro piso',
+     "SELECT id FROM datos WHERE piso = ? ORDER BY id DESC LIMIT 50",
+     (1,)),
+    ('index: página siguiente (cursor)',
+     "SELECT id FROM datos WHERE estado = ? AND id < ? ORDER BY id DESC LIMIT 51",
+     ('resuelto', 1000)),
+    ('index: pisos disponibles',
+     "SELECT DISTINCT piso FROM datos ORDER BY piso",
+     (), {'idx_datos_piso'}),
+    ('index: búsqueda de texto (FTS5)',
+     "SELECT d.id FROM datos_fts JOIN datos d ON d.id = datos_fts.rowid "
+     "WHERE datos_fts MATCH ? ORDER BY bm25(datos_fts), d.id DESC LIMIT 50",
+     ('"impresora"*',)),
+    ('editar: comentarios del reporte',
+     "SELECT id, reporte_id, comentario, autor, fecha FROM comentarios WHERE reporte_id = ? ORDER BY fecha DESC",
+     (1,)),
+    ('actualizar / bot /actualizar: tickets abiertos',
+     "SELECT id, piso, oficina, quien, razon, estado FROM datos WHERE estado != 'resuelto' ORDER BY id DESC LIMIT 10",
+     ()),
+    ('actualizar / api/v1/tickets: varios estados abiertos',
+     "SELECT id FROM datos WHERE estado != 'resuelto' AND estado IN (?, ?) ORDER BY id DESC LIMIT 501",
+     ('pendiente', 'en proceso')),
+    ('bot /pendientes',
+     "SELECT id, piso, oficina, quien, razon, fecha FROM datos "
+     "WHERE estado != 'resuelto' AND estado = 'pendiente' ORDER BY id DESC LIMIT 10",
+     ()),
+    ('bot /hoy',
+     "SELECT id FROM datos WHERE fecha_creacion = ? OR fecha_resolucion = ?",
+     ('2025-01-01', '2025-01-01')),
+    ('bot /semana',
+     "SELECT estado, SUM(total) FROM agg_dia WHERE fecha >= ? GROUP BY estado",
+     ('2025-01-01',)),
+    ('bot /semana: empleado de la semana',
+     "SELECT tecnico, SUM(total) AS total FROM agg_tecnico_dia WHERE fecha >= ? "
+     "GROUP BY tecnico ORDER BY total DESC, tecnico LIMIT 1",
+     ('2025-01-01',)),
+    # El resto de /estadisticas recorre tablas agg_* enteras a propósito: su
+    # tamaño depende de días/oficinas/técnicos, no de la cantidad de tickets
+]
+
+# 'SCAN datos' / 'SCAN TABLE datos' (SQLite < 3.36 agrega TABLE), con o sin
+# índice: recorrer un índice completo sigue siendo O(tabla)
+_RE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?$')
+
+
+def _normalizar(sql):
+    sql = re.sub(r'\s+', ' ', sql or '').strip()
+    return sql.replace('IF NOT EXISTS ', '')
+
+
+def asegurar_indices(conn, verbose=True):
+    """
+    Crea los índices que falten y recrea los que difieran de la definición.
+    Idempotente: si todo está al día no escribe nada.
+    """
+    existentes = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    ).fetchall())
+
+    cambios = []
+    for nombre, definicion in INDICES.items():
+        actual = existentes.get(nombre)
+        if actual is not None and _normalizar(actual) == _normalizar(definicion):
+            continue
+        if actual is not None:
+            conn.execute(f"DROP INDEX {nombre}")
+            cambios.append(f"recreado {nombre}")
+        else:
+            cambios.append(f"creado {nombre}")
+        conn.execute(definicion)
+
+    if cambios:
+        conn.commit()
+        conn.execute("PRAGMA optimize")
+        if verbose:
+            for cambio in cambios:
+                print(f"🗂️ Índice {cambio}")
+    return cambios
+
+
+def full_scans(conn, sql, params=(), permitidos=()):
+    """
+    Tablas que la consulta recorre completas según EXPLAIN QUERY PLAN.
+    No cuenta los índices parciales (ya están acotados) ni los permitidos.
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    tablas = []
+    for fila in plan:
+        match = _RE_FULL_SCAN.match(fila[-1])
+        if not match:
+            continue
+        tabla, indice = match.groups()
+        if indice and (indice in permitidos or ' WHERE ' in INDICES.get(indice, '')):
+            continue
+        tablas.append(f"{tabla} ({indice})" if indice else tabla)
+    return tablas
+
+
+def verificar_planes(conn, consultas=CONSULTAS_CALIENTES, verbose=True):
+    """
+    Corre EXPLAIN QUERY PLAN sobre las consultas calientes y avisa las que
+    hacen full scan. Devuelve [(nombre, [tablas]), ...] con los problemas.
+    """
+    problemas = []
+    sin_fts = not fts_disponible(conn)
+    for nombre, sql, params, *permitidos in consultas:
+        if sin_fts and 'datos_fts' in sql:
+            continue    # Sin FTS5 la búsqueda usa LIKE (migración 3 omitida)
+        try:
+            tablas = full_scans(conn, sql, params, permitidos[0] if permitidos else ())
+        except sqlite3.OperationalError as e:
+            problemas.append((nombre, [str(e)]))
+            if verbose:
+                print(f"⚠️ Plan de consulta: '{nombre}' no se pudo verificar ({e})")
+            continue
+        if tablas:
+            problemas.append((nombre, tablas))
+            if verbose:
+                print(f"⚠️ Plan de consulta: '{nombre}' hace full scan de {', '.join(tablas)}")
+    return problemas
@@ -0,0 +1,227 @@
+"""
+Estadísticas de tickets compartidas por la web y el bot
+Se calculan en una sola pasada sobre las tablas agg_* (migración 6) y se
+cachean por versión de datos y día; cada vista solo les da formato.
+"""
+import json
+from dataclasses import dataclass
+from datetime import date, timedelta
+from cache import CacheVersionada
+from database import obtener_conexion_lectura, version_datos
+from fechas import es_dia_habil
+
+NOMBRES_MESES = {
+    "01": "Enero", "02": "Febrero", "03": "Marzo", "04": "Abril",
+    "05": "Mayo", "06": "Junio", "07": "Julio", "08": "Agosto",
+    "09": "Septiembre", "10": "Octubre", "11": "Noviembre", "12": "Diciembre"
+}
+
+# Días hábiles por mes y por semana para el promedio semanal estimado
+DIAS_HABILES_MES = 21
+DIAS_HABILES_SEMANA = 5
+
+# Una fila por grupo de cada tabla agregada, etiquetada con su origen
+_CONSULTA = """
+    SELECT 'mes', mes, estado, total FROM agg_mes
+    UNION ALL SELECT 'oficina', oficina, NULL, total FROM agg_oficina
+    UNION ALL SELECT 'piso', piso, NULL, total FROM agg_piso
+    UNION ALL SELECT 'dia', fecha, estado, total FROM agg_dia WHERE fecha != ''
+    UNION ALL SELECT 'tecnico', fecha, tecnico, total FROM agg_tecnico_dia
+"""
+
+_cache = CacheVersionada(max_entradas=4)
+
+
+@dataclass(frozen=True)
+class Estadisticas:
+    """Resultado de calcular_estadisticas(); no modificar (se comparte desde el cache)"""
+    hoy: str                  # 'YYYY-MM-DD' del cálculo (la semana depende de él)
+    total: int
+    por_estado: dict          # estado -> cantidad, por nombre de estado
+    por_oficina: tuple        # ((oficina, cantidad), ...) de mayor a menor
+    por_piso: tuple           # ((piso, cantidad), ...) de mayor a menor
+    ranking_tecnicos: tuple   # ((técnico, trabajos), ...), 1 punto por persona
+    por_mes: tuple            # (('YYYY-MM', cantidad), ...) cronológico
+    por_mes_estado: dict      # 'YYYY-MM' -> {estado: cantidad}
+    por_dia: tuple            # (('YYYY-MM-DD', cantidad), ...) últimos 30 días con datos
+    ganadores_por_mes: tuple  # (('YYYY-MM', ((técnico, trabajos), ...)), ...) solo lun-vie, con empates
+    meses_ganados: tuple      # ((técnico, meses ganados), ...) de mayor a menor
+    semana_por_estado: dict   # estado -> cantidad creados en los últimos 7 días
+    empleado_semana: tuple    # (técnico, trabajos) de los últimos 7 días, o None
+
+    @property
+    def meses_activos(self):
+        return len(self.por_mes)
+
+    @property
+    def promedio_mensual(self):
+        return self.total / (self.meses_activos or 1)
+
+    @property
+    def promedio_semanal(self):
+        return self.promedio_mensual / DIAS_HABILES_MES * DIAS_HABILES_SEMANA
+
+    @property
+    def total_semana(self):
+        return sum(self.semana_por_estado.values())
+
+
+def _sumar(conteos, clave, cantidad):
+    conteos[clave] = conteos.get(clave, 0) + cantidad
+
+
+def _de_mayor_a_menor(conteos):
+    # Empates por clave; los números van antes que los textos, como en SQLite
+    return tuple(sorted(conteos.items(), key=lambda x: (-x[1], isinstance(x[0], str), x[0])))
+
+
+def calcular_estadisticas(conn, hoy=None):
+    """Recorre una vez las tablas agregadas y arma el objeto Estadisticas"""
+    hoy = hoy or date.today()
+    desde_semana = (hoy - timedelta(days=7)).isoformat()
+
+    por_estado, por_oficina, por_piso, ranking = {}, {}, {}, {}
+    por_mes, por_mes_estado, por_dia = {}, {}, {}
+    semana_por_estado, semana_tecnicos = {}, {}
+    tecnico_mes = {}  # 'YYYY-MM' -> {técnico: trabajos en días hábiles}
+
+    for origen, clave, detalle, cantidad in conn.execute(_CONSULTA):
+        if origen == 'mes':
+            _sumar(por_estado, detalle, cantidad)
+            if clave:
+                _sumar(por_mes, clave, cantidad)
+                _sumar(por_mes_estado.setdefault(clave, {}), detalle, cantidad)
+        elif origen == 'oficina':
+            por_oficina[clave] = cantidad
+        elif origen == 'piso':
+            por_piso[clave] = cantidad
+        elif origen == 'dia':
+            _sumar(por_dia, clave, cantidad)
+            if clave >= desde_semana:
+                _sumar(semana_por_estado, detalle, cantidad)
+        elif origen == 'tecnico':
+            _sumar(ranking, detalle, cantidad)
+            if clave >= desde_semana:
+                _sumar(semana_tecnicos, detalle, cantidad)
+            if es_dia_habil(clave):
+                _sumar(tecnico_mes.setdefault(clave[:7], {}), detalle, cantidad)
+
+    # Ganador/es de cada mes (todos los empatados en el máximo) y meses ganados
+    ganadores_por_mes = []
+    meses_ganados = {}
+    for mes in sorted(tecnico_mes):
+        conteos = tecnico_mes[mes]
+        maximo = max(conteos.values())
+        ganadores = sorted(((t, n) for t, n in conteos.items() if n == maximo), key=lambda x: x[0].lower())
+        ganadores_por_mes.append((mes, tuple(ganadores)))
+        for tecnico, _ in ganadores:
+            _sumar(meses_ganados, tecnico, 1)
+
+    semana = _de_mayor_a_menor(semana_tecnicos)
+    return Estadisticas(
+        hoy=hoy.isoformat(),
+        total=sum(por_estado.values()),
+        por_estado=dict(sorted(por_estado.items())),
+        por_oficina=_de_mayor_a_menor(por_oficina),
+        por_piso=_de_mayor_a_menor(por_piso),
+        ranking_tecnicos=_de_mayor_a_menor(ranking),
+        por_mes=tuple(sorted(por_mes.items())),
+        por_mes_estado=por_mes_estado,
+        por_dia=tuple(sorted(por_dia.items())[-30:]),
+        ganadores_por_mes=tuple(ganadores_por_mes),
+        # sorted es estable: a igual cantidad queda el orden cronológico
+        meses_ganados=tuple(sorted(meses_ganados.items(), key=lambda x: x[1], reverse=True)),
+        semana_por_estado=semana_por_estado,
+        empleado_semana=semana[0] if semana else None,
+    )
+
+
+def obtener_estadisticas(conn=None):
+    """
+    Estadísticas actuales, recalculadas solo si cambiaron los datos o el día.
+    Sin conn toma una conexión de lectura del pool.
+    """
+    if conn is None:
+        with obtener_conexion_lectura() as conn:
+            return obtener_estadisticas(conn)
+    hoy = date.today()
+    return _cache.obtener(version_datos(conn), hoy, lambda: calcular_estadisticas(conn, hoy))
+
+
+def estado_cache():
+    return _cache.estado()
+
+
+# ==============================
+# Formatos de salida
+# ==============================
+
+def etiqueta_mes(mes):
+    """'2025-03' -> 'Marzo 2025'"""
+    anio, mm = mes.split('-')
+    return f"{NOMBRES_MESES.get(mm, mm)} {anio}"
+
+
+def contexto_plantilla(est):
+    """Variables para templates/estadisticas.html"""
+    meses_ganadores = [
+        {"clave": mes, "etiqueta": etiqueta_mes(mes), "winners": [list(g) for g in ganadores]}
+        for mes, ganadores in est.ganadores_por_mes
+    ]
+    return dict(
+        total=est.total,
+        por_estado=list(est.por_estado.items()),
+        por_oficina=est.por_oficina[:5],
+        por_piso=est.por_piso[:5],
+        top_resueltos=est.ranking_tecnicos[:5],
+        promedio_mes=round(est.promedio_mensual),
+        promedio_semana=round(est.promedio_semanal),
+        meses_activos=est.meses_activos,
+        # 'YYYY-MM-DD' -> 'dd/mm'
+        por_dia=json.dumps([(f"{iso[8:10]}/{iso[5:7]}", n) for iso, n in est.por_dia], ensure_ascii=False),
+        por_mes=json.dumps([(etiqueta_mes(mes), n) for mes, n in est.por_mes], ensure_ascii=False),
+        meses_ganadores_navegable=json.dumps(meses_ganadores, ensure_ascii=False),
+        top3_ganadores_mes=est.meses_ganados[:3],
+    )
+
+
+def tendencias_json(est, meses=12):
+    """Datos del gráfico de tendencias: los últimos `meses` meses con reportes"""
+    filas = [(mes, n, est.por_mes_estado[mes]) for mes, n in est.por_mes[-meses:]]
+
+    def serie(label, valores, color):
+        return {'label': label, 'data': valores, 'borderColor': f'rgb({color})', 'backgroundColor': f'rgba({color}, 0.1)'}
+
+    return {
+        'labels': [f"{mes[5:7]}/{mes[2:4]}" for mes, _, _ in filas],
+        'datasets': [
+            serie('Total', [n for _, n, _ in filas], '54, 162, 235'),
+            serie('Resueltos', [e.get('resuelto', 0) for _, _, e in filas], '75, 192, 192'),
+            serie('Pendientes', [e.get('pendiente', 0) for _, _, e in filas], '255, 99, 132'),
+            serie('En Proceso', [e.get('en proceso', 0) for _, _, e in filas], '255, 205, 86'),
+        ]
+    }
+
+
+def como_dict(est):
+    """Estadísticas completas en tipos JSON"""
+    return {
+        'hoy': est.hoy,
+        'total': est.total,
+        'por_estado': est.por_estado,
+        'por_oficina': [list(f) for f in est.por_oficina],
+        'por_piso': [list(f) for f in est.por_piso],
+        'ranking_tecnicos': [list(f) for f in est.ranking_tecnicos],
+        'por_mes': [list(f) for f in est.por_mes],
+        'por_dia': [list(f) for f in est.por_dia],
+        'ganadores_por_mes': {mes: [list(g) for g in ganadores] for mes, ganadores in est.ganadores_por_mes},
+        'meses_ganados': [list(f) for f in est.meses_ganados],
+        'meses_activos': est.meses_activos,
+        'promedio_mensual': round(est.promedio_mensual, 1),
+        'promedio_semanal': round(est.promedio_semanal, 1),
+        'semana': {
+            'total': est.total_semana,
+            'por_estado': est.semana_por_estado,
+            'empleado': list(est.empleado_semana) if est.empleado_semana else None,
+        },
+    }
@@ -0,0 +1,170 @@
+"""
+Archivos estáticos con huella de contenido
+url_for('static', filename='x/y.css') genera /static/x/y.<hash>.css: el hash
+cambia con el contenido, así que esas URLs se sirven con Cache-Control
+immutable y el navegador no vuelve a pedirlas hasta que el archivo cambie.
+Las versiones precomprimidas se arman con `python estaticos.py` y llevan
+la huella en el nombre (y.<hash>.css.br / .gz): si el archivo cambia dejan
+de coincidir solas, sin depender de fechas de modificación (git no las
+conserva). Se envían según el Accept-Encoding.
+
+Las librerías de terceros (Bootstrap, Popper, jQuery, Select2, Font Awesome)
+están copiadas en static/vendor/<librería>-<versión>/, así las páginas no
+dependen de CDNs externos.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import sys
+import threading
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+from config import ESTATICOS_CACHE_CONTROL, ESTATICOS_CACHE_CONTROL_SIN_HUELLA, ESTATICOS_COMPRIMIBLES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# nombre.<10 hex>.ext
+_RE_HUELLA = re.compile(r'^(.+)\.([0-9a-f]{10})(\.[^./]+)$')
+
+# (extensión del archivo precomprimido, Content-Encoding), en orden de preferencia
+VARIANTES = (('.br', 'br'), ('.gz', 'gzip'))
+
+# Bytes leídos por vez al calcular una huella
+TROZO_HUELLA = 64 * 1024
+
+
+class Estaticos:
+    """Huellas de los archivos de un directorio, recalculadas si el archivo cambia"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._huellas = {}        # nombre -> (mtime_ns, tamaño, huella)
+        self._lock = threading.Lock()
+
+    def huella(self, nombre):
+        """Hash del contenido, o None si no es un archivo dentro del directorio"""
+        # Antes de tocar el disco: '../' o una ruta absoluta no salen del directorio
+        ruta = safe_join(self.directorio, nombre)
+        if ruta is None:
+            return None
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            return None
+        if not stat.S_ISREG(info.st_mode):
+            return None
+        with self._lock:
+            guardada = self._huellas.get(nombre)
+        if guardada and guardada[:2] == (info.st_mtime_ns, info.st_size):
+            return guardada[2]
+        calculo = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for trozo in iter(lambda: archivo.read(TROZO_HUELLA), b''):
+                calculo.update(trozo)
+        huella = calculo.hexdigest()[:10]
+        with self._lock:
+            self._huellas[nombre] = (info.st_mtime_ns, info.st_size, huella)
+        return huella
+
+    def nombre_con_huella(self, nombre):
+        huella = self.huella(nombre)
+        if huella is None:
+            return nombre
+        base, extension = os.path.splitext(nombre)
+        return f"{base}.{huella}{extension}"
+
+    def servir(self, filename):
+        """Vista de /static/<filename>: acepta el nombre con o sin huella"""
+        nombre, inmutable = filename, False
+        coincidencia = _RE_HUELLA.match(filename)
+        if coincidencia:
+            base, huella, extension = coincidencia.groups()
+            # Una huella vieja (HTML cacheado de antes de un cambio) recibe el
+            # archivo actual, pero sin immutable
+            nombre = base + extension
+            inmutable = self.huella(nombre) == huella
+
+        enviar, codificacion = nombre, None
+        if inmutable:
+            for sufijo, encoding in VARIANTES:
+                if (request.accept_encodings[encoding] > 0
+                        and os.path.isfile(os.path.join(self.directorio, filename + sufijo))):
+                    enviar, codificacion = filename + sufijo, encoding
+                    break
+
+        respuesta = send_from_directory(self.directorio, enviar,
+                                        mimetype=mimetypes.guess_type(nombre)[0] or 'application/octet-stream')
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        if os.path.splitext(nombre)[1] in ESTATICOS_COMPRIMIBLES:
+            respuesta.vary.add('Accept-Encoding')
+        respuesta.headers['Cache-Control'] = (ESTATICOS_CACHE_CONTROL if inmutable
+                                              else ESTATICOS_CACHE_CONTROL_SIN_HUELLA)
+        return respuesta
+
+
+def registrar_estaticos(app):
+    """Reemplaza la vista 'static' de Flask y agrega la huella en url_for('static', ...)"""
+    estaticos = Estaticos(app.static_folder)
+    app.view_functions['static'] = estaticos.servir
+
+    @app.url_defaults
+    def agregar_huella(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = estaticos.nombre_con_huella(values['filename'])
+
+    return estaticos
+
+
+def precomprimir(directorio):
+    """
+    Arma <nombre con huella>.gz (y .br si está instalado el paquete brotli)
+    para cada archivo comprimible y borra las de contenidos anteriores.
+    Devuelve la cantidad de archivos escritos.
+    """
+    estaticos = Estaticos(directorio)
+    compresores = [('.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+    if brotli:
+        compresores.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    escritos = 0
+    for carpeta, _, archivos in os.walk(directorio):
+        for archivo in archivos:
+            ruta = os.path.join(carpeta, archivo)
+            sin_sufijo, sufijo = os.path.splitext(archivo)
+            coincidencia = _RE_HUELLA.match(sin_sufijo)
+            if sufijo in ('.gz', '.br') and coincidencia:
+                base, huella, extension = coincidencia.groups()
+                if estaticos.huella(os.path.relpath(os.path.join(carpeta, base + extension), directorio)) != huella:
+                    os.remove(ruta)
+                    print(f"🗑️ {os.path.relpath(ruta, directorio)}")
+                continue
+            if sufijo not in ESTATICOS_COMPRIMIBLES:
+                continue
+            con_huella = os.path.join(directorio, estaticos.nombre_con_huella(os.path.relpath(ruta, directorio)))
+            with open(ruta, 'rb') as entrada:
+                datos = entrada.read()
+            for sufijo_variante, comprimir in compresores:
+                destino = con_huella + sufijo_variante
+                if os.path.exists(destino):
+                    continue
+                comprimido = comprimir(datos)
+                if len(comprimido) >= len(datos):
+                    continue
+                with open(destino, 'wb') as salida:
+                    salida.write(comprimido)
+                print(f"🗜️ {os.path.relpath(destino, directorio)}: {len(datos)} -> {len(comprimido)} bytes")
+                escritos += 1
+    return escritos
+
+
+if __name__ == '__main__':
+    directorio = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    if brotli is None:
+        print("⚠️ Paquete brotli no instalado: solo se arman los .gz")
+    print(f"✅ {precomprimir(directorio)} archivos precomprimidos")
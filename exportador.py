@@ -0,0 +1,206 @@
+"""
+Exportación de la tabla de reportes
+Excel (web y bot): usa el modo write-only de openpyxl: las filas se leen de a lotes con
+fetchmany y se escriben directo al archivo, sin armar la planilla entera
+en memoria. El .xlsx queda en el cache de artefactos (artefactos.py) y
+se envía de a trozos; se vuelve a armar solo cuando cambian los datos.
+CSV / NDJSON (scripts): filtrados como el listado, se generan fila a fila
+desde el cursor mientras se envían, opcionalmente comprimidos con gzip.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from config import EXCEL_LOTE, EXCEL_TROZO, EXCEL_ANCHO_MAX, EXPORTAR_LOTE, EXPORTAR_GZIP_NIVEL
+from artefactos import CacheArtefactos
+from database import obtener_conexion_lectura, version_datos
+import tickets
+
+# (encabezado, columna de datos)
+COLUMNAS = [
+    ('ID', 'id'),
+    ('Piso', 'piso'),
+    ('Oficina', 'oficina'),
+    ('Quién', 'quien'),
+    ('Razón', 'razon'),
+    ('Estado', 'estado'),
+    ('Fecha', 'fecha'),
+    ('Resuelto por', 'resuelto_por'),
+]
+
+MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Columnas de las exportaciones CSV / NDJSON (fechas ISO además del texto original)
+COLUMNAS_DATOS = ['id', 'piso', 'oficina', 'quien', 'razon', 'estado', 'fecha', 'resuelto_por',
+                  'fecha_creacion', 'fecha_resolucion', 'num_comentarios']
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+_artefactos = CacheArtefactos()
+
+
+def nombre_archivo(extension='xlsx'):
+    return f"reportes_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+
+
+def anchos_columnas(conn):
+    """
+    Ancho de cada columna = texto más largo (encabezado incluido) + 2, hasta
+    EXCEL_ANCHO_MAX. En write-only los anchos van antes de la primera fila,
+    así que se calculan con una sola consulta de agregados.
+    """
+    maximos = conn.execute("SELECT " + ", ".join(
+        f"COALESCE(MAX(length(CAST({columna} AS TEXT))), 0)" for _, columna in COLUMNAS
+    ) + " FROM datos").fetchone()
+    return [min(max(len(encabezado), largo) + 2, EXCEL_ANCHO_MAX)
+            for (encabezado, _), largo in zip(COLUMNAS, maximos)]
+
+
+def lotes_por_id(consulta, lote, despues=None, limite=None):
+    """
+    Filas de a lotes por id descendente (el id es la primera columna), con
+    una consulta corta por lote que retoma en id < último id leído. La
+    conexión vuelve al pool antes de entregar cada lote: sin WAL, un SELECT
+    abierto mientras el cliente descarga mantiene un lock SHARED que
+    bloquea los COMMIT del escritor. consulta(conn, despues, cantidad)
+    devuelve (sql, params); limite = filas máximas en total.
+    """
+    restantes = limite
+    while restantes is None or restantes > 0:
+        cantidad = lote if restantes is None else min(lote, restantes)
+        with obtener_conexion_lectura() as conn:
+            sql, params = consulta(conn, despues, cantidad)
+            filas = conn.execute(sql, params).fetchall()
+        if not filas:
+            return
+        yield filas
+        if len(filas) < cantidad:
+            return
+        despues = filas[-1][0]
+        if restantes is not None:
+            restantes -= len(filas)
+
+
+def escribir_excel(destino, lote=EXCEL_LOTE, progreso=None):
+    """
+    Escribe todos los reportes (más nuevos primero) en destino; devuelve la
+    cantidad de filas. progreso(filas, total), si se pasa, se llama tras cada lote.
+    Lee por lotes (lotes_por_id): entre lote y lote no queda ninguna
+    consulta abierta, así el escritor no espera a que termine el archivo.
+    """
+    with obtener_conexion_lectura() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM datos").fetchone()[0] if progreso else None
+        anchos = anchos_columnas(conn)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reportes")
+    for i, ancho in enumerate(anchos, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = ancho
+    ws.append([encabezado for encabezado, _ in COLUMNAS])
+
+    columnas = ', '.join(columna for _, columna in COLUMNAS)
+
+    def consulta(conn, despues, cantidad):
+        if despues is None:
+            return f"SELECT {columnas} FROM datos ORDER BY id DESC LIMIT ?", [cantidad]
+        return f"SELECT {columnas} FROM datos WHERE id < ? ORDER BY id DESC LIMIT ?", [despues, cantidad]
+
+    filas = 0
+    for bloque in lotes_por_id(consulta, lote):
+        for fila in bloque:
+            ws.append(fila)
+        filas += len(bloque)
+        if progreso:
+            progreso(filas, total)
+    wb.save(destino)
+    return filas
+
+
+def obtener_excel(progreso=None):
+    """
+    Ruta del Excel de los datos actuales (del cache, o recién armado). Si
+    alguien escribe mientras se arma, el archivo puede incluir cambios
+    posteriores a la versión con que se guarda: nunca queda más viejo.
+    """
+    with obtener_conexion_lectura() as conn:
+        version = version_datos(conn)
+    return _artefactos.obtener(version, ('excel',), 'xlsx',
+                               lambda destino: escribir_excel(destino, progreso=progreso))
+
+
+def excel_en_cache():
+    """Ruta del Excel de los datos actuales si ya está armado; None si hay que generarlo"""
+    with obtener_conexion_lectura() as conn:
+        return _artefactos.existente(version_datos(conn), ('excel',), 'xlsx')
+
+
+def leer_en_trozos(archivo, tamano=EXCEL_TROZO):
+    """Generador con el contenido de un archivo abierto, de a trozos; lo cierra al terminar"""
+    with archivo:
+        while True:
+            trozo = archivo.read(tamano)
+            if not trozo:
+                break
+            yield trozo
+
+
+def file_id_telegram(ruta):
+    return _artefactos.file_id(ruta)
+
+
+def recordar_file_id_telegram(ruta, file_id):
+    _artefactos.recordar_file_id(ruta, file_id)
+
+
+def estado_artefactos():
+    return _artefactos.estado()
+
+
+def _lineas_csv(lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow(COLUMNAS_DATOS)
+    yield buffer.getvalue()
+    for filas in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(filas)
+        yield buffer.getvalue()
+
+
+def _lineas_ndjson(lotes):
+    for filas in lotes:
+        yield ''.join(json.dumps(dict(zip(COLUMNAS_DATOS, fila)), ensure_ascii=False) + '\n' for fila in filas)
+
+
+def _gzip(trozos):
+    compresor = zlib.compressobj(EXPORTAR_GZIP_NIVEL, zlib.DEFLATED, 31)   # 31 = formato gzip
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def exportar_filas(formato, filtros, comprimir=False, lote=EXPORTAR_LOTE):
+    """
+    Generador con el cuerpo de la respuesta: un trozo por lote de filas, así
+    la memoria no depende de cuántas filas haya. filtros son los de
+    tickets.consulta_filtrada; cada lote es una consulta aparte
+    (lotes_por_id), así un cliente lento no bloquea las escrituras.
+    """
+    filtros = dict(filtros)
+    despues, limite = filtros.pop('despues', None), filtros.pop('limite', None) or None
+
+    def consulta(conn, despues, cantidad):
+        return tickets.consulta_filtrada(conn, COLUMNAS_DATOS, despues=despues, limite=cantidad, **filtros)
+
+    lotes = lotes_por_id(consulta, lote, despues, limite)
+    lineas = _lineas_csv(lotes) if formato == 'csv' else _lineas_ndjson(lotes)
+    trozos = (texto.encode('utf-8') for texto in lineas)
+    return _gzip(trozos) if comprimir else trozos
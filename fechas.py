@@ -0,0 +1,85 @@
+"""
+Interpretación rápida de las fechas de texto de la BD
+Reconoce cada formato por su forma (sin probar strptime uno por uno) y
+memoriza los resultados: la columna 'fecha' repite unos pocos cientos de
+valores distintos en miles de filas.
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+# Las mismas variantes que aceptaba utils.parse_fecha_flexible:
+# dd/mm/yy, dd/mm/yyyy, yyyy-mm-dd, dd-mm-yyyy, dd-mm-yy (día y mes de 1 o 2 cifras)
+_RE_DIA_PRIMERO = re.compile(r'(\d{1,2})([/-])(\d{1,2})\2(\d{4}|\d{2})')
+_RE_ISO = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+# Límite de valores distintos recordados (días de varios años en varios formatos)
+MAX_MEMORIA = 8192
+
+
+def _anio_corto(yy):
+    # Mismo pivote que %y: 69-99 -> 19xx, 00-68 -> 20xx
+    return yy + (1900 if yy >= 69 else 2000)
+
+
+@lru_cache(maxsize=MAX_MEMORIA)
+def _parsear(texto):
+    m = _RE_DIA_PRIMERO.fullmatch(texto)
+    if m:
+        dia, _, mes, anio = m.groups()
+        anio = int(anio) if len(anio) == 4 else _anio_corto(int(anio))
+    else:
+        m = _RE_ISO.fullmatch(texto)
+        if not m:
+            return None
+        anio, mes, dia = int(m.group(1)), m.group(2), m.group(3)
+    try:
+        return datetime(anio, int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def parse_fecha(s):
+    """
+    '05/11/25', '5-11-2025', '2025-11-05' -> datetime(2025, 11, 5)
+    None si no tiene un formato reconocido o no es una fecha válida.
+    """
+    if not s:
+        return None
+    return _parsear(str(s).strip())
+
+
+@lru_cache(maxsize=MAX_MEMORIA)
+def _a_iso(texto):
+    f = _parsear(texto)
+    return f.strftime("%Y-%m-%d") if f else None
+
+
+def fecha_a_iso(s):
+    """'05/11/25' -> '2025-11-05' (None si no se reconoce)"""
+    if not s:
+        return None
+    return _a_iso(str(s).strip())
+
+
+def fechas_a_iso(valores):
+    """
+    Convierte una columna entera: devuelve {valor: 'YYYY-MM-DD' o None}
+    interpretando cada valor distinto una sola vez.
+    """
+    return {v: fecha_a_iso(v) for v in set(valores)}
+
+
+@lru_cache(maxsize=MAX_MEMORIA)
+def es_dia_habil(fecha_iso):
+    """'2025-11-07' (viernes) -> True; False para sábado, domingo o texto inválido"""
+    try:
+        return date.fromisoformat(fecha_iso).weekday() < 5
+    except (TypeError, ValueError):
+        return False
+
+
+def estado_memoria():
+    """Aciertos / fallos de la memoria de fechas, para diagnóstico"""
+    info = _parsear.cache_info()
+    return {'aciertos': info.hits, 'fallos': info.misses, 'entradas': info.currsize}
@@ -0,0 +1,104 @@
+"""
+Herramientas de mantenimiento de la base de datos
+
+Uso:
+    python mantenimiento.py migrar            Aplica migraciones pendientes
+    python mantenimiento.py migrar --estado   Solo muestra la versión y lo pendiente
+    python mantenimiento.py indices           Crea/verifica índices y revisa planes
+    python mantenimiento.py verificar         Compara los datos desnormalizados con su origen
+    python mantenimiento.py verificar --reparar   ... y corrige las diferencias
+    python mantenimiento.py agregados         Reconstruye las tablas agregadas (agg_*)
+    (--db RUTA para trabajar sobre una copia en vez de config.DB_PATH)
+"""
+import argparse
+import sqlite3
+import sys
+
+from config import DB_PATH
+from consistencia import VERIFICACIONES
+from esquema import asegurar_indices, verificar_planes
+from migraciones import (
+    AGREGADOS, MIGRACIONES, aplicar_migraciones, migraciones_pendientes,
+    reconstruir_agregados, version_actual
+)
+
+
+def cmd_migrar(conn, args):
+    pendientes = migraciones_pendientes(conn)
+    print(f"Versión actual del esquema: {version_actual(conn)} (última: {MIGRACIONES[-1][0]})")
+    if args.estado:
+        for version, descripcion, _ in pendientes:
+            print(f"  pendiente {version}: {descripcion}")
+        return 0
+    if not pendientes:
+        print("✅ Esquema al día")
+        return 0
+    aplicadas = aplicar_migraciones(conn)
+    print(f"✅ Migraciones aplicadas: {', '.join(map(str, aplicadas))}")
+    return 0
+
+
+def cmd_indices(conn, args):
+    cambios = asegurar_indices(conn)
+    if not cambios:
+        print("✅ Índices al día")
+    problemas = verificar_planes(conn)
+    if not problemas:
+        print("✅ Ninguna consulta caliente hace full scan")
+    return 1 if problemas else 0
+
+
+def cmd_verificar(conn, args):
+    total = 0
+    for nombre, verificar in VERIFICACIONES.items():
+        diferencias = verificar(conn, reparar=args.reparar)
+        total += len(diferencias)
+        if not diferencias:
+            print(f"✅ {nombre}: sin diferencias")
+            continue
+        print(f"⚠️ {nombre}: {len(diferencias)} diferencias{' (reparadas)' if args.reparar else ''}")
+        for clave, guardado, real in diferencias[:20]:
+            print(f"  {clave}: guardado {guardado}, real {real}")
+        if len(diferencias) > 20:
+            print(f"  ... y {len(diferencias) - 20} más")
+    return 1 if total and not args.reparar else 0
+
+
+def cmd_agregados(conn, args):
+    reconstruir_agregados(conn)
+    conn.commit()
+    for nombre in AGREGADOS:
+        filas = conn.execute(f"SELECT COUNT(*) FROM {nombre}").fetchone()[0]
+        print(f"✅ {nombre}: {filas} filas")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de datosReportes.db")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base (por defecto config.DB_PATH)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_migrar = sub.add_parser('migrar', help="Aplica migraciones pendientes")
+    p_migrar.add_argument('--estado', action='store_true', help="Solo mostrar estado")
+    p_migrar.set_defaults(funcion=cmd_migrar)
+
+    p_indices = sub.add_parser('indices', help="Crea/verifica índices y revisa planes de consulta")
+    p_indices.set_defaults(funcion=cmd_indices)
+
+    p_verificar = sub.add_parser('verificar', help="Verifica contadores y tablas mantenidas por triggers")
+    p_verificar.add_argument('--reparar', action='store_true', help="Corregir las diferencias encontradas")
+    p_verificar.set_defaults(funcion=cmd_verificar)
+
+    p_agregados = sub.add_parser('agregados', help="Reconstruye las tablas agregadas de estadísticas")
+    p_agregados.set_defaults(funcion=cmd_agregados)
+
+    args = parser.parse_args(argv)
+    conn = sqlite3.connect(args.db)
+    try:
+        return args.funcion(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
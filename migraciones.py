@@ -0,0 +1,701 @@
+"""
+Migraciones del esquema de datosReportes.db
+La versión aplicada se guarda en PRAGMA user_version.
+"""
+import re
+import sqlite3
+from fechas import fecha_a_iso, fechas_a_iso
+
+
+# Formas que acepta sql_fecha_iso, con '-' ya cambiado por '/': las mismas
+# que fechas.parse_fecha (día y mes de 1 o 2 cifras, año de 2 o 4)
+_D = '[0-9]'
+_FORMAS_DIA_PRIMERO = [f"{d}/{m}/{a}" for d in (_D, _D * 2) for m in (_D, _D * 2) for a in (_D * 2, _D * 4)]
+_FORMAS_ISO = [f"{_D * 4}/{m}/{d}" for m in (_D, _D * 2) for d in (_D, _D * 2)]
+
+
+def sql_fecha_iso(columna):
+    """
+    Expresión SQL que convierte 'fecha' (dd/mm/yy y variantes) a 'YYYY-MM-DD'
+    con las mismas reglas que fechas.fecha_a_iso (pivote 69 para años de
+    dos cifras). Devuelve NULL si el texto no tiene un formato reconocido o
+    no es una fecha válida.
+    """
+    dia_primero = ' OR '.join(f"_t GLOB '{forma}'" for forma in _FORMAS_DIA_PRIMERO)
+    forma_iso = ' OR '.join(f"_t GLOB '{forma}'" for forma in _FORMAS_ISO)
+    # Subconsultas anidadas para nombrar cada parte (_p/_m/_u: primera, del
+    # medio y última) en vez de repetir las expresiones. Un solo tipo de
+    # separador; ISO solo con '-'. date(..., '+0 days') normaliza el 30/02
+    # a marzo: si cambia, la fecha no existe
+    return f"""(SELECT CASE WHEN _ok AND date(_iso, '+0 days') = _iso THEN _iso END FROM (
+        SELECT
+            NOT (instr(_c, '/') AND instr(_c, '-'))
+                AND ({dia_primero} OR (instr(_c, '-') AND ({forma_iso}))) AS _ok,
+            CASE WHEN length(_p) = 4 THEN printf('%s-%02d-%02d', _p, _m, _u)
+                 ELSE printf('%04d-%02d-%02d', CASE WHEN length(_u) = 4 THEN _u
+                                                    WHEN CAST(_u AS INTEGER) >= 69 THEN 1900 + _u
+                                                    ELSE 2000 + _u END, _m, _p)
+            END AS _iso
+        FROM (SELECT _c, _t, _p, substr(_r, 1, instr(_r, '/') - 1) AS _m, substr(_r, instr(_r, '/') + 1) AS _u
+              FROM (SELECT _c, _t, substr(_t, 1, instr(_t, '/') - 1) AS _p, substr(_t, instr(_t, '/') + 1) AS _r
+                    FROM (SELECT trim({columna}) AS _c, replace(trim({columna}), '-', '/') AS _t)))))"""
+
+
+def sql_fecha_hora_iso(columna):
+    """
+    Como sql_fecha_iso pero para 'dd/mm/yy HH:MM' (comentarios):
+    devuelve 'YYYY-MM-DD HH:MM', o solo la fecha si no trae hora.
+    """
+    c = f"trim({columna})"
+    return f"""(CASE
+        WHEN {c} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9] [0-9][0-9]:[0-9][0-9]'
+            THEN {sql_fecha_iso(f"substr({c}, 1, 8)")} || ' ' || substr({c}, 10, 5)
+        ELSE {sql_fecha_iso(columna)}
+    END)"""
+
+
+def _columnas(conn, tabla):
+    return {fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")}
+
+
+def _agregar_columna(conn, tabla, columna, definicion):
+    if columna not in _columnas(conn, tabla):
+        conn.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+
+# ==================== MIGRACIONES ====================
+
+def _crear_triggers_fechas(conn):
+    """
+    Triggers que mantienen fecha_creacion / fecha_resolucion cuando no las
+    escribe quien inserta o actualiza (operaciones.py sí las escribe)
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS datos_fechas_insert
+        AFTER INSERT ON datos
+        BEGIN
+            UPDATE datos SET
+                fecha_creacion = COALESCE(NEW.fecha_creacion, {sql_fecha_iso('NEW.fecha')}, date('now', 'localtime')),
+                fecha_resolucion = CASE WHEN NEW.estado = 'resuelto'
+                    THEN COALESCE(NEW.fecha_resolucion, {sql_fecha_iso('NEW.fecha')}, date('now', 'localtime'))
+                END
+            WHERE id = NEW.id;
+        END
+    """)
+
+    # Al resolver, 'fecha' pasa a ser la fecha de resolución; si no cambió
+    # (resolver_rapido) se toma el día actual. fecha_creacion no se toca.
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS datos_fechas_update
+        AFTER UPDATE OF fecha, estado ON datos
+        WHEN NEW.fecha IS NOT OLD.fecha OR NEW.estado IS NOT OLD.estado
+        BEGIN
+            UPDATE datos SET fecha_resolucion = CASE
+                WHEN NEW.estado != 'resuelto' THEN NULL
+                WHEN NEW.fecha_resolucion IS NOT OLD.fecha_resolucion THEN NEW.fecha_resolucion
+                WHEN NEW.fecha IS NOT OLD.fecha
+                    THEN COALESCE({sql_fecha_iso('NEW.fecha')}, date('now', 'localtime'))
+                WHEN OLD.estado != 'resuelto' THEN date('now', 'localtime')
+                ELSE OLD.fecha_resolucion
+            END
+            WHERE id = NEW.id;
+        END
+    """)
+
+
+def _migracion_fechas_iso(conn):
+    """
+    fecha_creacion / fecha_resolucion en ISO-8601, indexadas.
+    'fecha' sigue existiendo como texto dd/mm/yy para la UI; los triggers
+    mantienen las columnas ISO sincronizadas en cada INSERT/UPDATE.
+    """
+    _agregar_columna(conn, 'datos', 'fecha_creacion', 'TEXT')
+    _agregar_columna(conn, 'datos', 'fecha_resolucion', 'TEXT')
+
+    # Backfill en SQL para los formatos conocidos
+    conn.execute(f"""
+        UPDATE datos SET
+            fecha_creacion = {sql_fecha_iso('fecha')},
+            fecha_resolucion = CASE WHEN estado = 'resuelto' THEN {sql_fecha_iso('fecha')} END
+    """)
+
+    # Lo que no matcheó por forma (p. ej. '5/11/25') se resuelve en Python
+    pendientes = conn.execute("""
+        SELECT id, fecha, estado FROM datos
+        WHERE fecha_creacion IS NULL AND fecha IS NOT NULL AND fecha != ''
+    """).fetchall()
+    isos = fechas_a_iso(fecha for _, fecha, _ in pendientes)
+    conn.executemany(
+        "UPDATE datos SET fecha_creacion = ?, fecha_resolucion = ? WHERE id = ?",
+        [(isos[fecha], isos[fecha] if estado == 'resuelto' else None, id_reporte)
+         for id_reporte, fecha, estado in pendientes]
+    )
+
+    _crear_triggers_fechas(conn)
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_datos_fecha_creacion ON datos(fecha_creacion)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_datos_fecha_resolucion ON datos(fecha_resolucion)")
+
+
+def registrar_cambios_de(conn, tabla):
+    """Triggers que anotan en 'cambios' cada fila tocada de la tabla"""
+    for evento, fila in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS cambios_{tabla}_{evento.lower()}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                INSERT INTO cambios (tabla, fila_id) VALUES ('{tabla}', {fila}.rowid);
+            END
+        """)
+
+
+def _migracion_registro_cambios(conn):
+    """
+    Registro de cambios para la réplica local (ver replica.py): cada
+    INSERT/UPDATE/DELETE deja (tabla, fila_id) con un seq creciente.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cambios (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            fila_id INTEGER NOT NULL,
+            momento TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    registrar_cambios_de(conn, 'datos')
+    registrar_cambios_de(conn, 'comentarios')
+
+
+def _migracion_busqueda_fts(conn):
+    """
+    Índice FTS5 de búsqueda: una fila por reporte (rowid = datos.id) con
+    oficina, quien, razon y el texto de todos sus comentarios. Sin acentos
+    ni mayúsculas (unicode61 remove_diacritics 2) y con índices de prefijo.
+    Si SQLite no trae FTS5 se omite (queda registrada para reintentarla en
+    el próximo arranque) y mientras tanto la búsqueda usa LIKE.
+    """
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS datos_fts USING fts5(
+                oficina, quien, razon, comentarios,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        raise MigracionOmitida(f"FTS5 no disponible ({e}), la búsqueda usará LIKE")
+
+    comentarios_de = "(SELECT group_concat(comentario, ' ') FROM comentarios WHERE reporte_id = {})"
+    conn.execute(f"""
+        INSERT INTO datos_fts (rowid, oficina, quien, razon, comentarios)
+        SELECT id, oficina, quien, razon, {comentarios_de.format('datos.id')} FROM datos
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS datos_fts_insert AFTER INSERT ON datos
+        BEGIN
+            INSERT INTO datos_fts (rowid, oficina, quien, razon, comentarios)
+            VALUES (NEW.id, NEW.oficina, NEW.quien, NEW.razon, {comentarios_de.format('NEW.id')});
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS datos_fts_update AFTER UPDATE OF oficina, quien, razon ON datos
+        BEGIN
+            UPDATE datos_fts SET oficina = NEW.oficina, quien = NEW.quien, razon = NEW.razon
+            WHERE rowid = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS datos_fts_delete AFTER DELETE ON datos
+        BEGIN
+            DELETE FROM datos_fts WHERE rowid = OLD.id;
+        END
+    """)
+    for evento, fila in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS comentarios_fts_{evento.lower()} AFTER {evento} ON comentarios
+            BEGIN
+                UPDATE datos_fts SET comentarios = {comentarios_de.format(f'{fila}.reporte_id')}
+                WHERE rowid = {fila}.reporte_id;
+            END
+        """)
+
+
+def sql_contadores_comentarios(id_reporte):
+    """(num_comentarios, ultimo_comentario) recalculados desde comentarios"""
+    return (
+        f"(SELECT COUNT(*) FROM comentarios WHERE reporte_id = {id_reporte})",
+        f"(SELECT MAX({sql_fecha_hora_iso('fecha')}) FROM comentarios WHERE reporte_id = {id_reporte})",
+    )
+
+
+def _migracion_contadores_comentarios(conn):
+    """
+    datos.num_comentarios y datos.ultimo_comentario ('YYYY-MM-DD HH:MM'),
+    mantenidos por triggers sobre comentarios. Evita el COUNT(*) correlacionado
+    por fila del listado. Ver consistencia.py para verificar/reparar.
+    """
+    _agregar_columna(conn, 'datos', 'num_comentarios', 'INTEGER NOT NULL DEFAULT 0')
+    _agregar_columna(conn, 'datos', 'ultimo_comentario', 'TEXT')
+
+    num, ultimo = sql_contadores_comentarios('datos.id')
+    conn.execute(f"UPDATE datos SET num_comentarios = {num}, ultimo_comentario = {ultimo}")
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS comentarios_contador_insert AFTER INSERT ON comentarios
+        BEGIN
+            UPDATE datos SET
+                num_comentarios = num_comentarios + 1,
+                ultimo_comentario = max(
+                    COALESCE(ultimo_comentario, ''),
+                    COALESCE({sql_fecha_hora_iso('NEW.fecha')}, strftime('%Y-%m-%d %H:%M', 'now', 'localtime'))
+                )
+            WHERE id = NEW.reporte_id;
+        END
+    """)
+    _, ultimo = sql_contadores_comentarios('OLD.reporte_id')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS comentarios_contador_delete AFTER DELETE ON comentarios
+        BEGIN
+            UPDATE datos SET
+                num_comentarios = max(num_comentarios - 1, 0),
+                ultimo_comentario = {ultimo}
+            WHERE id = OLD.reporte_id;
+        END
+    """)
+
+
+def _migracion_resoluciones(conn):
+    """
+    resoluciones: una fila por (reporte, técnico) con la fecha de resolución,
+    en vez de partir 'resuelto_por' en Python en cada estadística. La llenan
+    las operaciones de escritura (operaciones.sincronizar_resoluciones).
+    """
+    from operaciones import sincronizar_resoluciones
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resoluciones (
+            id INTEGER PRIMARY KEY,
+            reporte_id INTEGER NOT NULL,
+            tecnico TEXT NOT NULL,
+            fecha TEXT,
+            UNIQUE (reporte_id, tecnico)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resoluciones_tecnico ON resoluciones(tecnico, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resoluciones_fecha ON resoluciones(fecha, tecnico)")
+    registrar_cambios_de(conn, 'resoluciones')
+
+    ids = conn.execute("SELECT id FROM datos WHERE resuelto_por IS NOT NULL AND resuelto_por != ''").fetchall()
+    for (id_reporte,) in ids:
+        sincronizar_resoluciones(conn, id_reporte)
+
+
+# Tablas de conteos agregados: nombre -> (tabla origen, {columna: (tipo,
+# columna origen, expresión)}). En la expresión {} es la columna origen.
+# Las claves NULL se guardan como '' porque NULL nunca choca en ON CONFLICT.
+AGREGADOS = {
+    'agg_dia': ('datos', {
+        'fecha': ('TEXT', 'fecha_creacion', "COALESCE({}, '')"),
+        'estado': ('TEXT', 'estado', "{}"),
+    }),
+    'agg_mes': ('datos', {
+        'mes': ('TEXT', 'fecha_creacion', "COALESCE(substr({}, 1, 7), '')"),
+        'estado': ('TEXT', 'estado', "{}"),
+    }),
+    'agg_oficina': ('datos', {
+        'oficina': ('TEXT', 'oficina', "{}"),
+    }),
+    'agg_piso': ('datos', {
+        'piso': ('INTEGER', 'piso', "{}"),
+    }),
+    'agg_tecnico_dia': ('resoluciones', {
+        'fecha': ('TEXT', 'fecha', "COALESCE({}, '')"),
+        'tecnico': ('TEXT', 'tecnico', "{}"),
+    }),
+    # Serie diaria filtrable por piso / oficina (series.py)
+    'agg_dia_ubicacion': ('datos', {
+        'fecha': ('TEXT', 'fecha_creacion', "COALESCE({}, '')"),
+        'estado': ('TEXT', 'estado', "{}"),
+        'piso': ('INTEGER', 'piso', "{}"),
+        'oficina': ('TEXT', 'oficina', "{}"),
+    }),
+}
+
+
+def sql_agregado(nombre, fila):
+    """(columnas, expresiones) del agregado sobre fila (NEW, OLD o la tabla origen)"""
+    _, claves = AGREGADOS[nombre]
+    return list(claves), [expresion.format(f"{fila}.{origen}") for _, origen, expresion in claves.values()]
+
+
+def reconstruir_agregados(conn, nombres=None):
+    """Recalcula desde cero las tablas agregadas (todas o las indicadas)"""
+    for nombre in nombres or AGREGADOS:
+        origen = AGREGADOS[nombre][0]
+        columnas, expresiones = sql_agregado(nombre, origen)
+        conn.execute(f"DELETE FROM {nombre}")
+        conn.execute(f"""
+            INSERT INTO {nombre} ({', '.join(columnas)}, total)
+            SELECT {', '.join(expresiones)}, COUNT(*) FROM {origen}
+            GROUP BY {', '.join(expresiones)}
+        """)
+
+
+def crear_agregados(conn, nombres):
+    """
+    Crea las tablas agregadas indicadas con sus triggers (que las mantienen
+    en la misma transacción que cada INSERT/UPDATE/DELETE) y las llena
+    """
+    for nombre in nombres:
+        origen, claves = AGREGADOS[nombre]
+        columnas = ', '.join(f"{c} {tipo} NOT NULL" for c, (tipo, _, _) in claves.items())
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {nombre} (
+                {columnas},
+                total INTEGER NOT NULL,
+                PRIMARY KEY ({', '.join(claves)})
+            ) WITHOUT ROWID
+        """)
+
+        columnas, nuevos = sql_agregado(nombre, 'NEW')
+        _, viejos = sql_agregado(nombre, 'OLD')
+        lista = ', '.join(columnas)
+        sumar = f"""
+            INSERT INTO {nombre} ({lista}, total) VALUES ({', '.join(nuevos)}, 1)
+            ON CONFLICT ({lista}) DO UPDATE SET total = total + 1;"""
+        fila_vieja = ' AND '.join(f"{c} = {v}" for c, v in zip(columnas, viejos))
+        restar = f"""
+            UPDATE {nombre} SET total = total - 1 WHERE {fila_vieja};
+            DELETE FROM {nombre} WHERE total <= 0 AND {fila_vieja};"""
+        origenes = sorted({origen_columna for _, origen_columna, _ in claves.values()})
+        cambio = ' OR '.join(f"NEW.{c} IS NOT OLD.{c}" for c in origenes)
+
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre}_insert AFTER INSERT ON {origen} BEGIN {sumar} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre}_delete AFTER DELETE ON {origen} BEGIN {restar} END")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nombre}_update AFTER UPDATE OF {', '.join(origenes)} ON {origen}
+            WHEN {cambio}
+            BEGIN {restar} {sumar} END
+        """)
+
+    reconstruir_agregados(conn, nombres)
+
+
+def _migracion_agregados(conn):
+    """
+    Conteos por día, mes, oficina, piso y técnico/día: las estadísticas
+    leen unos cientos de filas en vez de recorrer datos.
+    Reconstruir: python mantenimiento.py verificar --reparar
+    """
+    crear_agregados(conn, ['agg_dia', 'agg_mes', 'agg_oficina', 'agg_piso', 'agg_tecnico_dia'])
+
+
+def _migracion_serie_ubicacion(conn):
+    """Conteos por día, estado, piso y oficina para /api/series"""
+    crear_agregados(conn, ['agg_dia_ubicacion'])
+
+
+# Límites (en horas) del histograma de tiempos de resolución: la cubeta i
+# tiene los tiempos < CUBETAS_HORAS[i]; la última, todo lo que sigue.
+# Cambiarlos requiere reconstruir: python mantenimiento.py verificar --reparar
+CUBETAS_HORAS = (1, 2, 4, 8, 24, 48, 72, 120, 168, 336, 720, 1440)
+
+
+def sql_cubeta(expresion):
+    """Índice de la cubeta de CUBETAS_HORAS para una cantidad de horas"""
+    casos = ' '.join(f"WHEN {expresion} < {limite} THEN {i}" for i, limite in enumerate(CUBETAS_HORAS))
+    return f"(CASE {casos} ELSE {len(CUBETAS_HORAS)} END)"
+
+
+# Condiciones sobre una fila de eventos ({e} = NEW o el alias de la tabla).
+# Se mide la primera vez que un ticket creado abierto pasa a resuelto, desde
+# su creación; los que se cargan ya resueltos no tienen tiempo que medir.
+_SQL_PRIMERA_RESOLUCION = """(
+    {e}.tipo = 'estado' AND {e}.estado = 'resuelto' AND COALESCE({e}.estado_anterior, '') != 'resuelto'
+    AND EXISTS (SELECT 1 FROM eventos c WHERE c.reporte_id = {e}.reporte_id AND c.tipo = 'creado' AND c.estado != 'resuelto')
+    AND NOT EXISTS (SELECT 1 FROM eventos p WHERE p.reporte_id = {e}.reporte_id AND p.tipo = 'estado'
+                    AND p.estado = 'resuelto' AND p.id < {e}.id)
+)"""
+_SQL_HORAS = """max((julianday({e}.momento) - julianday((
+    SELECT MIN(c.momento) FROM eventos c WHERE c.reporte_id = {e}.reporte_id AND c.tipo = 'creado'
+))) * 24, 0)"""
+# Entradas y salidas del backlog (tickets abiertos)
+_SQL_ABRE = """(
+    ({e}.tipo = 'creado' AND {e}.estado != 'resuelto')
+    OR ({e}.tipo = 'estado' AND {e}.estado_anterior = 'resuelto' AND {e}.estado != 'resuelto')
+)"""
+_SQL_CIERRA = """(
+    ({e}.tipo = 'estado' AND {e}.estado = 'resuelto' AND COALESCE({e}.estado_anterior, '') != 'resuelto')
+    OR ({e}.tipo = 'eliminado' AND {e}.estado != 'resuelto')
+)"""
+
+
+def _sql_tiempos_por_dimension(e, desde='', donde=''):
+    """Filas (dimension, valor, horas) de las resoluciones de {e}"""
+    horas = _SQL_HORAS.format(e=e)
+    desde_tecnicos = f"{desde}, json_each({e}.tecnicos) t" if desde else f"FROM json_each({e}.tecnicos) t"
+    return f"""
+        SELECT 'total' AS dimension, '' AS valor, {horas} AS horas {desde} {donde}
+        UNION ALL SELECT 'piso', CAST({e}.piso AS TEXT), {horas} {desde} {donde}
+        UNION ALL SELECT 'oficina', {e}.oficina, {horas} {desde} {donde}
+        UNION ALL SELECT 'tecnico', t.value, {horas} {desde_tecnicos} {donde}
+    """
+
+
+def sql_resumen_eventos():
+    """tabla -> SELECT que la calcula desde cero a partir de eventos"""
+    resolucion = _SQL_PRIMERA_RESOLUCION.format(e='e')
+    abre, cierra = _SQL_ABRE.format(e='e'), _SQL_CIERRA.format(e='e')
+    return {
+        'tiempos_resolucion': f"""
+            SELECT dimension, valor, {sql_cubeta('horas')} AS cubeta,
+                   COUNT(*), SUM(horas), MAX(horas)
+            FROM ({_sql_tiempos_por_dimension('e', 'FROM eventos e', f'WHERE {resolucion}')})
+            GROUP BY dimension, valor, cubeta
+        """,
+        'backlog_dia': f"""
+            SELECT substr(e.momento, 1, 10) AS fecha,
+                   SUM({abre}), SUM({cierra})
+            FROM eventos e
+            WHERE {abre} OR {cierra}
+            GROUP BY fecha
+        """,
+    }
+
+
+def reconstruir_resumen_eventos(conn):
+    """Recalcula tiempos_resolucion y backlog_dia recorriendo todo eventos"""
+    for tabla, consulta in sql_resumen_eventos().items():
+        conn.execute(f"DELETE FROM {tabla}")
+        conn.execute(f"INSERT INTO {tabla} {consulta}")
+
+
+def _migracion_eventos(conn):
+    """
+    Historial append-only de cada ticket (creación, cambios de estado,
+    asignaciones, comentarios, borrado) con hora precisa y origen, que
+    escribe operaciones.py. Cada evento guarda piso/oficina/técnicos del
+    momento, así los resúmenes no dependen de ediciones posteriores.
+    Los triggers mantienen dos resúmenes para consultar en tiempo acotado:
+      tiempos_resolucion: histograma de horas hasta resolver por dimensión
+      backlog_dia: tickets que se abren / cierran cada día
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY,
+            reporte_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,            -- creado, estado, asignado, comentario, eliminado
+            estado_anterior TEXT,          -- solo en tipo 'estado'
+            estado TEXT,                   -- estado del ticket después del evento
+            piso INTEGER,
+            oficina TEXT,
+            tecnicos TEXT NOT NULL DEFAULT '[]',   -- JSON con los técnicos canónicos
+            detalle TEXT,
+            origen TEXT NOT NULL,          -- web, bot, migración
+            momento TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_eventos_reporte ON eventos(reporte_id, tipo)")
+    registrar_cambios_de(conn, 'eventos')
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tiempos_resolucion (
+            dimension TEXT NOT NULL,       -- total, piso, oficina, tecnico
+            valor TEXT NOT NULL,
+            cubeta INTEGER NOT NULL,       -- índice en CUBETAS_HORAS
+            cantidad INTEGER NOT NULL,
+            suma_horas REAL NOT NULL,
+            max_horas REAL NOT NULL,
+            PRIMARY KEY (dimension, valor, cubeta)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS backlog_dia (
+            fecha TEXT PRIMARY KEY,
+            abiertos INTEGER NOT NULL,
+            cerrados INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    # El estado actual de cada ticket como evento de creación (a la fecha de
+    # creación conocida): el historial arranca acá
+    conn.execute("""
+        INSERT INTO eventos (reporte_id, tipo, estado, piso, oficina, tecnicos, origen, momento)
+        SELECT d.id, 'creado', d.estado, d.piso, d.oficina,
+               (SELECT json_group_array(r.tecnico) FROM resoluciones r WHERE r.reporte_id = d.id),
+               'migración', COALESCE(d.fecha_creacion, date('now', 'localtime')) || ' 00:00:00.000'
+        FROM datos d
+        ORDER BY d.id
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS eventos_tiempos_resolucion
+        AFTER INSERT ON eventos
+        WHEN {_SQL_PRIMERA_RESOLUCION.format(e='NEW')}
+        BEGIN
+            INSERT INTO tiempos_resolucion (dimension, valor, cubeta, cantidad, suma_horas, max_horas)
+            SELECT dimension, valor, {sql_cubeta('horas')}, 1, horas, horas
+            FROM ({_sql_tiempos_por_dimension('NEW')})
+            WHERE true
+            ON CONFLICT (dimension, valor, cubeta) DO UPDATE SET
+                cantidad = cantidad + 1,
+                suma_horas = suma_horas + excluded.suma_horas,
+                max_horas = max(max_horas, excluded.max_horas);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS eventos_backlog
+        AFTER INSERT ON eventos
+        WHEN {_SQL_ABRE.format(e='NEW')} OR {_SQL_CIERRA.format(e='NEW')}
+        BEGIN
+            INSERT INTO backlog_dia (fecha, abiertos, cerrados)
+            VALUES (substr(NEW.momento, 1, 10), {_SQL_ABRE.format(e='NEW')}, {_SQL_CIERRA.format(e='NEW')})
+            ON CONFLICT (fecha) DO UPDATE SET
+                abiertos = abiertos + excluded.abiertos,
+                cerrados = cerrados + excluded.cerrados;
+        END
+    """)
+    reconstruir_resumen_eventos(conn)
+
+
+def _migracion_resoluciones_sin_resolver(conn):
+    """
+    Reportes con técnico pero sin resolver (datos viejos o escritos por
+    fuera de la app): su resolución quedaba sin fecha, contaba en el
+    ranking general pero no en el ganador del mes. Pasan a tener la fecha
+    de creación (ver operaciones.sincronizar_resoluciones).
+    """
+    from operaciones import sincronizar_resoluciones
+    ids = conn.execute("SELECT DISTINCT reporte_id FROM resoluciones WHERE fecha IS NULL").fetchall()
+    for (id_reporte,) in ids:
+        sincronizar_resoluciones(conn, id_reporte)
+
+
+def _iso_trigger_anterior(fecha):
+    """Lo que daba sql_fecha_iso antes de la migración 10: día y mes de dos cifras y siempre 20yy"""
+    t = (fecha or '').strip()
+    if re.fullmatch(r'\d\d([/-])\d\d\1\d\d', t):
+        return f"20{t[6:8]}-{t[3:5]}-{t[0:2]}"
+    if re.fullmatch(r'\d\d([/-])\d\d\1\d{4}', t):
+        return f"{t[6:10]}-{t[3:5]}-{t[0:2]}"
+    if re.fullmatch(r'\d{4}-\d\d-\d\d', t):
+        return t
+    return None
+
+
+def _migracion_fechas_formas_libres(conn):
+    """
+    Los triggers de la migración 1 no reconocían '5/3/24' ni el pivote 69
+    de fechas.parse_fecha y guardaban esas fechas como el día de la
+    escritura. Se recrean con la sql_fecha_iso actual y se corrigen las
+    filas afectadas:
+    - sin resolver: 'fecha' es la de creación
+    - resueltas con las dos fechas iguales: se crearon ya resueltas
+    - resueltas cuya 'fecha' no es la de creación: se cambió al resolver
+    Si 'fecha' sigue siendo la de creación (resolver_rapido) la fecha de
+    resolución era correcta y no se toca.
+    """
+    from operaciones import sincronizar_resoluciones
+    conn.execute("DROP TRIGGER IF EXISTS datos_fechas_insert")
+    conn.execute("DROP TRIGGER IF EXISTS datos_fechas_update")
+    _crear_triggers_fechas(conn)
+
+    corregidos = []
+    filas = conn.execute("SELECT id, fecha, estado, fecha_creacion, fecha_resolucion FROM datos").fetchall()
+    for id_reporte, fecha, estado, creacion, resolucion in filas:
+        iso = fecha_a_iso(fecha)
+        if iso is None or iso == _iso_trigger_anterior(fecha):
+            continue
+        if estado != 'resuelto':
+            nuevas = (iso, resolucion)
+        elif creacion == resolucion:
+            nuevas = (iso, iso)
+        elif iso != creacion:
+            nuevas = (creacion, iso)
+        else:
+            continue
+        if nuevas != (creacion, resolucion):
+            conn.execute("UPDATE datos SET fecha_creacion = ?, fecha_resolucion = ? WHERE id = ?",
+                         nuevas + (id_reporte,))
+            corregidos.append(id_reporte)
+    for id_reporte in corregidos:
+        sincronizar_resoluciones(conn, id_reporte)
+    if corregidos:
+        print(f"📅 {len(corregidos)} reportes con fecha corregida")
+
+
+class MigracionOmitida(Exception):
+    """La migración no se puede aplicar en este entorno (p. ej. SQLite sin FTS5)"""
+
+
+# (versión, descripción, función) en orden; nunca modificar una ya publicada
+MIGRACIONES = [
+    (1, 'Columnas ISO fecha_creacion / fecha_resolucion', _migracion_fechas_iso),
+    (2, 'Registro de cambios para la réplica local', _migracion_registro_cambios),
+    (3, 'Búsqueda de texto completo (FTS5)', _migracion_busqueda_fts),
+    (4, 'Contadores de comentarios en datos', _migracion_contadores_comentarios),
+    (5, 'Tabla resoluciones (reporte, técnico, fecha)', _migracion_resoluciones),
+    (6, 'Tablas agregadas para estadísticas', _migracion_agregados),
+    (7, 'Historial de eventos y resúmenes de resolución', _migracion_eventos),
+    (8, 'Serie diaria por piso y oficina', _migracion_serie_ubicacion),
+    (9, 'Fecha de las resoluciones de reportes sin resolver', _migracion_resoluciones_sin_resolver),
+    (10, 'Fechas de un dígito y pivote 69 en los triggers de fechas', _migracion_fechas_formas_libres),
+]
+
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _omitidas(conn):
+    """Versiones que se saltearon por falta de algo del entorno (se reintentan)"""
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'migraciones_omitidas'").fetchone()
+    return {fila[0] for fila in conn.execute("SELECT version FROM migraciones_omitidas")} if existe else set()
+
+
+def migraciones_pendientes(conn):
+    actual = version_actual(conn)
+    omitidas = _omitidas(conn)
+    return [m for m in MIGRACIONES if m[0] > actual or m[0] in omitidas]
+
+
+def aplicar_migraciones(conn, verbose=True):
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia
+    transacción. Devuelve la lista de versiones aplicadas.
+    Una migración que lanza MigracionOmitida se deshace y queda anotada en
+    migraciones_omitidas sin mover user_version; las siguientes se aplican
+    igual y la omitida se vuelve a intentar en cada arranque hasta que
+    pueda aplicarse.
+    """
+    aplicadas = []
+    omitidas = _omitidas(conn)
+    actual = version_actual(conn)
+    for version, descripcion, funcion in migraciones_pendientes(conn):
+        if verbose:
+            print(f"🔧 Migración {version}: {descripcion}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            funcion(conn)
+            if version > actual:
+                conn.execute(f"PRAGMA user_version = {version}")
+            if version in omitidas:
+                conn.execute("DELETE FROM migraciones_omitidas WHERE version = ?", (version,))
+            conn.commit()
+        except MigracionOmitida as e:
+            conn.rollback()
+            if verbose:
+                print(f"⚠️ Migración {version} omitida: {e}")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("CREATE TABLE IF NOT EXISTS migraciones_omitidas (version INTEGER PRIMARY KEY, motivo TEXT)")
+            conn.execute("INSERT OR REPLACE INTO migraciones_omitidas (version, motivo) VALUES (?, ?)",
+                         (version, str(e)))
+            conn.commit()
+            omitidas.add(version)
+            continue
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        aplicadas.append(version)
+    return aplicadas
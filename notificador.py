@@ -0,0 +1,187 @@
+"""
+Avisos en vivo de cambios en reportes (para /api/eventos, Server-Sent Events)
+Las funciones de operaciones.py marcan cada reporte que tocan; después del
+COMMIT (callback post-escritura) se lee el estado actual de los marcados y
+se publica un evento por reporte en un buffer circular. Las conexiones SSE
+esperan sobre ese buffer y, al reconectarse, retoman desde Last-Event-ID.
+"""
+import threading
+import time
+from collections import deque
+from config import SSE_BUFFER, SSE_LATIDO, SSE_MAX_CONEXIONES
+from database import obtener_conexion_lectura, version_datos, registrar_al_escribir
+from tickets import CAMPOS_LISTADO
+
+# Un id de evento de antes de reiniciar no sirve para retomar
+_ARRANQUE = format(time.time_ns() // 1_000_000, 'x')
+
+# Los campos del listado, para que index.html arme la fila como las demás
+COLUMNAS_FILA = ", ".join(CAMPOS_LISTADO)
+
+
+class Notificador:
+    """Eventos recientes numerados, con espera para los consumidores"""
+
+    def __init__(self, capacidad=SSE_BUFFER, verificar_cada=SSE_LATIDO, max_conexiones=SSE_MAX_CONEXIONES):
+        self.verificar_cada = verificar_cada
+        self.max_conexiones = max_conexiones
+        self.activo = False
+        self.conexiones = 0
+        self._eventos = deque(maxlen=capacidad)   # (número, tipo, datos)
+        self._ultimo = 0
+        self._condicion = threading.Condition()
+        self._marcados = set()
+        self._lock_marcas = threading.Lock()
+        self._version = None
+        self._version_distinta = False
+        self._ultima_verificacion = 0.0
+        self.publicados = 0
+        self.recargas = 0
+
+    def marcar(self, id_reporte):
+        """Lo llaman las operaciones de escritura, dentro de la transacción"""
+        if not self.activo:
+            return
+        with self._lock_marcas:
+            self._marcados.add(int(id_reporte))
+
+    def publicar(self, tipo, datos):
+        with self._condicion:
+            self._ultimo += 1
+            self._eventos.append((self._ultimo, tipo, datos))
+            self.publicados += 1
+            self._condicion.notify_all()
+
+    def publicar_marcados(self):
+        """Callback post-escritura: un evento por reporte marcado, con su fila actual"""
+        with self._lock_marcas:
+            ids, self._marcados = sorted(self._marcados), set()
+        with obtener_conexion_lectura() as conn:
+            filas = {}
+            if ids:
+                filas = {fila[0]: tuple(fila) for fila in conn.execute(
+                    f"SELECT {COLUMNAS_FILA} FROM datos WHERE id IN ({', '.join('?' * len(ids))})", ids)}
+            version = version_datos(conn)
+        for id_reporte in ids:
+            if id_reporte in filas:
+                self.publicar('reporte', filas[id_reporte])
+            else:
+                self.publicar('eliminado', (id_reporte,))
+        with self._condicion:
+            self._version = version
+            self._version_distinta = False
+
+    def verificar_cambios_externos(self):
+        """
+        Escrituras de otro proceso (otra instancia, mantenimiento.py) no marcan
+        reportes: si la versión de los datos difiere de la última publicada en
+        dos verificaciones seguidas, se pide a las páginas que recarguen. (Una
+        sola vez puede ser una escritura propia cuyo callback todavía no corrió.)
+        """
+        ahora = time.monotonic()
+        with self._condicion:
+            if ahora - self._ultima_verificacion < self.verificar_cada:
+                return
+            self._ultima_verificacion = ahora
+        try:
+            with obtener_conexion_lectura() as conn:
+                version = version_datos(conn)
+        except Exception:
+            return
+        recargar = False
+        with self._condicion:
+            if self._version is None:
+                self._version = version
+            elif version != self._version:
+                recargar = self._version_distinta
+                self._version_distinta = True
+            if recargar:
+                self._version = version
+                self._version_distinta = False
+                self.recargas += 1
+        if recargar:
+            self.publicar('recargar', ())
+
+    def tomar_conexion(self):
+        """
+        Cada conexión SSE abierta ocupa un thread de Waitress: pasado el
+        máximo, las demás reciben lo pendiente y vuelven a preguntar más tarde
+        """
+        with self._condicion:
+            if self.conexiones >= self.max_conexiones:
+                return False
+            self.conexiones += 1
+            return True
+
+    def soltar_conexion(self):
+        with self._condicion:
+            self.conexiones -= 1
+
+    def ultimo_id(self):
+        return f"{_ARRANQUE}-{self._ultimo}"
+
+    def _eventos_desde(self, numero):
+        """Eventos posteriores a numero; None si ya salieron del buffer"""
+        if numero > self._ultimo or (self._eventos and numero < self._eventos[0][0] - 1):
+            return None
+        return [e for e in self._eventos if e[0] > numero]
+
+    def esperar(self, id_evento, timeout):
+        """
+        Eventos posteriores a id_evento ('arranque-número'), esperando hasta
+        timeout segundos si no hay ninguno. Lista vacía si no llegó nada;
+        None si id_evento no se puede retomar (reinicio o buffer desbordado).
+        """
+        arranque, _, numero = (id_evento or '').partition('-')
+        if arranque != _ARRANQUE or not numero.isdigit():
+            return None
+        numero = int(numero)
+        with self._condicion:
+            self._condicion.wait_for(lambda: self._ultimo > numero, timeout)
+            eventos = self._eventos_desde(numero)
+        return [(f"{_ARRANQUE}-{n}", tipo, datos) for n, tipo, datos in eventos] if eventos is not None else None
+
+    def estado(self):
+        return {
+            'ultimo': self._ultimo,
+            'en_buffer': len(self._eventos),
+            'publicados': self.publicados,
+            'recargas': self.recargas,
+            'conexiones': self.conexiones,
+            'max_conexiones': self.max_conexiones,
+        }
+
+
+_notificador = Notificador()
+
+
+def marcar(id_reporte):
+    _notificador.marcar(id_reporte)
+
+
+def iniciar_notificador():
+    """Publica tras cada escritura (registrar después de la réplica, así lee datos ya copiados)"""
+    if not _notificador.activo:
+        _notificador.activo = True
+        registrar_al_escribir(_notificador.publicar_marcados)
+
+
+def ultimo_id():
+    return _notificador.ultimo_id()
+
+
+def tomar_conexion():
+    return _notificador.tomar_conexion()
+
+
+def soltar_conexion():
+    _notificador.soltar_conexion()
+
+
+def esperar(id_evento, timeout):
+    _notificador.verificar_cambios_externos()
+    return _notificador.esperar(id_evento, timeout)
+
+
+def estado_notificador():
+    return _notificador.estado()
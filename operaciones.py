@@ -0,0 +1,183 @@
+"""
+Escrituras sobre la BD de reportes
+Cada función recibe la conexión como primer argumento y no confirma: la
+ejecuta el escritor (escritor.py) dentro de su transacción por lotes.
+Uso: escritor.ejecutar(operaciones.crear_reporte, piso, oficina, ...)
+Las que cambian un reporte anotan además sus eventos (migración 7) con el
+origen indicado ('web' o 'bot') y lo marcan para los avisos en vivo
+(notificador.py), que se publican recién después del COMMIT.
+"""
+import notificador
+from fechas import fecha_a_iso
+from utils import tecnicos_de
+
+
+def fecha_iso(fecha):
+    """
+    Fecha escrita por el usuario ('5/3/24', '05/03/2024'...) -> 'YYYY-MM-DD'.
+    None si no vino ninguna (los triggers usan el día actual); ValueError si
+    no se reconoce, para no guardarla como si fuera de hoy.
+    """
+    if not fecha or not str(fecha).strip():
+        return None
+    iso = fecha_a_iso(fecha)
+    if iso is None:
+        raise ValueError(f"Fecha no reconocida: {fecha} (usa DD/MM/AA)")
+    return iso
+
+
+def sincronizar_resoluciones(conn, id_reporte):
+    """
+    Deja 'resoluciones' igual a lo que dice datos.resuelto_por del reporte:
+    una fila por técnico canónico, con la fecha_resolucion actual. Si el
+    reporte tiene técnico pero no está resuelto se usa la fecha de creación,
+    así cuenta igual en el ranking general y en el ganador del mes.
+    """
+    fila = conn.execute(
+        "SELECT resuelto_por, COALESCE(fecha_resolucion, fecha_creacion) FROM datos WHERE id = ?", (id_reporte,)
+    ).fetchone()
+    tecnicos, fecha = (tecnicos_de(fila[0]), fila[1]) if fila else ([], None)
+
+    marcadores = ', '.join('?' for _ in tecnicos)
+    conn.execute(
+        f"DELETE FROM resoluciones WHERE reporte_id = ? AND tecnico NOT IN ({marcadores})",
+        [id_reporte] + tecnicos
+    )
+    conn.executemany("""
+        INSERT INTO resoluciones (reporte_id, tecnico, fecha) VALUES (?, ?, ?)
+        ON CONFLICT (reporte_id, tecnico) DO UPDATE SET fecha = excluded.fecha
+        WHERE fecha IS NOT excluded.fecha
+    """, [(id_reporte, tecnico, fecha) for tecnico in tecnicos])
+
+
+def registrar_evento(conn, id_reporte, tipo, origen, estado_anterior=None, detalle=None):
+    """
+    Agrega un evento con el estado, piso, oficina y técnicos actuales del
+    reporte (llamar después de escribirlo, o antes de borrarlo)
+    """
+    notificador.marcar(id_reporte)
+    conn.execute("""
+        INSERT INTO eventos (reporte_id, tipo, estado_anterior, estado, piso, oficina, tecnicos, detalle, origen)
+        SELECT d.id, ?, ?, d.estado, d.piso, d.oficina,
+               (SELECT json_group_array(r.tecnico) FROM resoluciones r WHERE r.reporte_id = d.id),
+               ?, ?
+        FROM datos d WHERE d.id = ?
+    """, (tipo, estado_anterior, detalle, origen, id_reporte))
+
+
+def _situacion(conn, id_reporte):
+    return conn.execute("SELECT estado, resuelto_por FROM datos WHERE id = ?", (id_reporte,)).fetchone()
+
+
+def _registrar_cambios(conn, id_reporte, antes, origen):
+    """Eventos de cambio de estado y de asignación respecto de `antes` (_situacion previa)"""
+    notificador.marcar(id_reporte)
+    despues = _situacion(conn, id_reporte)
+    if antes is None or despues is None:
+        return
+    if despues[0] != antes[0]:
+        registrar_evento(conn, id_reporte, 'estado', origen, estado_anterior=antes[0])
+    if despues[1] and tecnicos_de(despues[1]) != tecnicos_de(antes[1]):
+        registrar_evento(conn, id_reporte, 'asignado', origen, detalle=despues[1])
+
+
+def crear_reporte(conn, piso, oficina, quien, razon, estado, fecha, resuelto_por='', origen='web'):
+    """Inserta un reporte y devuelve su id"""
+    iso = fecha_iso(fecha)
+    cur = conn.execute("""
+        INSERT INTO datos (piso, oficina, quien, razon, estado, fecha, resuelto_por,
+                           fecha_creacion, fecha_resolucion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (piso, oficina, quien, razon, estado, fecha, resuelto_por,
+          iso, iso if estado == 'resuelto' else None))
+    sincronizar_resoluciones(conn, cur.lastrowid)
+    registrar_evento(conn, cur.lastrowid, 'creado', origen, detalle=resuelto_por or None)
+    return cur.lastrowid
+
+
+def editar_reporte(conn, id_reporte, piso, oficina, quien, razon, estado, resuelto_por='', fecha=None, origen='web'):
+    """Actualiza todos los campos; 'fecha' solo se toca al resolver"""
+    antes = _situacion(conn, id_reporte)
+    if estado == 'resuelto':
+        cur = conn.execute("""
+            UPDATE datos
+            SET piso=?, oficina=?, quien=?, razon=?, estado=?, resuelto_por=?, fecha=?,
+                fecha_resolucion=COALESCE(?, fecha_resolucion)
+            WHERE id=?
+        """, (piso, oficina, quien, razon, estado, resuelto_por, fecha, fecha_iso(fecha), id_reporte))
+    else:
+        cur = conn.execute("""
+            UPDATE datos
+            SET piso=?, oficina=?, quien=?, razon=?, estado=?, resuelto_por=''
+            WHERE id=?
+        """, (piso, oficina, quien, razon, estado, id_reporte))
+    sincronizar_resoluciones(conn, id_reporte)
+    _registrar_cambios(conn, id_reporte, antes, origen)
+    return cur.rowcount
+
+
+def resolver_reporte(conn, id_reporte, resuelto_por, fecha=None, origen='web'):
+    """Marca como resuelto. Sin fecha se conserva la del reporte"""
+    antes = _situacion(conn, id_reporte)
+    if fecha:
+        cur = conn.execute(
+            "UPDATE datos SET estado = 'resuelto', resuelto_por = ?, fecha = ?, "
+            "fecha_resolucion = COALESCE(?, fecha_resolucion) WHERE id = ?",
+            (resuelto_por, fecha, fecha_iso(fecha), id_reporte)
+        )
+    else:
+        cur = conn.execute(
+            "UPDATE datos SET estado = 'resuelto', resuelto_por = ? WHERE id = ?",
+            (resuelto_por, id_reporte)
+        )
+    sincronizar_resoluciones(conn, id_reporte)
+    _registrar_cambios(conn, id_reporte, antes, origen)
+    return cur.rowcount
+
+
+def cambiar_estado(conn, id_reporte, estado, origen='web'):
+    """Pasa a un estado no resuelto (borra resuelto_por)"""
+    antes = _situacion(conn, id_reporte)
+    cur = conn.execute(
+        "UPDATE datos SET estado = ?, resuelto_por = '' WHERE id = ?",
+        (estado, id_reporte)
+    )
+    sincronizar_resoluciones(conn, id_reporte)
+    _registrar_cambios(conn, id_reporte, antes, origen)
+    return cur.rowcount
+
+
+def agregar_comentario(conn, id_reporte, comentario, autor, fecha, origen='web'):
+    """Agrega un comentario. Devuelve su id, o None si el reporte no existe"""
+    if not conn.execute("SELECT 1 FROM datos WHERE id = ?", (id_reporte,)).fetchone():
+        return None
+    cur = conn.execute("""
+        INSERT INTO comentarios (reporte_id, comentario, autor, fecha)
+        VALUES (?, ?, ?, ?)
+    """, (id_reporte, comentario, autor, fecha))
+    registrar_evento(conn, id_reporte, 'comentario', origen, detalle=autor)
+    return cur.lastrowid
+
+
+def eliminar_comentario(conn, id_reporte, id_comentario, origen='web'):
+    """Borra un comentario del reporte. Devuelve 0 si no existe o es de otro reporte"""
+    fila = conn.execute(
+        "SELECT autor FROM comentarios WHERE id = ? AND reporte_id = ?", (id_comentario, id_reporte)
+    ).fetchone()
+    if not fila:
+        return 0
+    cur = conn.execute("DELETE FROM comentarios WHERE id = ? AND reporte_id = ?", (id_comentario, id_reporte))
+    registrar_evento(conn, id_reporte, 'comentario', origen, detalle=f"eliminado ({fila[0]})")
+    return cur.rowcount
+
+
+def eliminar_reporte(conn, id_reporte, origen='web'):
+    """
+    Borra el reporte, sus comentarios y resoluciones (foreign_keys está
+    apagado, no hay CASCADE). Sus eventos quedan en el historial.
+    """
+    registrar_evento(conn, id_reporte, 'eliminado', origen)
+    conn.execute("DELETE FROM comentarios WHERE reporte_id = ?", (id_reporte,))
+    conn.execute("DELETE FROM resoluciones WHERE reporte_id = ?", (id_reporte,))
+    cur = conn.execute("DELETE FROM datos WHERE id = ?", (id_reporte,))
+    return cur.rowcount
@@ -0,0 +1,152 @@
+"""
+Precálculo en segundo plano de estadísticas y reportes del bot
+Un thread recalcula los caches (estadisticas.py, reportes.py) poco después
+de cada escritura, al cambiar el día y si detecta cambios hechos por otro
+proceso, para que las requests encuentren el resultado ya calculado.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+from config import PLANIFICADOR_DEBOUNCE, PLANIFICADOR_DEMORA_MAX, PLANIFICADOR_VERIFICAR_CADA
+from database import obtener_conexion_lectura, version_datos, registrar_al_escribir
+
+
+def _segundos_hasta_medianoche():
+    manana = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return (manana - datetime.now()).total_seconds()
+
+
+class Planificador:
+    """
+    Corre las tareas registradas cuando cambian los datos (agrupando las
+    escrituras seguidas: espera `debounce` segundos sin avisos nuevos, pero
+    nunca más de `demora_max` desde el primero) y a medianoche.
+    """
+
+    def __init__(self, debounce=PLANIFICADOR_DEBOUNCE, demora_max=PLANIFICADOR_DEMORA_MAX,
+                 verificar_cada=PLANIFICADOR_VERIFICAR_CADA):
+        self.debounce = debounce
+        self.demora_max = demora_max
+        self.verificar_cada = verificar_cada
+        self._tareas = {}         # nombre -> función sin argumentos
+        self._metricas = {}       # nombre -> dict (ver estado())
+        self._aviso = threading.Event()
+        self._lock = threading.Lock()
+        self._primer_aviso = None
+        self._ultimo_aviso = None
+        self._version = None
+        self._dia = None
+        self._thread = None
+
+    def registrar(self, nombre, funcion):
+        self._tareas[nombre] = funcion
+        self._metricas[nombre] = {
+            'ejecuciones': 0,
+            'errores': 0,
+            'ultima_duracion_ms': None,
+            'ultimo_exito': None,
+            'ultimo_error': None,
+            'ultimo_motivo': None,
+        }
+
+    def avisar_cambio(self):
+        """Callback post-escritura: programa un recálculo"""
+        ahora = time.monotonic()
+        with self._lock:
+            self._primer_aviso = self._primer_aviso or ahora
+            self._ultimo_aviso = ahora
+        self._aviso.set()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._bucle, name='planificador', daemon=True)
+            self._thread.start()
+
+    def _ejecutar(self, motivo):
+        with obtener_conexion_lectura() as conn:
+            self._version = version_datos(conn)
+        self._dia = date.today()
+        for nombre, funcion in self._tareas.items():
+            metricas = self._metricas[nombre]
+            inicio = time.perf_counter()
+            try:
+                funcion()
+                metricas['ultimo_exito'] = datetime.now()
+            except Exception as e:
+                metricas['errores'] += 1
+                metricas['ultimo_error'] = f"{datetime.now():%d/%m/%y %H:%M:%S} {e}"
+                print(f"⚠️ Planificador: falló '{nombre}': {e}")
+            metricas['ejecuciones'] += 1
+            metricas['ultima_duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+            metricas['ultimo_motivo'] = motivo
+
+    def _hubo_cambios_externos(self):
+        """Escrituras de otro proceso (otra instancia, mantenimiento.py) no avisan"""
+        try:
+            with obtener_conexion_lectura() as conn:
+                return version_datos(conn) != self._version
+        except Exception:
+            return False
+
+    def _espera(self):
+        """Segundos hasta lo próximo que hay que hacer (<= 0: recalcular ya)"""
+        espera = min(self.verificar_cada, _segundos_hasta_medianoche() + 1)
+        with self._lock:
+            if self._ultimo_aviso is not None:
+                ahora = time.monotonic()
+                espera = min(espera,
+                             self._ultimo_aviso + self.debounce - ahora,
+                             self._primer_aviso + self.demora_max - ahora)
+        return espera
+
+    def _bucle(self):
+        motivo = 'arranque'
+        while True:
+            if motivo:
+                try:
+                    self._ejecutar(motivo)
+                except Exception as e:
+                    print(f"⚠️ Planificador: {e}")
+                motivo = None
+
+            espera = self._espera()
+            if espera > 0:
+                self._aviso.wait(espera)
+                self._aviso.clear()
+                espera = self._espera()
+
+            if espera <= 0 and self._ultimo_aviso is not None:
+                with self._lock:
+                    self._primer_aviso = self._ultimo_aviso = None
+                motivo = 'cambio de datos'
+            elif date.today() != self._dia:
+                motivo = 'cambio de día'
+            elif self._ultimo_aviso is None and self._hubo_cambios_externos():
+                motivo = 'cambio externo'
+
+    def estado(self):
+        return {
+            'activo': self._thread is not None and self._thread.is_alive(),
+            'pendiente': self._ultimo_aviso is not None,
+            'tareas': {nombre: dict(m) for nombre, m in self._metricas.items()},
+        }
+
+
+_planificador = Planificador()
+
+
+def iniciar_planificador():
+    """Registra los precálculos y arranca el thread (una vez, al iniciar la app)"""
+    from estadisticas import obtener_estadisticas
+    from reportes import precalcular_reportes
+    if _planificador._thread is None:
+        # Primero las estadísticas: los reportes del bot las reutilizan
+        _planificador.registrar('estadisticas', obtener_estadisticas)
+        _planificador.registrar('reportes del bot', precalcular_reportes)
+        registrar_al_escribir(_planificador.avisar_cambio)
+        _planificador.iniciar()
+        print("⏱️ Planificador de estadísticas iniciado")
+
+
+def estado_planificador():
+    return _planificador.estado()
@@ -0,0 +1,155 @@
+"""
+Réplica local de la BD de reportes (modo opcional)
+
+La BD autoritativa vive en el recurso de red. Con REPLICA_LOCAL_PATH
+configurado, el proceso mantiene una copia en disco local para las
+lecturas: se copia entera al arrancar (API de backup de SQLite) y después
+se actualiza de forma incremental leyendo la tabla 'cambios', que los
+triggers de la BD autoritativa llenan en cada INSERT/UPDATE/DELETE.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+# Tablas cuyos cambios se copian fila a fila, en este orden: hijas antes que
+# datos, así los valores remotos de las columnas que los triggers de las
+# hijas recalculan (datos.num_comentarios) pisan lo que calculan los locales.
+# Las tablas derivadas que se mantienen solo con triggers no hace falta
+# listarlas: los triggers locales las actualizan al aplicar estas filas.
+TABLAS_REPLICADAS = ('comentarios', 'resoluciones', 'datos', 'eventos')
+
+
+class ReplicaLocal:
+    """Copia local de solo lectura, sincronizada desde la BD remota"""
+
+    def __init__(self, ruta_local, conexion_remota, sincronizar_cada=5):
+        self.ruta_local = ruta_local
+        self._conexion_remota = conexion_remota   # context manager factory (pool remoto)
+        self.sincronizar_cada = sincronizar_cada
+        self._lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        self._detener = threading.Event()
+        self.lista = False
+        self.ultimo_seq = 0
+        self.ultima_sincronizacion = None
+        self.ultimo_error = None
+        self.filas_aplicadas = 0
+        self.copias_completas = 0
+
+    # ---------- copia completa ----------
+
+    def _copia_completa(self, remota):
+        """Copia toda la BD con la API de backup (snapshot consistente)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.ruta_local, check_same_thread=False)
+        remota.backup(self._conn)
+        self._conn.execute("PRAGMA journal_mode = TRUNCATE")
+        self._conn.execute("PRAGMA synchronous = OFF")   # es descartable
+        fila = self._conn.execute("SELECT MAX(seq) FROM cambios").fetchone()
+        self.ultimo_seq = fila[0] or 0
+        self._conn.execute("DELETE FROM cambios")
+        self._conn.commit()
+        self.copias_completas += 1
+
+    # ---------- sincronización incremental ----------
+
+    def _columnas(self, tabla):
+        info = self._conn.execute(f"PRAGMA table_info({tabla})").fetchall()
+        columnas = [c[1] for c in info]
+        pk = [c[1] for c in sorted(info, key=lambda c: c[5]) if c[5]]
+        return columnas, pk
+
+    def _aplicar(self, tabla, fila_id, fila):
+        if fila is None:
+            self._conn.execute(f"DELETE FROM {tabla} WHERE rowid = ?", (fila_id,))
+            return
+        columnas, pk = self._columnas(tabla)
+        marcadores = ', '.join('?' for _ in columnas)
+        asignaciones = ', '.join(f"{c} = excluded.{c}" for c in columnas if c not in pk)
+        # UPSERT (no REPLACE) para que se disparen los triggers de UPDATE locales
+        self._conn.execute(
+            f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores}) "
+            f"ON CONFLICT({', '.join(pk)}) DO UPDATE SET {asignaciones}",
+            fila
+        )
+
+    def _version_esquema(self, conn):
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def sincronizar(self):
+        """Trae de la BD remota los cambios posteriores a ultimo_seq"""
+        with self._lock:
+            try:
+                with self._conexion_remota() as remota:
+                    # Una sola transacción de lectura: cambios y filas consistentes
+                    remota.execute("BEGIN")
+                    if (self._conn is None
+                            or self._version_esquema(remota) != self._version_esquema(self._conn)):
+                        self._copia_completa(remota)
+                    else:
+                        self._sincronizar_cambios(remota)
+                    remota.rollback()
+                self.lista = True
+                self.ultima_sincronizacion = datetime.now()
+                self.ultimo_error = None
+            except sqlite3.Error as e:
+                self.ultimo_error = str(e)
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.rollback()
+                print(f"⚠️ Réplica local: error al sincronizar: {e}")
+
+    def _sincronizar_cambios(self, remota):
+        cambios = remota.execute(
+            "SELECT seq, tabla, fila_id FROM cambios WHERE seq > ? ORDER BY seq",
+            (self.ultimo_seq,)
+        ).fetchall()
+        if not cambios:
+            return
+        if cambios[0][0] != self.ultimo_seq + 1:
+            # Se purgaron cambios que no llegamos a aplicar
+            print("⚠️ Réplica local: hueco en el registro de cambios, copia completa")
+            self._copia_completa(remota)
+            return
+
+        # Cada fila se copia una sola vez aunque haya cambiado varias veces
+        pendientes = {}
+        for _, tabla, fila_id in cambios:
+            if tabla in TABLAS_REPLICADAS:
+                pendientes[(tabla, fila_id)] = None
+
+        for tabla, fila_id in sorted(pendientes, key=lambda p: TABLAS_REPLICADAS.index(p[0])):
+            fila = remota.execute(f"SELECT * FROM {tabla} WHERE rowid = ?", (fila_id,)).fetchone()
+            self._aplicar(tabla, fila_id, fila)
+        self._conn.execute("DELETE FROM cambios")
+        self._conn.commit()
+
+        self.ultimo_seq = cambios[-1][0]
+        self.filas_aplicadas += len(pendientes)
+
+    # ---------- ciclo de vida ----------
+
+    def _bucle(self):
+        while not self._detener.wait(self.sincronizar_cada):
+            self.sincronizar()
+
+    def iniciar(self):
+        """Copia inicial y thread de resincronización en segundo plano"""
+        self.sincronizar()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._bucle, name='replica-local', daemon=True)
+            self._thread.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def estado(self):
+        return {
+            'ruta': self.ruta_local,
+            'lista': self.lista,
+            'ultimo_seq': self.ultimo_seq,
+            'ultima_sincronizacion': self.ultima_sincronizacion,
+            'filas_aplicadas': self.filas_aplicadas,
+            'copias_completas': self.copias_completas,
+            'ultimo_error': self.ultimo_error,
+        }
@@ -1,46 +1,59 @@
 """
 Generación de reportes para Telegram
 """
-from datetime import datetime
-from database import obtener_conexion
-from utils import normalizar_nombre
+from datetime import date, datetime
+from cache import CacheVersionada
+from database import obtener_conexion_lectura, version_datos
+from estadisticas import obtener_estadisticas
+
+# Reportes cuyo texto depende de la fecha además de los datos
+REPORTES_DEL_DIA = {'hoy', 'semana'}
+
+# Texto ya armado por tipo de reporte; se descarta todo con cada escritura
+_cache = CacheVersionada(max_entradas=16)
+
+TIPOS_REPORTE = ('general', 'pendientes', 'hoy', 'semana', 'estadisticas')
+
+def _clave(tipo):
+    # Los de fecha relativa vencen además al cambiar el día
+    return (tipo, date.today()) if tipo in REPORTES_DEL_DIA else tipo
 
 def generar_reporte_texto(tipo='general'):
     """Genera un reporte en formato texto para Telegram"""
-    conn = obtener_conexion()
-    cur = conn.cursor()
-    
     try:
-        if tipo == 'general':
-            return _generar_reporte_general(cur)
-        elif tipo == 'pendientes':
-            return _generar_reporte_pendientes(cur)
-        elif tipo == 'hoy':
-            return _generar_reporte_hoy(cur)
-        elif tipo == 'semana':
-            return _generar_reporte_semana(cur)
-        elif tipo == 'estadisticas':
-            return _generar_estadisticas(cur)
+        with obtener_conexion_lectura() as conn:
+            return _cache.obtener(version_datos(conn), _clave(tipo), lambda: _generar(conn, tipo))
     except Exception as e:
         return f"❌ Error: {str(e)}"
-    finally:
-        conn.close()
 
-def _generar_reporte_general(cur):
-    cur.execute("SELECT COUNT(*) FROM datos")
-    total = cur.fetchone()[0]
-    
-    cur.execute("SELECT estado, COUNT(*) FROM datos GROUP BY estado")
-    por_estado = dict(cur.fetchall())
-    
-    cur.execute("""
-        SELECT piso, COUNT(*) 
-        FROM datos 
-        GROUP BY piso 
-        ORDER BY COUNT(*) DESC 
-        LIMIT 5
-    """)
-    por_piso = cur.fetchall()
+def precalcular_reportes():
+    """Deja en cache todos los reportes de la versión actual (lo usa planificador.py)"""
+    with obtener_conexion_lectura() as conn:
+        version = version_datos(conn)
+        for tipo in TIPOS_REPORTE:
+            _cache.obtener(version, _clave(tipo), lambda: _generar(conn, tipo))
+
+def _generar(conn, tipo):
+    # Los resúmenes salen del mismo cálculo que la página de estadísticas
+    if tipo == 'general':
+        return _generar_reporte_general(obtener_estadisticas(conn))
+    elif tipo == 'semana':
+        return _generar_reporte_semana(obtener_estadisticas(conn))
+    elif tipo == 'estadisticas':
+        return _generar_estadisticas(obtener_estadisticas(conn))
+    elif tipo == 'pendientes':
+        return _generar_reporte_pendientes(conn.cursor())
+    elif tipo == 'hoy':
+        return _generar_reporte_hoy(conn.cursor())
+
+def estado_cache():
+    """Aciertos / cálculos del cache de reportes"""
+    return _cache.estado()
+
+def _generar_reporte_general(est):
+    total = est.total
+    por_estado = est.por_estado
+    por_piso = est.por_piso[:5]
     
     reporte = f"📊 *REPORTE GENERAL DE TICKETS*\n\n"
     reporte += f"📈 Total de reportes: *{total}*\n\n"
@@ -59,7 +72,7 @@ def _generar_reporte_pendientes(cur):
     cur.execute("""
         SELECT id, piso, oficina, quien, razon, fecha
         FROM datos 
-        WHERE estado = 'pendiente'
+        WHERE estado != 'resuelto' AND estado = 'pendiente'
         ORDER BY id DESC
         LIMIT 10
     """)
@@ -81,18 +94,19 @@ def _generar_reporte_pendientes(cur):
     return reporte
 
 def _generar_reporte_hoy(cur):
-    fecha_hoy = datetime.now().strftime("%d/%m/%y")
-    
-    cur.execute("SELECT COUNT(*) FROM datos WHERE fecha = ?", (fecha_hoy,))
-    total_hoy = cur.fetchone()[0]
+    hoy = datetime.now()
+    fecha_hoy = hoy.strftime("%d/%m/%y")
+    hoy_iso = hoy.strftime("%Y-%m-%d")
     
+    # Creados o resueltos hoy (ambas columnas indexadas)
     cur.execute("""
         SELECT id, piso, oficina, quien, razon, estado, resuelto_por
         FROM datos 
-        WHERE fecha = ?
+        WHERE fecha_creacion = ? OR fecha_resolucion = ?
         ORDER BY id DESC
-    """, (fecha_hoy,))
+    """, (hoy_iso, hoy_iso))
     reportes_hoy = cur.fetchall()
+    total_hoy = len(reportes_hoy)
     
     reporte = f"📅 *REPORTES DE HOY* ({fecha_hoy})\n\nTotal: *{total_hoy}* reportes\n\n"
     
@@ -112,54 +126,12 @@ def _generar_reporte_hoy(cur):
     
     return reporte
 
-def _generar_reporte_semana(cur):
-    cur.execute("""
-        SELECT COUNT(*) FROM datos 
-        WHERE DATE(substr(fecha, 7, 2) || '-' || substr(fecha, 4, 2) || '-20' || substr(fecha, 1, 2)) 
-        >= DATE('now', '-7 days')
-    """)
-    total_semana = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM datos")
-    total = cur.fetchone()[0]
-    
-    cur.execute("""
-        SELECT estado, COUNT(*) 
-        FROM datos 
-        WHERE DATE(substr(fecha, 7, 2) || '-' || substr(fecha, 4, 2) || '-20' || substr(fecha, 1, 2)) 
-        >= DATE('now', '-7 days')
-        GROUP BY estado
-    """)
-    por_estado = dict(cur.fetchall())
-    
-    # Obtener empleados de la semana - cada persona recibe 1 punto por trabajo
-    cur.execute("""
-        SELECT resuelto_por
-        FROM datos 
-        WHERE resuelto_por != '' 
-        AND resuelto_por IS NOT NULL
-        AND estado = 'resuelto'
-        AND DATE(substr(fecha, 7, 2) || '-' || substr(fecha, 4, 2) || '-20' || substr(fecha, 1, 2)) 
-        >= DATE('now', '-7 days')
-    """)
-    resultados = cur.fetchall()
-    
-    from utils import dividir_nombres
-    empleados_contados = {}
-    
-    for (nombre_completo,) in resultados:
-        nombres = dividir_nombres(nombre_completo)
-        # Cada persona recibe 1 punto completo
-        for nombre in nombres:
-            if nombre in empleados_contados:
-                empleados_contados[nombre] += 1
-            else:
-                empleados_contados[nombre] = 1
-    
-    # Obtener el empleado con más puntos
-    empleado_semana = None
-    if empleados_contados:
-        empleado_semana = max(empleados_contados.items(), key=lambda x: x[1])
+def _generar_reporte_semana(est):
+    por_estado = est.semana_por_estado
+    total_semana = est.total_semana
+    total = est.total
+    # Empleado de la semana - cada persona recibe 1 punto por trabajo
+    empleado_semana = est.empleado_semana
     
     reporte = f"📊 *REPORTE SEMANAL*\n(Últimos 7 días)\n\n"
     reporte += f"📈 Total esta semana: *{total_semana}*\n"
@@ -175,49 +147,13 @@ def _generar_reporte_semana(cur):
     
     return reporte
 
-def _generar_estadisticas(cur):
-    cur.execute("SELECT COUNT(*) FROM datos")
-    total = cur.fetchone()[0]
-    
-    cur.execute("SELECT estado, COUNT(*) FROM datos GROUP BY estado")
-    por_estado = dict(cur.fetchall())
-    
-    cur.execute("""
-        SELECT oficina, COUNT(*) as total 
-        FROM datos 
-        GROUP BY oficina 
-        ORDER BY total DESC 
-        LIMIT 5
-    """)
-    top_oficinas = cur.fetchall()
-    
-    # Obtener todos los registros con resuelto_por
-    cur.execute("""
-        SELECT resuelto_por
-        FROM datos 
-        WHERE resuelto_por != '' AND resuelto_por IS NOT NULL
-    """)
-    resultados = cur.fetchall()
-    
-    # Contar: cada persona recibe 1 punto por cada trabajo, sin importar cuántas personas participaron
-    from utils import dividir_nombres
-    empleados_contados = {}
-    
-    for (nombre_completo,) in resultados:
-        nombres = dividir_nombres(nombre_completo)
-        # Cada persona recibe 1 punto completo
-        for nombre in nombres:
-            if nombre in empleados_contados:
-                empleados_contados[nombre] += 1
-            else:
-                empleados_contados[nombre] = 1
-    
-    # Ordenar y obtener top 5
-    top_resueltos = sorted(empleados_contados.items(), key=lambda x: x[1], reverse=True)[:5]
-    
-    cur.execute("SELECT COUNT(DISTINCT substr(fecha, 4, 5)) FROM datos")
-    meses = cur.fetchone()[0] or 1
-    promedio_mes = total / meses
+def _generar_estadisticas(est):
+    total = est.total
+    por_estado = est.por_estado
+    top_oficinas = est.por_oficina[:5]
+    # Cada persona recibe 1 punto por trabajo, sin importar cuántas participaron
+    top_resueltos = est.ranking_tecnicos[:5]
+    promedio_mes = est.promedio_mensual
     
     reporte = f"📊 *ESTADÍSTICAS COMPLETAS*\n\n"
     reporte += f"📈 Total histórico: *{total}*\n"
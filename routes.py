@@ -1,109 +1,92 @@
 """
 Rutas de Flask
 """
-from flask import render_template, request, redirect, send_file, flash, jsonify
-from datetime import datetime, timedelta
-from io import BytesIO
-import openpyxl
+from flask import (Response, render_template, stream_with_context, request, redirect, flash, jsonify,
+                   url_for)
+from datetime import date, datetime, timedelta
 import json
-from collections import defaultdict
+import os
+import time
+
+from database import obtener_conexion_lectura, estado_pool, estado_replica
+import escritor
+import exportador
+import notificador
+import tickets
+import trabajos
+import operaciones
+import reportes
+import analitica
+import series
+from catalogo import oficinas_json, estado_catalogo
+from compresion import registrar_compresion
+from condicional import respuesta_condicional
+from planificador import estado_planificador
+from trabajos import estado_trabajo
+from estadisticas import obtener_estadisticas, contexto_plantilla, tendencias_json, como_dict, estado_cache
+from estaticos import registrar_estaticos
+from config import EMPLEADOS, API_LIMITE_MAX, SSE_LATIDO, SSE_DURACION, SSE_REINTENTO_MS, SSE_REINTENTO_OCUPADO_MS
 
-from database import obtener_conexion, obtener_conexion_oficinas
-from utils import normalizar_nombre, dividir_nombres
-from config import EMPLEADOS
-
-
-def parse_fecha_flexible(s):
-    """Intenta interpretar distintos formatos de fecha"""
-    if not s:
-        return None
-    s = str(s).strip()
-    for fmt in ("%d/%m/%y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d-%m-%y"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            continue
-    return None
 
 def registrar_rutas(app):
     """Registra todas las rutas de Flask"""
-    
+    registrar_estaticos(app)
+    registrar_compresion(app)
+
+    def _filtros_listado(args):
+        """Filtros del listado comunes a la página y a /api/v1/tickets"""
+        return dict(estado=args.get('estado') or None,
+                    piso=args.get('piso', type=int),
+                    busqueda=args.get('busqueda') or None,
+                    desde=date.fromisoformat(args['desde']) if args.get('desde') else None,
+                    hasta=date.fromisoformat(args['hasta']) if args.get('hasta') else None,
+                    despues=args.get('despues', type=int),
+                    antes=args.get('antes', type=int),
+                    pagina=args.get('pagina', 1, type=int),
+                    orden=args.get('orden') or None)
+
+    def _pagina_json(pagina, formato):
+        datos = {k: pagina[k] for k in ('total', 'pagina', 'paginas', 'limite', 'orden', 'anterior', 'siguiente')}
+        return {'campos': pagina['campos'],
+                'tickets': tickets.codificar(pagina['campos'], pagina['filas'], formato),
+                **datos}
+
     @app.route('/')
+    @respuesta_condicional
     def index():
+        """
+        Solo el esqueleto de la página y la primera página de tickets en JSON:
+        la tabla la arma el navegador, que pide los cambios de filtro y de
+        página a /api/v1/tickets sin recargar el documento
+        """
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            
-            filtro_estado = request.args.get('estado', '')
-            filtro_piso = request.args.get('piso', '')
-            busqueda = request.args.get('busqueda', '')
             limite = request.args.get('limite', '50')
-            pagina_actual = int(request.args.get('pagina', 1))
-            
-            query = "SELECT d.*, (SELECT COUNT(*) FROM comentarios WHERE reporte_id = d.id) as num_comentarios FROM datos d WHERE 1=1"
-            params = []
-            
-            if filtro_estado:
-                query += " AND d.estado = ?"
-                params.append(filtro_estado)
-            
-            if filtro_piso:
-                query += " AND d.piso = ?"
-                params.append(filtro_piso)
-            
-            if busqueda:
-                query += " AND (d.oficina LIKE ? OR d.quien LIKE ? OR d.razon LIKE ?)"
-                busqueda_param = f"%{busqueda}%"
-                params.extend([busqueda_param, busqueda_param, busqueda_param])
-            
-            query += " ORDER BY d.id DESC"
-            
-            query_total = "SELECT COUNT(*) FROM datos d WHERE 1=1"
-            params_total = []
-            
-            if filtro_estado:
-                query_total += " AND d.estado = ?"
-                params_total.append(filtro_estado)
-            
-            if filtro_piso:
-                query_total += " AND d.piso = ?"
-                params_total.append(filtro_piso)
-            
-            if busqueda:
-                query_total += " AND (d.oficina LIKE ? OR d.quien LIKE ? OR d.razon LIKE ?)"
-                params_total.extend([busqueda_param, busqueda_param, busqueda_param])
-            
-            cur.execute(query_total, params_total)
-            total_reportes = cur.fetchone()[0]
-            
-            total_paginas = 1
-            
-            if limite != 'todos':
-                try:
-                    limite_num = int(limite)
-                    total_paginas = (total_reportes + limite_num - 1) // limite_num
-                    offset = (pagina_actual - 1) * limite_num
-                    query += f" LIMIT {limite_num} OFFSET {offset}"
-                except:
-                    limite = '50'
-            
-            cur.execute(query, params)
-            reportes = cur.fetchall()
-            
-            cur.execute("SELECT DISTINCT piso FROM datos ORDER BY piso")
-            pisos_disponibles = [p[0] for p in cur.fetchall()]
-            conn.close()
-            
-            return render_template('index.html', 
-                                 reportes=reportes,
-                                 total_reportes=total_reportes,
-                                 pisos_disponibles=pisos_disponibles,
-                                 filtro_estado=filtro_estado,
-                                 filtro_piso=filtro_piso,
-                                 busqueda=busqueda,
-                                 limite=limite,
-                                 pagina_actual=pagina_actual,
-                                 total_paginas=total_paginas)
+            if limite not in ('50', '100', 'todos'):
+                limite = '50'
+            # Antes de leer: los cambios que lleguen mientras tanto se reciben por /api/eventos
+            evento_inicial = notificador.ultimo_id()
+
+            with obtener_conexion_lectura() as conn:
+                # Con 'todos' el navegador sigue pidiendo de a API_LIMITE_MAX hasta el final
+                pagina = tickets.listar(conn, tickets.CAMPOS_LISTADO,
+                                        limite=API_LIMITE_MAX if limite == 'todos' else int(limite),
+                                        **_filtros_listado(request.args))
+                pisos_disponibles = [p[0] for p in conn.execute("SELECT DISTINCT piso FROM datos ORDER BY piso")]
+                ultimo_id = conn.execute("SELECT MAX(id) FROM datos").fetchone()[0] or 0
+
+            return render_template('index.html',
+                                   inicial=_pagina_json(pagina, 'filas'),
+                                   pisos_disponibles=pisos_disponibles,
+                                   ultimo_id=ultimo_id,
+                                   filtro_estado=request.args.get('estado', ''),
+                                   filtro_piso=request.args.get('piso', ''),
+                                   busqueda=request.args.get('busqueda', ''),
+                                   limite=limite,
+                                   limite_max=API_LIMITE_MAX,
+                                   evento_inicial=evento_inicial)
+        except ValueError as e:
+            # Filtro mal escrito en la URL (?desde=xx, ?orden=...): error del pedido
+            return f"Error: {str(e)}", 400
         except Exception as e:
             return f"Error: {str(e)}", 500
 
@@ -129,14 +112,7 @@ def registrar_rutas(app):
                     flash('Todos los campos son obligatorios', 'error')
                     return redirect('/nuevo')
 
-                conn = obtener_conexion()
-                cur = conn.cursor()
-                cur.execute("""
-                    INSERT INTO datos (piso, oficina, quien, razon, estado, fecha, resuelto_por)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (piso, oficina, quien, razon, estado, fecha, resuelto_por))
-                conn.commit()
-                conn.close()
+                escritor.ejecutar(operaciones.crear_reporte, piso, oficina, quien, razon, estado, fecha, resuelto_por)
                 
                 flash('Reporte creado exitosamente', 'success')
                 return redirect('/')
@@ -144,28 +120,10 @@ def registrar_rutas(app):
                 flash(f'Error: {str(e)}', 'error')
                 return redirect('/nuevo')
 
-        oficinas_por_piso = defaultdict(list)
-        
-        conn_oficinas = obtener_conexion_oficinas()
-        if conn_oficinas:
-            try:
-                cur = conn_oficinas.cursor()
-                cur.execute("SELECT nombre_oficina, piso FROM oficinas ORDER BY piso, nombre_oficina")
-                oficinas = cur.fetchall()
-                conn_oficinas.close()
-                for nombre, piso in oficinas:
-                    oficinas_por_piso[str(piso)].append(nombre)
-            except:
-                pass
-
-        oficinas_json = json.dumps(oficinas_por_piso)
-        return render_template('nuevo.html', oficinas_json=oficinas_json, empleados=EMPLEADOS)
+        return render_template('nuevo.html', oficinas_json=oficinas_json(), empleados=EMPLEADOS)
 
     @app.route('/editar/<int:id>', methods=['GET', 'POST'])
     def editar_reporte(id):
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        
         if request.method == 'POST':
             try:
                 piso = request.form['piso']
@@ -174,58 +132,32 @@ def registrar_rutas(app):
                 razon = request.form['razon'].strip()
                 estado = request.form['estado']
                 
-                if estado == 'resuelto':
-                    resuelto_por = request.form.get('resuelto_por', '').strip()
-                    fecha = request.form.get('fecha_resolucion', datetime.now().strftime("%d/%m/%y"))
-                    cur.execute("""
-                        UPDATE datos 
-                        SET piso=?, oficina=?, quien=?, razon=?, estado=?, resuelto_por=?, fecha=?
-                        WHERE id=?
-                    """, (piso, oficina, quien, razon, estado, resuelto_por, fecha, id))
-                else:
-                    cur.execute("""
-                        UPDATE datos 
-                        SET piso=?, oficina=?, quien=?, razon=?, estado=?, resuelto_por=''
-                        WHERE id=?
-                    """, (piso, oficina, quien, razon, estado, id))
+                resuelto_por = request.form.get('resuelto_por', '').strip()
+                fecha = request.form.get('fecha_resolucion', datetime.now().strftime("%d/%m/%y"))
+                escritor.ejecutar(operaciones.editar_reporte, id, piso, oficina, quien, razon, estado, resuelto_por, fecha)
                 
-                conn.commit()
-                conn.close()
                 flash(f'Reporte #{id} actualizado', 'success')
                 return redirect('/')
                 
             except Exception as e:
-                conn.close()
                 flash(f'Error: {str(e)}', 'error')
                 return redirect(f'/editar/{id}')
         
-        cur.execute("SELECT * FROM datos WHERE id = ?", (id,))
-        reporte = cur.fetchone()
-        
-        if not reporte:
-            conn.close()
-            flash(f'Reporte #{id} no encontrado', 'error')
-            return redirect('/')
-        
-        oficinas_por_piso = defaultdict(list)
-        conn_oficinas = obtener_conexion_oficinas()
-        if conn_oficinas:
-            try:
-                cur_oficinas = conn_oficinas.cursor()
-                cur_oficinas.execute("SELECT nombre_oficina, piso FROM oficinas ORDER BY piso, nombre_oficina")
-                oficinas = cur_oficinas.fetchall()
-                conn_oficinas.close()
-                for nombre, piso in oficinas:
-                    oficinas_por_piso[str(piso)].append(nombre)
-            except:
-                pass
-        
-        cur.execute("SELECT * FROM comentarios WHERE reporte_id = ? ORDER BY fecha DESC", (id,))
-        comentarios = cur.fetchall()
-        conn.close()
+        with obtener_conexion_lectura() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, piso, oficina, quien, razon, estado, fecha, resuelto_por, num_comentarios FROM datos WHERE id = ?", (id,))
+            reporte = cur.fetchone()
+            
+            if not reporte:
+                flash(f'Reporte #{id} no encontrado', 'error')
+                return redirect('/')
+            
+            comentarios = []
+            if reporte[8]:
+                cur.execute("SELECT id, reporte_id, comentario, autor, fecha FROM comentarios WHERE reporte_id = ? ORDER BY fecha DESC", (id,))
+                comentarios = cur.fetchall()
         
-        oficinas_json = json.dumps(oficinas_por_piso)
-        return render_template('editar.html', reporte=reporte, comentarios=comentarios, oficinas_json=oficinas_json, empleados=EMPLEADOS)
+        return render_template('editar.html', reporte=reporte, comentarios=comentarios, oficinas_json=oficinas_json(), empleados=EMPLEADOS)
 
     @app.route('/comentario/<int:id>', methods=['POST'])
     def agregar_comentario(id):
@@ -237,24 +169,11 @@ def registrar_rutas(app):
                 flash('El comentario no puede estar vacío', 'error')
                 return redirect(f'/editar/{id}')
             
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            
-            cur.execute("SELECT id FROM datos WHERE id = ?", (id,))
-            if not cur.fetchone():
+            fecha = datetime.now().strftime("%d/%m/%y %H:%M")
+            if escritor.ejecutar(operaciones.agregar_comentario, id, texto, autor, fecha) is None:
                 flash(f'Reporte #{id} no encontrado', 'error')
-                conn.close()
                 return redirect('/')
             
-            fecha = datetime.now().strftime("%d/%m/%y %H:%M")
-            cur.execute("""
-                INSERT INTO comentarios (reporte_id, texto, autor, fecha)
-                VALUES (?, ?, ?, ?)
-            """, (id, texto, autor, fecha))
-            
-            conn.commit()
-            conn.close()
-            
             flash('Comentario agregado', 'success')
             return redirect(f'/editar/{id}')
             
@@ -262,285 +181,199 @@ def registrar_rutas(app):
             flash(f'Error: {str(e)}', 'error')
             return redirect(f'/editar/{id}')
 
+    @app.route('/comentario/<int:reporte_id>/eliminar/<int:comentario_id>', methods=['POST'])
+    def eliminar_comentario(reporte_id, comentario_id):
+        try:
+            if escritor.ejecutar(operaciones.eliminar_comentario, reporte_id, comentario_id):
+                flash('Comentario eliminado', 'success')
+            else:
+                flash(f'Comentario #{comentario_id} no encontrado en el reporte #{reporte_id}', 'error')
+        except Exception as e:
+            flash(f'Error: {str(e)}', 'error')
+        return redirect(f'/editar/{reporte_id}')
+
     @app.route('/estadisticas')
+    @respuesta_condicional
     def estadisticas():
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-
-            # ==============================
-            # Totales generales
-            # ==============================
-            cur.execute("SELECT COUNT(*) FROM datos")
-            total = cur.fetchone()[0]
-
-            # Por estado
-            cur.execute("SELECT estado, COUNT(*) FROM datos GROUP BY estado")
-            por_estado = cur.fetchall()
-
-            # Top oficinas (top 5)
-            cur.execute("""
-                SELECT oficina, COUNT(*) as total 
-                FROM datos 
-                GROUP BY oficina 
-                ORDER BY total DESC 
-                LIMIT 5
-            """)
-            por_oficina = cur.fetchall()
-
-            # Por piso (top 5)
-            cur.execute("""
-                SELECT piso, COUNT(*) as total 
-                FROM datos 
-                GROUP BY piso 
-                ORDER BY total DESC, piso ASC
-                LIMIT 5
-            """)
-            por_piso = cur.fetchall()
-
-            # ==============================
-            # Ranking "resuelto_por" (1 punto por persona) - general
-            # ==============================
-            cur.execute("""
-                SELECT resuelto_por
-                FROM datos 
-                WHERE resuelto_por != '' AND resuelto_por IS NOT NULL
-            """)
-            resultados = cur.fetchall()
-
-            empleados_contados = {}
-            for (nombre_completo,) in resultados:
-                for nombre in dividir_nombres(nombre_completo):
-                    empleados_contados[nombre] = empleados_contados.get(nombre, 0) + 1
-
-            top_resueltos = sorted(
-                empleados_contados.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-
-            # ==============================
-            # Estadísticas por MES (conteo por MM/YY) para gráficos
-            # ==============================
-            cur.execute("""
-                SELECT substr(fecha, 4, 2) || '/' || substr(fecha, 7, 2) AS mes, COUNT(*) AS total 
-                FROM datos 
-                GROUP BY mes
-            """)
-            por_mes_raw = cur.fetchall()  # [('03/25', 62), ('04/25', 51), ...]
-
-            nombres_meses = {
-                "01": "Enero", "02": "Febrero", "03": "Marzo", "04": "Abril",
-                "05": "Mayo", "06": "Junio", "07": "Julio", "08": "Agosto",
-                "09": "Septiembre", "10": "Octubre", "11": "Noviembre", "12": "Diciembre"
-            }
-
-            # Orden cronológico y etiquetas legibles (para tu card de "Reportes por Mes")
-            contador_meses = {}
-            fecha_por_mes = {}
-            for mes_raw, cant in por_mes_raw:
-                try:
-                    mm, yy = mes_raw.split('/')
-                    anio_completo = f"20{yy}" if len(yy) == 2 else yy
-                    fecha_obj = datetime.strptime(f"01/{mm}/{anio_completo}", "%d/%m/%Y")
-                    contador_meses[mes_raw] = cant
-                    fecha_por_mes[mes_raw] = fecha_obj
-                except Exception:
-                    continue
-
-            meses_ordenados_raw = sorted(contador_meses.items(), key=lambda x: fecha_por_mes[x[0]])
-            meses_ordenados_legibles = []
-            for mes_raw, cant in meses_ordenados_raw:
-                mm, yy = mes_raw.split('/')
-                anio_completo = f"20{yy}" if len(yy) == 2 else yy
-                etiqueta = f"{nombres_meses.get(mm, mm)} {anio_completo}"
-                meses_ordenados_legibles.append((etiqueta, cant))
-
-            # ==============================
-            # Promedio mensual/semanal (estimado)
-            # ==============================
-            anios = set()
-            for mes_raw, _ in por_mes_raw:
-                try:
-                    _, yy = mes_raw.split('/')
-                    anios.add(yy)
-                except:
-                    pass
-            yy_target = max(anios) if anios else datetime.now().strftime("%y")
-
-            meses_validos = []
-            for mes_raw, cant in por_mes_raw:
-                try:
-                    mm, yy = mes_raw.split('/')
-                    if yy == yy_target and mm in {f"{i:02d}" for i in range(1, 13)}:
-                        meses_validos.append((mm, cant))
-                except:
-                    pass
-
-            meses_validos.sort(key=lambda x: int(x[0]))
-            meses_validos = meses_validos[:12]
-
-            sum_mes = sum(cant for _, cant in meses_validos)
-            meses_unicos = len(meses_validos) if meses_validos else 1
-            promedio_mes = round(sum_mes / meses_unicos) if meses_unicos > 0 else 0
-
-            dias_trabajados = 21 * meses_unicos
-            promedio_semana = round((sum_mes / dias_trabajados) * 5) if dias_trabajados > 0 else 0
-
-            # ==============================
-            # RANKING HISTÓRICO POR MES (GANADOR/ES DEL MES) - SOLO LUN–VIE
-            # ==============================
-            cur.execute("""
-                SELECT resuelto_por, fecha
-                FROM datos
-                WHERE resuelto_por != '' AND resuelto_por IS NOT NULL
-            """)
-            todas_resoluciones = cur.fetchall()  # [(nombre_completo, 'dd/mm/yy'), ...]
-
-            # Agrupar por mes 'YYYY-MM' contando por técnico solo lun-vie
-            conteo_por_mes = {}  # 'YYYY-MM' -> {tecnico: count}
-            for nombre_completo, fecha_txt in todas_resoluciones:
-                f = parse_fecha_flexible(fecha_txt)
-                if not f or f.weekday() >= 5:
-                    continue
-                clave_mes = f.strftime("%Y-%m")
-                cont = conteo_por_mes.setdefault(clave_mes, {})
-                for nombre in dividir_nombres(nombre_completo):
-                    cont[nombre] = cont.get(nombre, 0) + 1
-
-            # Orden cronológico
-            meses_claves_ordenadas = sorted(conteo_por_mes.keys())
-
-            # Ganadores por mes (puede haber empate) y ranking global de "meses ganados"
-            ganadores_por_mes = {}   # 'YYYY-MM' -> [(nombre, count_max), ... empatados]
-            conteo_meses_ganados = {}  # tecnico -> cantidad de meses ganados
-
-            for clave in meses_claves_ordenadas:
-                ranking = conteo_por_mes[clave]
-                if not ranking:
-                    ganadores_por_mes[clave] = []
-                    continue
-                max_val = max(ranking.values())
-                winners = [(k, v) for k, v in ranking.items() if v == max_val]
-                ganadores_por_mes[clave] = sorted(winners, key=lambda x: x[0].lower())  # orden alfabético estable
-                # sumar 1 por mes ganado a cada ganador (si hubo empate, ambos suman 1 mes ganado)
-                for k, _ in winners:
-                    conteo_meses_ganados[k] = conteo_meses_ganados.get(k, 0) + 1
-
-            # Navegable de meses para el template: [{clave:'YYYY-MM', etiqueta:'Mes Año', winners:[[nombre, n], ...]}]
-            meses_ganadores_navegable = []
-            for clave in meses_claves_ordenadas:
-                anio, mes = clave.split('-')
-                etiqueta = f"{nombres_meses.get(mes, mes)} {anio}"
-                meses_ganadores_navegable.append({
-                    "clave": clave,
-                    "etiqueta": etiqueta,
-                    "winners": ganadores_por_mes.get(clave, []),
-                })
-
-            # Top 3 global de “Ganadores del Mes”
-            top3_ganadores_mes = sorted(conteo_meses_ganados.items(), key=lambda x: x[1], reverse=True)[:3]
-
-            # ==============================
-            # Estadísticas por DÍA (últimos 30, etiqueta dd/mm)
-            # ==============================
-            cur.execute("""
-                SELECT fecha, COUNT(*) as total
-                FROM datos
-                GROUP BY fecha
-                ORDER BY substr(fecha, 7, 2) DESC, substr(fecha, 4, 2) DESC, substr(fecha, 1, 2) DESC
-                LIMIT 30
-            """)
-            por_dia = cur.fetchall()
-
-            contador_dias = {}
-            fecha_por_dia2 = {}
-            for fecha_txt, cant in por_dia:
-                f = parse_fecha_flexible(fecha_txt)
-                if not f:
-                    continue
-                etiqueta = f.strftime("%d/%m")
-                contador_dias[etiqueta] = cant
-                fecha_por_dia2[etiqueta] = f
-
-            dias_ordenados = sorted(contador_dias.items(), key=lambda x: fecha_por_dia2[x[0]])
-
-            # ==============================
-            # Cerrar conexión y preparar datos para renderizar
-            # ==============================
-            conn.close()
-
-            por_dia_json = json.dumps(dias_ordenados, ensure_ascii=False)
-            por_mes_json = json.dumps(meses_ordenados_legibles, ensure_ascii=False)
-
-            return render_template(
-                'estadisticas.html',
-                total=total,
-                por_estado=por_estado,
-                por_oficina=por_oficina,
-                por_piso=por_piso,
-                top_resueltos=top_resueltos,
-                promedio_mes=promedio_mes,
-                promedio_semana=promedio_semana,
-                meses_activos=meses_unicos,
-                por_dia=por_dia_json,
-                por_mes=por_mes_json,
-
-                # Datos para "Ganador del mes" navegable y Top 3 global
-                meses_ganadores_navegable=json.dumps(meses_ganadores_navegable, ensure_ascii=False),
-                top3_ganadores_mes=top3_ganadores_mes,
-            )
-
+            est = obtener_estadisticas()
+            return render_template('estadisticas.html', **contexto_plantilla(est))
         except Exception as e:
             return f"Error: {str(e)}", 500
 
+    @app.route('/api/estadisticas')
+    @respuesta_condicional
+    def api_estadisticas():
+        try:
+            return jsonify(como_dict(obtener_estadisticas()))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/estadisticas/resolucion')
+    @respuesta_condicional
+    def api_resolucion():
+        try:
+            dias = min(max(request.args.get('dias', 30, type=int), 1), 366)
+            with obtener_conexion_lectura() as conn:
+                return jsonify(analitica.resumen(conn, dias))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/series')
+    @respuesta_condicional
+    def api_series():
+        """
+        Reportes creados por día, semana o mes.
+        ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&granularidad=dia|semana|mes&estado=&piso=&oficina=
+        Sin fechas: los últimos 30 días. Rangos largos se agrupan solos en semanas o meses.
+        """
+        try:
+            hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else date.today()
+            desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else hasta - timedelta(days=29)
+            pedida = request.args.get('granularidad', 'dia')
+            filtros = dict(estado=request.args.get('estado') or None,
+                           piso=request.args.get('piso', type=int),
+                           oficina=request.args.get('oficina') or None)
+            with obtener_conexion_lectura() as conn:
+                granularidad, puntos = series.serie(conn, desde, hasta, pedida, **filtros)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+        return jsonify({
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'granularidad': granularidad,
+            'granularidad_pedida': pedida,
+            'filtros': {k: v for k, v in filtros.items() if v is not None},
+            'total': sum(cantidad for _, _, cantidad in puntos),
+            'puntos': [
+                {'desde': inicio.isoformat(), 'hasta': fin.isoformat(),
+                 'etiqueta': series.etiqueta_periodo(inicio, granularidad), 'total': cantidad}
+                for inicio, fin, cantidad in puntos
+            ],
+        })
 
     @app.route('/api/estadisticas/tendencias')
+    @respuesta_condicional
     def api_tendencias():
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT 
-                    substr(fecha, 4, 2) || '/' || substr(fecha, 7, 2) as mes,
-                    COUNT(*) as total,
-                    SUM(CASE WHEN estado = 'resuelto' THEN 1 ELSE 0 END) as resueltos,
-                    SUM(CASE WHEN estado = 'pendiente' THEN 1 ELSE 0 END) as pendientes,
-                    SUM(CASE WHEN estado = 'en proceso' THEN 1 ELSE 0 END) as en_proceso
-                FROM datos
-                GROUP BY mes
-                ORDER BY substr(fecha, 7, 2) DESC, substr(fecha, 4, 2) DESC
-                LIMIT 12
-            """)
-            
-            resultados = cur.fetchall()
-            conn.close()
-            
-            data = {
-                'labels': [r[0] for r in reversed(resultados)],
-                'datasets': [
-                    {'label': 'Total', 'data': [r[1] for r in reversed(resultados)], 'borderColor': 'rgb(54, 162, 235)', 'backgroundColor': 'rgba(54, 162, 235, 0.1)'},
-                    {'label': 'Resueltos', 'data': [r[2] for r in reversed(resultados)], 'borderColor': 'rgb(75, 192, 192)', 'backgroundColor': 'rgba(75, 192, 192, 0.1)'},
-                    {'label': 'Pendientes', 'data': [r[3] for r in reversed(resultados)], 'borderColor': 'rgb(255, 99, 132)', 'backgroundColor': 'rgba(255, 99, 132, 0.1)'},
-                    {'label': 'En Proceso', 'data': [r[4] for r in reversed(resultados)], 'borderColor': 'rgb(255, 205, 86)', 'backgroundColor': 'rgba(255, 205, 86, 0.1)'}
-                ]
-            }
-            
-            return jsonify(data)
+            return jsonify(tendencias_json(obtener_estadisticas()))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/v1/tickets')
+    @respuesta_condicional
+    def api_tickets():
+        """
+        Tickets con filtros, de a páginas.
+        ?estado=pendiente,en proceso&piso=&busqueda=&desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+        &limite=N (hasta API_LIMITE_MAX)&orden=reciente|relevancia
+        &campos=id,estado,... (por defecto los del listado)&formato=objetos|filas
+        Para la página siguiente o anterior se agregan a la URL los parámetros
+        de 'siguiente' / 'anterior' de la respuesta (null = no hay).
+        """
+        try:
+            campos = tickets.campos_pedidos(request.args.get('campos'))
+            with obtener_conexion_lectura() as conn:
+                pagina = tickets.listar(conn, campos, limite=request.args.get('limite', 50, type=int),
+                                        **_filtros_listado(request.args))
+            return jsonify(_pagina_json(pagina, request.args.get('formato', 'objetos')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/v1/tickets/<int:id_ticket>')
+    @respuesta_condicional
+    def api_ticket(id_ticket):
+        """Un ticket; ?campos= como en la lista (por defecto todos)"""
+        try:
+            campos = tickets.campos_pedidos(request.args.get('campos'), por_defecto=tickets.CAMPOS)
+            with obtener_conexion_lectura() as conn:
+                fila = tickets.obtener(conn, id_ticket, campos)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        if fila is None:
+            return jsonify({'error': 'Ticket inexistente'}), 404
+        return jsonify(dict(zip(campos, fila)))
+
+    @app.route('/api/v1/tickets/<int:id_ticket>/comentarios')
+    @respuesta_condicional
+    def api_ticket_comentarios(id_ticket):
+        """Comentarios del ticket, del más viejo al más nuevo; ?campos=&formato=objetos|filas"""
+        try:
+            campos = tickets.campos_pedidos(request.args.get('campos'), por_defecto=tickets.CAMPOS_COMENTARIO,
+                                            validos=tickets.CAMPOS_COMENTARIO)
+            with obtener_conexion_lectura() as conn:
+                if tickets.obtener(conn, id_ticket, ('id',)) is None:
+                    return jsonify({'error': 'Ticket inexistente'}), 404
+                filas = tickets.comentarios(conn, id_ticket, campos)
+            return jsonify({'campos': list(campos),
+                            'comentarios': tickets.codificar(campos, filas, request.args.get('formato', 'objetos'))})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def _evento_sse(id_evento, tipo, datos):
+        if tipo == 'reporte':
+            datos = dict(zip(tickets.CAMPOS_LISTADO, datos))
+        elif tipo == 'eliminado':
+            datos = {'id': datos[0]}
+        else:
+            datos = {}
+        return f"id: {id_evento}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    @app.route('/api/eventos')
+    def api_eventos():
+        """
+        Server-Sent Events con los reportes creados, modificados o borrados.
+        event: reporte (ticket con los campos del listado), eliminado, recargar (no se puede
+        retomar: la página debe recargarse). Retoma desde Last-Event-ID o
+        ?desde=<id>. Cada conexión dura SSE_DURACION segundos y el navegador
+        reconecta solo; si no hay lugar se envía lo pendiente y se cierra.
+        """
+        desde = request.headers.get('Last-Event-ID') or request.args.get('desde', '')
+        abierta = notificador.tomar_conexion()
+
+        def generar():
+            ultimo = desde
+            try:
+                yield f"retry: {SSE_REINTENTO_MS if abierta else SSE_REINTENTO_OCUPADO_MS}\n\n"
+                fin = time.monotonic() + (SSE_DURACION if abierta else 0)
+                while True:
+                    restante = fin - time.monotonic()
+                    eventos = notificador.esperar(ultimo, max(min(SSE_LATIDO, restante), 0))
+                    if eventos is None:
+                        ultimo = notificador.ultimo_id()
+                        yield _evento_sse(ultimo, 'recargar', ())
+                    elif eventos:
+                        for id_evento, tipo, datos in eventos:
+                            yield _evento_sse(id_evento, tipo, datos)
+                        ultimo = eventos[-1][0]
+                    elif restante > 0:
+                        yield ": latido\n\n"
+                    if restante <= 0:
+                        break
+            finally:
+                if abierta:
+                    notificador.soltar_conexion()
+
+        return Response(stream_with_context(generar()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     @app.route('/api/ultima_actualizacion')
+    @respuesta_condicional
     def ultima_actualizacion():
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            cur.execute("SELECT MAX(id) as ultimo_id, COUNT(*) as total, MAX(fecha) as ultima_fecha FROM datos")
-            resultado = cur.fetchone()
-            conn.close()
+            with obtener_conexion_lectura() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT MAX(id) as ultimo_id, COUNT(*) as total, MAX(fecha) as ultima_fecha FROM datos")
+                resultado = cur.fetchone()
             return jsonify({'ultimo_id': resultado[0] if resultado[0] else 0, 'total': resultado[1] if resultado[1] else 0, 'ultima_fecha': resultado[2] if resultado[2] else ''})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -555,15 +388,7 @@ def registrar_rutas(app):
                 flash('Debes indicar quién resolvió el reporte', 'error')
                 return redirect('/')
             
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE datos 
-                SET estado = 'resuelto', resuelto_por = ?
-                WHERE id = ?
-            """, (resuelto_por, id_reporte))
-            conn.commit()
-            conn.close()
+            escritor.ejecutar(operaciones.resolver_reporte, id_reporte, resuelto_por)
             
             flash(f'Reporte #{id_reporte} marcado como resuelto por {resuelto_por}', 'success')
             return redirect('/')
@@ -574,73 +399,126 @@ def registrar_rutas(app):
     @app.route('/actualizar', methods=['GET', 'POST'])
     def actualizar_estado_web():
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-
             if request.method == 'POST':
                 id_reporte = request.form['id_reporte']
                 resuelto_por = request.form.get('resuelto_por', '').strip()
                 fecha = request.form.get('fecha_resolucion', datetime.now().strftime("%d/%m/%y"))
 
                 if resuelto_por:
-                    cur.execute("UPDATE datos SET estado = 'resuelto', resuelto_por = ?, fecha = ? WHERE id = ?", (resuelto_por, fecha, id_reporte))
-                    conn.commit()
+                    escritor.ejecutar(operaciones.resolver_reporte, id_reporte, resuelto_por, fecha)
                     flash(f'Reporte #{id_reporte} marcado como resuelto', 'success')
 
-            cur.execute("SELECT id, piso, oficina, quien, razon, estado, fecha FROM datos WHERE estado IN ('pendiente', 'en proceso') ORDER BY id DESC")
-            reportes = cur.fetchall()
-            conn.close()
-            return render_template('actualizar.html', reportes=reportes, empleados=EMPLEADOS)
+            # Los abiertos en JSON; si son más de API_LIMITE_MAX el navegador pide el resto
+            with obtener_conexion_lectura() as conn:
+                pagina = tickets.listar(conn, tickets.CAMPOS_ACTUALIZAR, limite=API_LIMITE_MAX,
+                                        estado='pendiente,en proceso')
+            return render_template('actualizar.html', inicial=_pagina_json(pagina, 'filas'), empleados=EMPLEADOS)
         except Exception as e:
             return f"Error: {str(e)}", 500
 
+    def _descarga_excel(ruta):
+        # Abierto ya acá: aunque el cache lo descarte, la descarga sigue
+        archivo = open(ruta, 'rb')
+        return Response(exportador.leer_en_trozos(archivo), mimetype=exportador.MIMETYPE, headers={
+            'Content-Disposition': f'attachment; filename={exportador.nombre_archivo()}',
+            'Content-Length': str(os.fstat(archivo.fileno()).st_size),
+        })
+
+    def _trabajo_json(trabajo):
+        datos = {k: trabajo[k] for k in ('id', 'tipo', 'estado', 'filas', 'total', 'error', 'creado', 'iniciado', 'terminado')}
+        datos['progreso'] = round(100 * trabajo['filas'] / trabajo['total'], 1) if trabajo['total'] else None
+        datos['estado_url'] = url_for('api_exportacion', id_trabajo=trabajo['id'])
+        if trabajo['estado'] == 'listo':
+            datos['descarga_url'] = url_for('descargar_exportacion', id_trabajo=trabajo['id'])
+        return datos
+
     @app.route('/excel')
     def generar_excel():
+        """Si el Excel de los datos actuales ya está armado se descarga; si no,
+        se encola y se muestra el avance hasta que esté listo"""
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM datos ORDER BY id DESC")
-            filas = cur.fetchall()
-            conn.close()
-
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Reportes"
-            ws.append(['ID', 'Piso', 'Oficina', 'Quién', 'Razón', 'Estado', 'Fecha', 'Resuelto por'])
-            for f in filas:
-                ws.append(f)
-
-            for col in ws.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = min((max_length + 2), 50)
-                ws.column_dimensions[column].width = adjusted_width
-
-            buffer = BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-
-            fecha_actual = datetime.now().strftime("%Y%m%d_%H%M%S")
-            nombre_archivo = f'reportes_{fecha_actual}.xlsx'
-
-            return send_file(buffer, as_attachment=True, download_name=nombre_archivo, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            ruta = exportador.excel_en_cache()
+            if ruta:
+                return _descarga_excel(ruta)
+            trabajo = estado_trabajo(trabajos.crear_excel())
+        except RuntimeError as e:
+            return f"Error: {str(e)}", 503
         except Exception as e:
             return f"Error: {str(e)}", 500
+        return render_template('exportacion.html', trabajo=_trabajo_json(trabajo))
+
+    @app.route('/api/exportaciones', methods=['POST'])
+    def api_crear_exportacion():
+        """Encola el Excel completo; responde 202 con la URL para seguir el avance"""
+        try:
+            trabajo = estado_trabajo(trabajos.crear_excel())
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        return jsonify(_trabajo_json(trabajo)), 202, {'Location': url_for('api_exportacion', id_trabajo=trabajo['id'])}
+
+    @app.route('/api/exportaciones/<id_trabajo>')
+    def api_exportacion(id_trabajo):
+        trabajo = estado_trabajo(id_trabajo)
+        if trabajo is None:
+            return jsonify({'error': 'Exportación inexistente'}), 404
+        return jsonify(_trabajo_json(trabajo))
+
+    @app.route('/api/exportaciones/<id_trabajo>/descarga')
+    def descargar_exportacion(id_trabajo):
+        trabajo = estado_trabajo(id_trabajo)
+        if trabajo is None:
+            return jsonify({'error': 'Exportación inexistente'}), 404
+        if trabajo['estado'] != 'listo':
+            return jsonify(_trabajo_json(trabajo)), 409
+        try:
+            return _descarga_excel(trabajo['ruta'])
+        except OSError:
+            return jsonify({'error': 'El archivo ya no está disponible, pide la exportación de nuevo'}), 410
+
+    @app.route('/api/exportar')
+    def api_exportar():
+        """
+        Reportes crudos para scripts, en streaming.
+        ?formato=csv|ndjson&estado=&piso=&busqueda=&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&limite=N
+        Ordenados por id descendente; para retomar una descarga cortada se
+        repite el pedido con &despues=<último id recibido>. Con
+        Accept-Encoding: gzip la respuesta va comprimida.
+        """
+        formato = request.args.get('formato', 'csv')
+        if formato not in exportador.FORMATOS:
+            return jsonify({'error': f"Formato desconocido: {formato}"}), 400
+        try:
+            desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else None
+            hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else None
+            filtros = dict(estado=request.args.get('estado') or None,
+                           piso=request.args.get('piso', type=int),
+                           busqueda=request.args.get('busqueda') or None,
+                           desde=desde, hasta=hasta,
+                           despues=request.args.get('despues', type=int),
+                           limite=request.args.get('limite', type=int))
+            with obtener_conexion_lectura() as conn:
+                sql, params = tickets.consulta_filtrada(conn, exportador.COLUMNAS_DATOS, **filtros)
+                conn.execute(f"EXPLAIN {sql}", params)    # errores de la consulta antes del primer byte
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+        comprimir = request.accept_encodings['gzip'] > 0
+        respuesta = Response(exportador.exportar_filas(formato, filtros, comprimir),
+                             content_type=exportador.FORMATOS[formato])
+        respuesta.headers['Content-Disposition'] = f'attachment; filename={exportador.nombre_archivo(formato)}'
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+        if comprimir:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        return respuesta
 
     @app.route('/eliminar/<int:id>', methods=['POST'])
     def eliminar_reporte(id):
         try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            cur.execute("DELETE FROM datos WHERE id = ?", (id,))
-            conn.commit()
-            conn.close()
+            escritor.ejecutar(operaciones.eliminar_reporte, id)
             flash(f'Reporte #{id} eliminado', 'success')
             return redirect('/')
         except Exception as e:
@@ -653,19 +531,55 @@ def registrar_rutas(app):
         from telegram_bot import telegram_bot
         
         info = f"<h3>Info BD</h3><p>Local: {DB_PATH}</p><p>Remota: {DB_OFICINAS_PATH}</p>"
-        conn_oficinas = obtener_conexion_oficinas()
-        if conn_oficinas:
-            try:
-                cur = conn_oficinas.cursor()
-                cur.execute("SELECT COUNT(*) FROM oficinas")
-                count = cur.fetchone()[0]
-                info += f"<p>Oficinas: {count}</p>"
-                conn_oficinas.close()
-            except:
-                info += "<p style='color:red;'>Error BD oficinas</p>"
+        cat = estado_catalogo()
+        if cat['cargado']:
+            info += f"<p>Oficinas: {cat['oficinas']} en {cat['pisos']} pisos (cargado {cat['cargado_en']:%d/%m/%y %H:%M})</p>"
         else:
             info += "<p style='color:red;'>No conecta BD oficinas</p>"
+        if cat['ultimo_error']:
+            info += f"<p style='color:red;'>Último error catálogo: {cat['ultimo_error']}</p>"
         
+        pool = estado_pool()
+        info += f"<p>Pool: {pool['abiertas']}/{pool['tamano']} abiertas, {pool['libres']} libres</p>"
+
+        cache_est = estado_cache()
+        info += f"<p>Cache estadísticas: {cache_est['aciertos']} aciertos, {cache_est['fallos']} cálculos</p>"
+        cache_rep = reportes.estado_cache()
+        info += f"<p>Cache reportes bot: {cache_rep['entradas']} reportes, {cache_rep['aciertos']} aciertos, {cache_rep['fallos']} cálculos</p>"
+        art = exportador.estado_artefactos()
+        info += (f"<p>Exportaciones en disco: {art['archivos']} archivos ({art['bytes'] / 1024 / 1024:.1f} MB) en {art['directorio']}, "
+                 f"{art['aciertos']} reusadas, {art['fallos']} generadas, {art['descartados']} descartadas, "
+                 f"{art['file_ids']} file_id de Telegram</p>")
+        notif = notificador.estado_notificador()
+        info += (f"<p>Eventos en vivo: {notif['conexiones']}/{notif['max_conexiones']} conexiones abiertas, "
+                 f"{notif['publicados']} publicados ({notif['en_buffer']} en buffer), {notif['recargas']} recargas por cambios externos</p>")
+        trab = trabajos.estado_trabajos()
+        info += f"<p>Exportaciones en segundo plano: {trab['activos']}/{trab['max_pendientes']} en cola o en curso, {trab['hilos']} a la vez ({trab['bd']})</p>"
+
+        plan = estado_planificador()
+        info += f"<p>Planificador: {'activo' if plan['activo'] else 'detenido'}{', recálculo pendiente' if plan['pendiente'] else ''}</p>"
+        for nombre, tarea in plan['tareas'].items():
+            exito = f"{tarea['ultimo_exito']:%d/%m/%y %H:%M:%S}" if tarea['ultimo_exito'] else 'nunca'
+            info += (f"<p>&nbsp;&nbsp;{nombre}: {tarea['ejecuciones']} ejecuciones, última {tarea['ultima_duracion_ms']} ms "
+                     f"({tarea['ultimo_motivo']}), último éxito {exito}</p>")
+            if tarea['ultimo_error']:
+                info += f"<p style='color:red;'>&nbsp;&nbsp;Último error: {tarea['ultimo_error']}</p>"
+
+        esc = escritor.estado_escritor()
+        info += (f"<p>Escritor: {esc['en_cola']} en cola, {esc['trabajos']} trabajos en {esc['lotes']} lotes "
+                 f"(máx {esc['lote_maximo']}), commit {esc['latencia_ultima_ms']} ms "
+                 f"(prom. {esc['latencia_promedio_ms']} ms), {esc['errores']} errores</p>")
+
+        replica = estado_replica()
+        if replica is None:
+            info += "<p>Réplica local: desactivada</p>"
+        else:
+            sinc = replica['ultima_sincronizacion']
+            info += f"<p>Réplica local: {replica['ruta']} ({'lista' if replica['lista'] else 'no disponible'}), "
+            info += f"seq {replica['ultimo_seq']}, última sincronización {sinc:%d/%m/%y %H:%M:%S}</p>" if sinc else "sin sincronizar</p>"
+            if replica['ultimo_error']:
+                info += f"<p style='color:red;'>Último error réplica: {replica['ultimo_error']}</p>"
+
         info += "<hr><h3>Bot</h3>"
         if telegram_bot:
             info += "<p style='color:green;'>✅ Bot activo</p>"
@@ -0,0 +1,126 @@
+"""
+Series temporales de reportes creados para cualquier rango de fechas
+Por cada combinación de filtros se arma una vez (por versión de datos) un
+arreglo de sumas acumuladas por día desde agg_dia_ubicacion; después cada
+punto de la serie es una resta, sin volver a la BD.
+"""
+from datetime import date, timedelta
+from cache import CacheVersionada
+from config import SERIES_MAX_PUNTOS
+from database import version_datos
+
+# De la más fina a la más gruesa: si hay demasiados puntos se pasa a la siguiente
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+_cache = CacheVersionada(max_entradas=64)
+
+
+class SerieDiaria:
+    """Conteos por día guardados como sumas acumuladas"""
+
+    def __init__(self, conteos):
+        """conteos: {date: cantidad}"""
+        self.inicio = min(conteos) if conteos else date.today()
+        dias = (max(conteos) - self.inicio).days + 1 if conteos else 0
+        # acumulado[i] = creados antes del día inicio + i
+        self.acumulado = [0] * (dias + 1)
+        for i in range(dias):
+            self.acumulado[i + 1] = self.acumulado[i] + conteos.get(self.inicio + timedelta(days=i), 0)
+
+    def _indice(self, dia):
+        return min(max((dia - self.inicio).days, 0), len(self.acumulado) - 1)
+
+    def total(self, desde, hasta):
+        """Creados entre desde y hasta inclusive, en O(1)"""
+        return max(self.acumulado[self._indice(hasta + timedelta(days=1))] - self.acumulado[self._indice(desde)], 0)
+
+
+def serie_diaria(conn, estado=None, piso=None, oficina=None):
+    """SerieDiaria con los filtros dados (cacheada hasta la próxima escritura)"""
+    def calcular():
+        condiciones, params = ["fecha != ''"], []
+        for columna, valor in (('estado', estado), ('piso', piso), ('oficina', oficina)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                params.append(valor)
+        conteos = {}
+        for fecha, cantidad in conn.execute(f"""
+            SELECT fecha, SUM(total) FROM agg_dia_ubicacion
+            WHERE {' AND '.join(condiciones)}
+            GROUP BY fecha
+        """, params):
+            try:
+                conteos[date.fromisoformat(fecha)] = cantidad
+            except ValueError:
+                continue
+        return SerieDiaria(conteos)
+
+    return _cache.obtener(version_datos(conn), (estado, piso, oficina), calcular)
+
+
+def _inicio_periodo(dia, granularidad):
+    if granularidad == 'semana':
+        return dia - timedelta(days=dia.weekday())   # lunes
+    if granularidad == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def _periodo_siguiente(dia, granularidad):
+    if granularidad == 'semana':
+        return dia + timedelta(days=7)
+    if granularidad == 'mes':
+        return (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return dia + timedelta(days=1)
+
+
+def periodos(desde, hasta, granularidad):
+    """[(inicio, fin), ...] que cubren desde..hasta; el primero y el último se recortan al rango"""
+    resultado = []
+    inicio = _inicio_periodo(desde, granularidad)
+    while inicio <= hasta:
+        siguiente = _periodo_siguiente(inicio, granularidad)
+        resultado.append((max(inicio, desde), min(siguiente - timedelta(days=1), hasta)))
+        inicio = siguiente
+    return resultado
+
+
+def _cantidad_periodos(desde, hasta, granularidad):
+    if granularidad == 'semana':
+        return ((hasta - _inicio_periodo(desde, 'semana')).days // 7) + 1
+    if granularidad == 'mes':
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+    return (hasta - desde).days + 1
+
+
+def elegir_granularidad(desde, hasta, pedida='dia', max_puntos=SERIES_MAX_PUNTOS):
+    """La pedida, o la primera más gruesa que no supere max_puntos"""
+    for granularidad in GRANULARIDADES[GRANULARIDADES.index(pedida):]:
+        if _cantidad_periodos(desde, hasta, granularidad) <= max_puntos:
+            return granularidad
+    return GRANULARIDADES[-1]
+
+
+def etiqueta_periodo(inicio, granularidad):
+    """'dd/mm' para día y semana (inicio), 'mm/yy' para mes"""
+    return f"{inicio:%m/%y}" if granularidad == 'mes' else f"{inicio:%d/%m}"
+
+
+def serie(conn, desde, hasta, granularidad='dia', estado=None, piso=None, oficina=None):
+    """
+    Reportes creados por período entre desde y hasta (date, inclusive).
+    Devuelve (granularidad usada, [(inicio, fin, cantidad), ...]).
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad desconocida: {granularidad}")
+    if hasta < desde:
+        raise ValueError("'hasta' es anterior a 'desde'")
+    granularidad = elegir_granularidad(desde, hasta, granularidad)
+    if _cantidad_periodos(desde, hasta, granularidad) > SERIES_MAX_PUNTOS:
+        raise ValueError(f"Rango demasiado largo: más de {SERIES_MAX_PUNTOS} meses")
+    diaria = serie_diaria(conn, estado, piso, oficina)
+    return granularidad, [(inicio, fin, diaria.total(inicio, fin)) for inicio, fin in periodos(desde, hasta, granularidad)]
+
+
+def estado_cache():
+    return _cache.estado()
@@ -2,10 +2,8 @@
 Bot de Telegram - Comandos y handlers
 VERSIÓN MEJORADA: Compatible con threads y previene múltiples instancias
 """
-import os
 import sys
 import asyncio
-import tempfile
 import threading
 from datetime import datetime, timedelta
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
@@ -13,8 +11,7 @@ from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     filters, ContextTypes, ConversationHandler
 )
-from telegram.error import Conflict
-import openpyxl
+from telegram.error import BadRequest, Conflict
 
 from config import (
     TELEGRAM_TOKEN, PISO, OFICINA, QUIEN, RAZON, ESTADO, 
@@ -22,9 +19,14 @@ from config import (
     ACTUALIZAR_RESUELTO_POR, ACTUALIZAR_FECHA, EMPLEADOS
 )
 from database import (
-    obtener_conexion, obtener_pisos_disponibles, obtener_oficinas_por_piso
+    obtener_conexion_lectura, obtener_pisos_disponibles, obtener_oficinas_por_piso
 )
+import escritor
+import exportador
+import trabajos
+import operaciones
 from reportes import generar_reporte_texto
+from fechas import fecha_a_iso
 
 telegram_bot = None
 _application = None
@@ -80,48 +82,60 @@ async def cmd_semana(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(reporte, parse_mode='Markdown')
 
 async def cmd_excel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    aviso = None
     try:
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM datos ORDER BY id DESC")
-        filas = cur.fetchall()
-        conn.close()
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Reportes"
-        ws.append(['ID', 'Piso', 'Oficina', 'Quién', 'Razón', 'Estado', 'Fecha', 'Resuelto por'])
-        for f in filas:
-            ws.append(f)
-
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = min((max_length + 2), 50)
-            ws.column_dimensions[column].width = adjusted_width
-
-        fecha_actual = datetime.now().strftime("%Y%m%d_%H%M%S")
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.xlsx', delete=False) as tmp:
-            nombre_archivo = tmp.name
-            wb.save(nombre_archivo)
-
-        with open(nombre_archivo, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                filename=f'reportes_{fecha_actual}.xlsx',
-                caption=f"📊 Reporte completo\n📅 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-            )
-        
-        os.remove(nombre_archivo)
-        
+        ruta = await asyncio.to_thread(exportador.excel_en_cache)
+        if ruta is None:
+            # Se arma en el pool de exportaciones; mientras tanto el aviso muestra el avance
+            aviso = await update.message.reply_text("⏳ Preparando el Excel…")
+            id_trabajo = await asyncio.to_thread(trabajos.crear_excel)
+            texto = aviso.text
+            while True:
+                await asyncio.sleep(2)
+                trabajo = await asyncio.to_thread(trabajos.estado_trabajo, id_trabajo)
+                if trabajo is None:
+                    # Sin registro: se borró la BD de trabajos (vive en el directorio temporal) o se purgó al reiniciar
+                    await aviso.edit_text("❌ Se perdió el trabajo del Excel. Escribe /excel para pedirlo de nuevo")
+                    return
+                if trabajo['estado'] == 'listo':
+                    ruta = trabajo['ruta']
+                    break
+                if trabajo['estado'] == 'error':
+                    raise RuntimeError(trabajo['error'])
+                if trabajo['total']:
+                    nuevo = f"⏳ Preparando el Excel… {trabajo['filas']} de {trabajo['total']} reportes"
+                    if nuevo != texto:
+                        await aviso.edit_text(nuevo)
+                        texto = nuevo
+
+        caption = f"📊 Reporte completo\n📅 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+
+        # Si este mismo archivo ya se subió, Telegram lo reenvía por su file_id
+        file_id = exportador.file_id_telegram(ruta)
+        mensaje = None
+        if file_id:
+            try:
+                mensaje = await update.message.reply_document(document=file_id, caption=caption)
+            except BadRequest:
+                exportador.recordar_file_id_telegram(ruta, None)
+
+        if mensaje is None:
+            with open(ruta, 'rb') as f:
+                mensaje = await update.message.reply_document(
+                    document=f,
+                    filename=exportador.nombre_archivo(),
+                    caption=caption
+                )
+            exportador.recordar_file_id_telegram(ruta, mensaje.document.file_id)
+
+        if aviso:
+            await aviso.edit_text("✅ Excel listo")
+
     except Exception as e:
-        await update.message.reply_text(f"❌ Error: {str(e)}")
+        if aviso:
+            await aviso.edit_text(f"❌ Error: {str(e)}")
+        else:
+            await update.message.reply_text(f"❌ Error: {str(e)}")
 
 # ==================== CREAR NUEVO REPORTE ====================
 
@@ -220,7 +234,14 @@ async def nuevo_resuelto_por(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def nueva_fecha_resolucion(update: Update, context: ContextTypes.DEFAULT_TYPE):
     respuesta = update.message.text
     
-    if respuesta == 'Hoy':
+    if context.user_data.get('esperando_fecha'):
+        # Fecha escrita a mano: se valida acá, no se guarda una que no se entiende
+        if fecha_a_iso(respuesta) is None:
+            await update.message.reply_text("❌ Fecha no reconocida. Escribe la fecha (DD/MM/AA):")
+            return FECHA_RESOLUCION
+        context.user_data['fecha'] = respuesta.strip()
+        context.user_data.pop('esperando_fecha', None)
+    elif respuesta == 'Hoy':
         context.user_data['fecha'] = datetime.now().strftime("%d/%m/%y")
     elif respuesta == 'Ayer':
         ayer = datetime.now() - timedelta(days=1)
@@ -236,30 +257,18 @@ async def nueva_fecha_resolucion(update: Update, context: ContextTypes.DEFAULT_T
     return await guardar_nuevo_reporte(update, context)
 
 async def guardar_nuevo_reporte(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if context.user_data.get('esperando_fecha'):
-        context.user_data['fecha'] = update.message.text
-        context.user_data.pop('esperando_fecha', None)
-    
     try:
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            INSERT INTO datos (piso, oficina, quien, razon, estado, fecha, resuelto_por)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+        ticket_id = await escritor.ejecutar_async(
+            operaciones.crear_reporte,
             context.user_data['piso'],
             context.user_data['oficina'],
             context.user_data['quien'],
             context.user_data['razon'],
             context.user_data['estado'],
             context.user_data.get('fecha', ''),
-            context.user_data.get('resuelto_por', '')
-        ))
-        
-        conn.commit()
-        ticket_id = cur.lastrowid
-        conn.close()
+            context.user_data.get('resuelto_por', ''),
+            origen='bot'
+        )
         
         mensaje = f"""✅ *¡Reporte creado!*
 
@@ -290,17 +299,16 @@ async def cancelar_nuevo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ==================== ACTUALIZAR REPORTE ====================
 
 async def cmd_actualizar(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = obtener_conexion()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, piso, oficina, quien, razon, estado 
-        FROM datos 
-        WHERE estado != 'resuelto'
-        ORDER BY id DESC 
-        LIMIT 10
-    """)
-    reportes = cur.fetchall()
-    conn.close()
+    with obtener_conexion_lectura() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, piso, oficina, quien, razon, estado 
+            FROM datos 
+            WHERE estado != 'resuelto'
+            ORDER BY id DESC 
+            LIMIT 10
+        """)
+        reportes = cur.fetchall()
     
     if not reportes:
         await update.message.reply_text("ℹ️ No hay reportes pendientes")
@@ -320,11 +328,10 @@ async def actualizar_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         ticket_id = int(update.message.text)
         
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM datos WHERE id = ?", (ticket_id,))
-        reporte = cur.fetchone()
-        conn.close()
+        with obtener_conexion_lectura() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, piso, oficina, quien, razon, estado, fecha, resuelto_por FROM datos WHERE id = ?", (ticket_id,))
+            reporte = cur.fetchone()
         
         if not reporte:
             await update.message.reply_text(f"❌ No existe #{ticket_id}")
@@ -371,7 +378,13 @@ async def actualizar_resuelto_por_handler(update: Update, context: ContextTypes.
 async def actualizar_fecha_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     respuesta = update.message.text
     
-    if respuesta == 'Hoy':
+    if context.user_data.get('esperando_fecha_act'):
+        if fecha_a_iso(respuesta) is None:
+            await update.message.reply_text("❌ Fecha no reconocida. Escribe fecha DD/MM/AA:")
+            return ACTUALIZAR_FECHA
+        context.user_data['actualizar_fecha'] = respuesta.strip()
+        context.user_data.pop('esperando_fecha_act', None)
+    elif respuesta == 'Hoy':
         context.user_data['actualizar_fecha'] = datetime.now().strftime("%d/%m/%y")
     elif respuesta == 'Ayer':
         ayer = datetime.now() - timedelta(days=1)
@@ -384,40 +397,16 @@ async def actualizar_fecha_handler(update: Update, context: ContextTypes.DEFAULT
     return await guardar_actualizacion(update, context)
 
 async def guardar_actualizacion(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if context.user_data.get('esperando_fecha_act'):
-        context.user_data['actualizar_fecha'] = update.message.text
-        context.user_data.pop('esperando_fecha_act', None)
-    
     try:
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        
         ticket_id = context.user_data['actualizar_id']
         nuevo_estado = context.user_data['actualizar_estado']
         resuelto_por = context.user_data.get('actualizar_resuelto_por', '')
         fecha = context.user_data.get('actualizar_fecha', '')
-        
-        if nuevo_estado == 'resuelto' and fecha:
-            cur.execute("""
-                UPDATE datos 
-                SET estado = ?, resuelto_por = ?, fecha = ?
-                WHERE id = ?
-            """, (nuevo_estado, resuelto_por, fecha, ticket_id))
-        elif nuevo_estado == 'resuelto':
-            cur.execute("""
-                UPDATE datos 
-                SET estado = ?, resuelto_por = ?
-                WHERE id = ?
-            """, (nuevo_estado, resuelto_por, ticket_id))
+    
+        if nuevo_estado == 'resuelto':
+            await escritor.ejecutar_async(operaciones.resolver_reporte, ticket_id, resuelto_por, fecha, origen='bot')
         else:
-            cur.execute("""
-                UPDATE datos 
-                SET estado = ?, resuelto_por = ''
-                WHERE id = ?
-            """, (nuevo_estado, ticket_id))
-        
-        conn.commit()
-        conn.close()
+            await escritor.ejecutar_async(operaciones.cambiar_estado, ticket_id, nuevo_estado, origen='bot')
         
         mensaje = f"✅ *Ticket #{ticket_id} actualizado!*\n\nNuevo estado: *{nuevo_estado}*\n"
         if nuevo_estado == 'resuelto' and resuelto_por:
@@ -0,0 +1,182 @@
+"""
+Consultas de tickets (reportes) para la API JSON, el listado y las exportaciones
+Filtros del listado (estado, piso, búsqueda, rango de fechas de creación) y
+paginación por cursor sobre d.id, o por número de página cuando se ordena
+por relevancia de la búsqueda.
+"""
+from busqueda import filtro_busqueda
+from cache import CacheVersionada
+from config import API_LIMITE_MAX
+from database import version_datos
+
+# Campos que se pueden pedir con ?campos=
+CAMPOS = ('id', 'piso', 'oficina', 'quien', 'razon', 'estado', 'fecha', 'resuelto_por',
+          'fecha_creacion', 'fecha_resolucion', 'num_comentarios', 'ultimo_comentario')
+# Los del listado (index.html), por defecto en la lista
+CAMPOS_LISTADO = ('id', 'piso', 'oficina', 'quien', 'razon', 'estado', 'fecha', 'resuelto_por', 'num_comentarios')
+# Los de /actualizar (tickets abiertos)
+CAMPOS_ACTUALIZAR = ('id', 'piso', 'oficina', 'quien', 'razon', 'estado', 'fecha')
+CAMPOS_COMENTARIO = ('id', 'reporte_id', 'comentario', 'autor', 'fecha')
+
+ORDENES = ('reciente', 'relevancia')
+
+# Totales por combinación de filtros
+_totales = CacheVersionada()
+
+
+def campos_pedidos(texto, por_defecto=CAMPOS_LISTADO, validos=CAMPOS):
+    """'id,estado' -> ('id', 'estado'); ValueError si alguno no existe"""
+    if not texto:
+        return tuple(por_defecto)
+    campos = tuple(dict.fromkeys(c.strip() for c in texto.split(',') if c.strip()))
+    desconocidos = [c for c in campos if c not in validos]
+    if desconocidos or not campos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos) or texto}")
+    return campos
+
+
+def codificar(campos, filas, formato='objetos'):
+    """
+    'objetos': [{campo: valor}, ...]; 'filas': [[valor, ...], ...] en el
+    orden de campos (más compacto, los nombres van una sola vez)
+    """
+    if formato == 'filas':
+        return [list(fila) for fila in filas]
+    if formato == 'objetos':
+        return [dict(zip(campos, fila)) for fila in filas]
+    raise ValueError(f"Formato desconocido: {formato}")
+
+
+def _filtro(conn, estado=None, piso=None, busqueda=None, desde=None, hasta=None):
+    """(from, condiciones, params, orden por relevancia o None)"""
+    if busqueda:
+        origen, condicion, params, relevancia = filtro_busqueda(conn, busqueda)
+    else:
+        origen, condicion, params, relevancia = "FROM datos d", "1=1", [], None
+    condiciones = [condicion]
+    # estado admite varios separados por coma: 'pendiente,en proceso'
+    estados = [e.strip() for e in estado.split(',') if e.strip()] if estado else []
+    if estados:
+        if 'resuelto' not in estados:
+            # Literal para que SQLite pueda usar idx_datos_abiertos (ver esquema.py)
+            condiciones.append("d.estado != 'resuelto'")
+        condiciones.append(f"d.estado IN ({', '.join('?' * len(estados))})")
+        params.extend(estados)
+    for sql, valor in (("d.piso = ?", piso),
+                       ("d.fecha_creacion >= ?", desde and desde.isoformat()),
+                       ("d.fecha_creacion <= ?", hasta and hasta.isoformat())):
+        if valor is not None and valor != '':
+            condiciones.append(sql)
+            params.append(valor)
+    return origen, condiciones, params, relevancia
+
+
+def _columnas(campos):
+    return ', '.join(f"d.{c}" for c in campos)
+
+
+def consulta_filtrada(conn, campos=CAMPOS, estado=None, piso=None, busqueda=None, desde=None, hasta=None,
+                      despues=None, limite=None):
+    """
+    (sql, params) de todos los tickets con los filtros, por id descendente:
+    'despues' retoma a partir del último id recibido (exportaciones)
+    """
+    origen, condiciones, params, _ = _filtro(conn, estado, piso, busqueda, desde, hasta)
+    if despues is not None:
+        condiciones.append("d.id < ?")
+        params.append(despues)
+    sql = f"SELECT {_columnas(campos)} {origen} WHERE {' AND '.join(condiciones)} ORDER BY d.id DESC"
+    if limite:
+        sql += " LIMIT ?"
+        params.append(limite)
+    return sql, params
+
+
+def listar(conn, campos=CAMPOS_LISTADO, limite=50, estado=None, piso=None, busqueda=None,
+           desde=None, hasta=None, despues=None, antes=None, pagina=1, orden=None):
+    """
+    Una página de tickets. Con orden 'reciente' (por defecto sin búsqueda)
+    se pagina con cursores: despues/antes = id del último/primero de la
+    página vista; 'pagina' solo sirve para mostrar el número (o para links
+    viejos sin cursor). Con 'relevancia' (por defecto con búsqueda) se
+    pagina por número. Devuelve un dict con campos, filas (tuplas), total,
+    pagina, paginas y anterior/siguiente: los parámetros a agregar para
+    pedir esa página ({} = la primera, None = no hay).
+    """
+    limite = min(max(int(limite), 1), API_LIMITE_MAX)
+    pagina = max(int(pagina or 1), 1)
+    orden = orden or ('relevancia' if busqueda else 'reciente')
+    if orden not in ORDENES:
+        raise ValueError(f"Orden desconocido: {orden}")
+
+    origen, condiciones, params, relevancia = _filtro(conn, estado, piso, busqueda, desde, hasta)
+    desde_sql = f"{origen} WHERE {' AND '.join(condiciones)}"
+    consulta_total = f"SELECT COUNT(*) {desde_sql}"
+    total = _totales.obtener(version_datos(conn), (consulta_total, tuple(params)),
+                             lambda: conn.execute(consulta_total, params).fetchone()[0])
+    paginas = max((total + limite - 1) // limite, 1)
+
+    # El id va siempre primero (hace falta para los cursores); al final se
+    # reordena como se pidió, sacándolo si no estaba
+    otros = [c for c in campos if c != 'id']
+    consulta = f"SELECT {_columnas(['id'] + otros)} {desde_sql}"
+    if orden == 'relevancia' or (pagina > 1 and not (despues or antes)):
+        filas = conn.execute(f"{consulta} ORDER BY {relevancia or 'd.id DESC'} LIMIT ? OFFSET ?",
+                             params + [limite, (pagina - 1) * limite]).fetchall()
+        hay_anterior, hay_siguiente, con_cursor = pagina > 1, pagina < paginas, False
+    elif antes:
+        filas = conn.execute(f"{consulta} AND d.id > ? ORDER BY d.id ASC LIMIT ?",
+                             params + [antes, limite + 1]).fetchall()
+        hay_anterior, hay_siguiente, con_cursor = len(filas) > limite, True, True
+        filas = filas[:limite][::-1]
+    else:
+        if despues:
+            filas = conn.execute(f"{consulta} AND d.id < ? ORDER BY d.id DESC LIMIT ?",
+                                 params + [despues, limite + 1]).fetchall()
+        else:
+            filas = conn.execute(f"{consulta} ORDER BY d.id DESC LIMIT ?", params + [limite + 1]).fetchall()
+        hay_anterior, hay_siguiente, con_cursor = bool(despues), len(filas) > limite, True
+        filas = filas[:limite]
+
+    if not filas:
+        hay_anterior = hay_siguiente = False
+    if not hay_anterior:
+        pagina = 1
+    pagina = min(pagina, paginas)
+
+    anterior = siguiente = None
+    if hay_anterior:
+        if pagina - 1 <= 1:
+            anterior = {}
+        elif con_cursor:
+            anterior = {'antes': filas[0][0], 'pagina': pagina - 1}
+        else:
+            anterior = {'pagina': pagina - 1}
+    if hay_siguiente:
+        siguiente = {'despues': filas[-1][0], 'pagina': pagina + 1} if con_cursor else {'pagina': pagina + 1}
+
+    indices = [0 if c == 'id' else 1 + otros.index(c) for c in campos]
+    filas = [tuple(fila[i] for i in indices) for fila in filas]
+    return {
+        'campos': list(campos),
+        'filas': filas,
+        'total': total,
+        'pagina': pagina,
+        'paginas': paginas,
+        'limite': limite,
+        'orden': orden,
+        'anterior': anterior,
+        'siguiente': siguiente,
+    }
+
+
+def obtener(conn, id_ticket, campos=CAMPOS):
+    """Tupla con los campos del ticket, o None si no existe"""
+    return conn.execute(f"SELECT {_columnas(campos)} FROM datos d WHERE d.id = ?", (id_ticket,)).fetchone()
+
+
+def comentarios(conn, id_ticket, campos=CAMPOS_COMENTARIO):
+    """Comentarios del ticket, del más viejo al más nuevo"""
+    columnas = ', '.join(f"c.{c}" for c in campos)
+    return conn.execute(f"SELECT {columnas} FROM comentarios c WHERE c.reporte_id = ? ORDER BY c.id",
+                        (id_ticket,)).fetchall()
@@ -0,0 +1,148 @@
+"""
+Exportaciones en segundo plano
+Las exportaciones que no están en el cache de artefactos se arman en un
+pool chico de threads propio, fuera de los threads de Waitress y del event
+loop del bot. Estado y avance (filas escritas) de cada trabajo se guardan
+en una SQLite local: no van a la BD compartida porque cada actualización
+de avance pasaría por el escritor y dispararía la réplica y el planificador.
+"""
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import TRABAJOS_BD_PATH, TRABAJOS_HILOS, TRABAJOS_MAX_PENDIENTES, ARTEFACTOS_EDAD_MAX
+from database import obtener_conexion_lectura, version_datos
+import exportador
+
+ACTIVOS = ('pendiente', 'en curso')
+
+
+class Trabajos:
+    """Cola de exportaciones con su estado en una SQLite local"""
+
+    def __init__(self, ruta_bd=None, hilos=TRABAJOS_HILOS, max_pendientes=TRABAJOS_MAX_PENDIENTES):
+        self.ruta_bd = ruta_bd or TRABAJOS_BD_PATH or os.path.join(tempfile.gettempdir(), 'reportes_trabajos.db')
+        self.hilos = hilos
+        self.max_pendientes = max_pendientes
+        self._pool = None
+        self._futuros = {}        # id -> Future (trabajos de este proceso)
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta_bd, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ejecutar(self, sql, params=()):
+        conn = self._conectar()
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def iniciar(self):
+        """Crea la tabla, marca como interrumpidos los trabajos de una ejecución anterior
+        y borra los viejos"""
+        with self._lock:
+            if self._pool is None:
+                self._preparar_bd()
+                self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='exportacion')
+
+    def _preparar_bd(self):
+        conn = self._conectar()
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS trabajos (
+                        id TEXT PRIMARY KEY,
+                        tipo TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        estado TEXT NOT NULL,
+                        filas INTEGER NOT NULL DEFAULT 0,
+                        total INTEGER,
+                        ruta TEXT,
+                        error TEXT,
+                        creado TEXT NOT NULL,
+                        iniciado TEXT,
+                        terminado TEXT
+                    )
+                """)
+                conn.execute("UPDATE trabajos SET estado = 'error', error = 'Interrumpido al reiniciar' "
+                             "WHERE estado IN (?, ?)", ACTIVOS)
+                limite = datetime.now() - timedelta(seconds=ARTEFACTOS_EDAD_MAX)
+                conn.execute("DELETE FROM trabajos WHERE creado < ?", (limite.isoformat(' ', 'seconds'),))
+        finally:
+            conn.close()
+
+    def crear_excel(self):
+        """
+        Encola el Excel de los datos actuales y devuelve el id del trabajo. Si
+        ya hay uno en marcha para la misma versión de datos se reutiliza.
+        RuntimeError si la cola está llena.
+        """
+        self.iniciar()
+        with obtener_conexion_lectura() as conn:
+            version = repr(version_datos(conn))
+        with self._lock:
+            en_marcha = self._ejecutar(
+                "SELECT id FROM trabajos WHERE tipo = 'excel' AND version = ? AND estado IN (?, ?)",
+                (version, *ACTIVOS))
+            if en_marcha and en_marcha[0]['id'] in self._futuros:
+                return en_marcha[0]['id']
+            if sum(not f.done() for f in self._futuros.values()) >= self.max_pendientes:
+                raise RuntimeError("Hay demasiadas exportaciones en espera, intenta de nuevo en unos minutos")
+            id_trabajo = secrets.token_hex(8)
+            self._ejecutar("INSERT INTO trabajos (id, tipo, version, estado, creado) VALUES (?, 'excel', ?, 'pendiente', ?)",
+                           (id_trabajo, version, datetime.now().isoformat(' ', 'seconds')))
+            self._futuros = {i: f for i, f in self._futuros.items() if not f.done()}
+            self._futuros[id_trabajo] = self._pool.submit(self._correr_excel, id_trabajo)
+        return id_trabajo
+
+    def _correr_excel(self, id_trabajo):
+        """Corre en el pool; devuelve la ruta del archivo"""
+        self._ejecutar("UPDATE trabajos SET estado = 'en curso', iniciado = ? WHERE id = ?",
+                       (datetime.now().isoformat(' ', 'seconds'), id_trabajo))
+
+        def progreso(filas, total):
+            self._ejecutar("UPDATE trabajos SET filas = ?, total = ? WHERE id = ?", (filas, total, id_trabajo))
+
+        try:
+            ruta = exportador.obtener_excel(progreso=progreso)
+        except Exception as e:
+            print(f"⚠️ Exportación {id_trabajo} falló: {e}")
+            self._ejecutar("UPDATE trabajos SET estado = 'error', error = ?, terminado = ? WHERE id = ?",
+                           (str(e), datetime.now().isoformat(' ', 'seconds'), id_trabajo))
+            raise
+        self._ejecutar("UPDATE trabajos SET estado = 'listo', ruta = ?, terminado = ? WHERE id = ?",
+                       (ruta, datetime.now().isoformat(' ', 'seconds'), id_trabajo))
+        return ruta
+
+    def estado(self, id_trabajo):
+        """dict con el estado del trabajo, o None si no existe"""
+        self.iniciar()
+        filas = self._ejecutar("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,))
+        return dict(filas[0]) if filas else None
+
+    def resumen(self):
+        with self._lock:
+            activos = sum(not f.done() for f in self._futuros.values())
+        return {'bd': self.ruta_bd, 'hilos': self.hilos, 'activos': activos, 'max_pendientes': self.max_pendientes}
+
+
+_trabajos = Trabajos()
+
+
+def crear_excel():
+    return _trabajos.crear_excel()
+
+
+def estado_trabajo(id_trabajo):
+    return _trabajos.estado(id_trabajo)
+
+
+def estado_trabajos():
+    return _trabajos.resumen()
@@ -1,6 +1,9 @@
 """
 Funciones de utilidad
 """
+import unicodedata
+from config import EMPLEADOS, ALIAS_EMPLEADOS
+from fechas import parse_fecha, fecha_a_iso
 
 def normalizar_nombre(nombre):
     """
@@ -25,3 +28,35 @@ def dividir_nombres(nombre_completo):
     nombres = [n.strip() for n in nombre_completo.split(',')]
     # Normalizar cada nombre
     return [normalizar_nombre(n) for n in nombres if n.strip()]
+
+def sin_acentos(texto):
+    """'Adrián' -> 'Adrian'"""
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+# 'tomas' -> 'Tomas' para empleados y alias (claves en minúscula y sin acentos)
+_CANONICOS = {sin_acentos(e.lower()): e for e in EMPLEADOS}
+_CANONICOS.update({sin_acentos(a.strip().lower()): e for a, e in ALIAS_EMPLEADOS.items()})
+
+def tecnico_canonico(nombre):
+    """
+    Nombre canónico de un técnico según EMPLEADOS / ALIAS_EMPLEADOS
+    'tomás ' -> 'Tomas'. Si no es conocido se usa normalizar_nombre.
+    """
+    return _CANONICOS.get(sin_acentos(nombre.strip().lower())) or normalizar_nombre(nombre)
+
+def tecnicos_de(resuelto_por):
+    """
+    Técnicos canónicos de un 'resuelto_por', sin repetidos
+    'Tomas, nahuel, tomás' -> ['Tomas', 'Nahuel']
+    """
+    tecnicos = []
+    for nombre in (resuelto_por or '').split(','):
+        if nombre.strip():
+            tecnico = tecnico_canonico(nombre)
+            if tecnico not in tecnicos:
+                tecnicos.append(tecnico)
+    return tecnicos
+
+def parse_fecha_flexible(s):
+    """Intenta interpretar distintos formatos de fecha (ver fechas.parse_fecha)"""
+    return parse_fecha(s)